@@ -0,0 +1,219 @@
+import os
+import sys
+import io
+import csv
+import signal
+import logging
+import argparse
+import datetime
+import traceback
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from pathlib import Path
+from typing import Optional, Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+logger = logging.getLogger(__name__)
+
+# event keys that are run.py command line options, the other keys (except name) override the event's config.yml
+run_options = ('config_location', 'resume', 'warm_start', 'incremental', 'roster_changes')
+# keys holding paths, which are relative to the manifest's directory
+path_keys = ('config_location', 'warm_start', 'incremental', 'roster_changes', 'data_directory')
+report_columns = ['Event', 'Status', 'Attendees', 'Tables', 'Score', 'Lower_Bound', 'Optimality_Gap',
+                  'Violations', 'Seconds', 'Data_Directory', 'Error']
+# set in the worker processes, the main process sets it on ctrl-c so that the workers do not start more events
+_stop_requested: Optional[Any] = None
+
+
+def parse_arguments(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Seat the attendees of every event of a manifest, several events at '
+                                                 'a time')
+    parser.add_argument("manifest", type=str, help="YAML file listing the events")
+    parser.add_argument("--max_workers", type=int, default=None,
+                        help="number of events solved at the same time (default: max_workers of the manifest, or the "
+                             "number of CPUs)")
+    parser.add_argument("--report", type=str, default=None,
+                        help="CSV file of the results of every event (default: batch_report.csv next to the manifest)")
+    return parser.parse_args(argv)
+
+
+def read_manifest(path: Path) -> tuple[Optional[int], list[dict]]:
+    """max_workers and the events of a manifest.
+
+    The manifest has a list of events, each with a name and a config_location, optionally run.py options (resume,
+    warm_start, incremental, roster_changes) and parameters overriding those of its config.yml, such as
+    max_run_time_seconds.  Parameters under defaults apply to every event that does not set them.
+    """
+    import yaml
+    with open(path) as manifest_file:
+        manifest = yaml.safe_load(manifest_file) or dict()
+    defaults = manifest.get('defaults') or dict()
+    events = list()
+    errors = ''
+    for number, event in enumerate(manifest.get('events') or list(), start=1):
+        event = {**defaults, **event}
+        event.setdefault('name', f'event_{number}')
+        if 'config_location' not in event:
+            errors += f'  - event {event["name"]} has no config_location\n'
+            continue
+        for key in path_keys:
+            if event.get(key) is not None:
+                event[key] = str(path.parent / event[key])
+        events.append(event)
+    names = [event['name'] for event in events]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if len(duplicates) > 0:
+        errors += f'  - event names {duplicates} are used more than once\n'
+    if len(events) == 0 and len(errors) == 0:
+        errors += '  - there are no events\n'
+    if len(errors) > 0:
+        raise ValueError(f'Illegal manifest {path}\n' + errors)
+    return manifest.get('max_workers'), events
+
+
+def event_arguments(event: dict) -> list[str]:
+    """The run.py command line of the event"""
+    argv = ['--config_location', event['config_location']]
+    if event.get('resume'):
+        argv.append('--resume')
+    for option in ('warm_start', 'incremental', 'roster_changes'):
+        if event.get(option) is not None:
+            argv.extend([f'--{option}', event[option]])
+    return argv
+
+
+def _initialize_worker(stop_requested) -> None:
+    # ctrl-c is handled by the main process, and by optimize() while an event runs.  The events log to their own
+    # files, not to the console the worker may have inherited.
+    global _stop_requested
+    _stop_requested = stop_requested
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for handler in list(logging.getLogger().handlers):
+        logging.getLogger().removeHandler(handler)
+
+
+def solve_event(event: dict) -> Optional[dict]:
+    """Seat the attendees of one event, in a worker process, and return its results (None if ctrl-c was pressed
+    before it started).
+
+    The event's log goes to the log file in its data_directory, and its time budget starts when its worker starts it.
+    """
+    if _stop_requested is not None and _stop_requested.is_set():
+        return None
+    from src.run import parse_arguments as parse_run_arguments, optimize
+    from src.parameters.parameters import Parameters
+
+    start_time = datetime.datetime.now()
+    args = parse_run_arguments(event_arguments(event))
+    parameters = Parameters(Path(args.config_location),
+                            {key: value for key, value in event.items() if key not in run_options and key != 'name'})
+    parameters.data_directory.mkdir(parents=True, exist_ok=True)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    log_handler = logging.FileHandler(str(parameters.data_directory / parameters.log_file_name), mode='w')
+    log_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s: %(message)s', "%Y-%m-%d %H:%M:%S"))
+    root_logger.addHandler(log_handler)
+    try:
+        # the model prints its progress, which would interleave with that of the other events
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = optimize(args, parameters, start_time)
+    except Exception:
+        logger.error(traceback.format_exc())
+        raise
+    finally:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        root_logger.removeHandler(log_handler)
+        log_handler.close()
+    return {**result, 'data_directory': str(parameters.data_directory)}
+
+
+def run_batch(events: list[dict], max_workers: int) -> list[dict]:
+    """Solve the events in a pool of max_workers processes and return a row of the report for each event.
+
+    An event that fails is reported with its error and does not stop the others.  On ctrl-c the running events stop
+    after their current iteration and write their best arrangement, and the events not started yet are cancelled.
+    """
+    rows = list()
+    stop_requested = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_worker,
+                             initargs=(stop_requested,)) as executor:
+        futures: dict[Future, dict] = {executor.submit(solve_event, event): event for event in events}
+
+        def cancel_pending(_signum, _frame):
+            logger.info('Control-C was pressed.  Running events will stop and output their best solution so far, '
+                        'the others are cancelled')
+            stop_requested.set()
+            for future in futures:
+                future.cancel()
+
+        previous_handler = signal.signal(signal.SIGINT, cancel_pending)
+        try:
+            for future, event in futures.items():
+                row = report_row(event['name'], future)
+                if row['Status'] == 'ok':
+                    logger.info(f"{row['Event']}: score {row['Score']}, optimality gap {row['Optimality_Gap']:.2%}, "
+                                f"{row['Seconds']:.2f} seconds")
+                else:
+                    logger.info(f"{row['Event']}: {row['Status']}" + (f" {row['Error']}" if 'Error' in row else ''))
+                rows.append(row)
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+    return rows
+
+
+def report_row(name: str, future: Future) -> dict:
+    """The row of the report of an event, once its future is done"""
+    try:
+        result = future.result()
+    except Exception as error:
+        return {'Event': name, 'Status': 'cancelled' if future.cancelled() else 'failed',
+                'Error': str(error) or type(error).__name__}
+    if result is None:
+        return {'Event': name, 'Status': 'cancelled'}
+    return {'Event': name,
+            'Status': 'ok',
+            'Attendees': result['num_attendees'],
+            'Tables': result['num_tables'],
+            'Score': result['total_score'],
+            'Lower_Bound': result['lower_bound'],
+            'Optimality_Gap': round(result['optimality_gap'], 6),
+            'Violations': result['upper_bound_violations'],
+            'Seconds': round(result['seconds'], 2),
+            'Data_Directory': result['data_directory']}
+
+
+def write_report(path: Path, rows: list[dict]) -> None:
+    with open(path, 'w', newline='') as report_file:
+        writer = csv.DictWriter(report_file, fieldnames=report_columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Solve every event of the manifest and write the report.  Returns 1 if an event did not finish, else 0."""
+    args = parse_arguments(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+    manifest_path = Path(args.manifest)
+    manifest_max_workers, events = read_manifest(manifest_path)
+    max_workers = args.max_workers or manifest_max_workers or os.cpu_count() or 1
+    max_workers = min(max_workers, len(events))
+    logger.info(f'Solving {len(events)} events with {max_workers} workers')
+
+    start_time = datetime.datetime.now()
+    rows = run_batch(events, max_workers)
+    report_path = Path(args.report) if args.report is not None else manifest_path.with_name('batch_report.csv')
+    write_report(report_path, rows)
+
+    num_ok = sum(1 for row in rows if row['Status'] == 'ok')
+    logger.info(f'{num_ok} of {len(rows)} events solved in '
+                f'{(datetime.datetime.now() - start_time).total_seconds():.2f} seconds, report written to '
+                f'{report_path}')
+    return 0 if num_ok == len(rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""Per-call latency of the assignment solvers over a range of attendee/table counts.
+
+Run from the repository root with:  python src/benchmark/assignment_solver_latency.py
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.optimization_layer.assignment_solvers import assignment_solvers
+
+# (number of attendees, number of tables) - reoptimization uses square problems, the initial solution both shapes
+default_sizes = [(10, 10), (25, 10), (10, 25), (50, 50), (100, 100), (250, 250), (200, 50), (500, 500)]
+
+
+def benchmark(sizes: list[tuple[int, int]], repeats: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    for solver in assignment_solvers.values():
+        # keep imports and other one-off costs out of the timings
+        solver(np.zeros((2, 2)))
+    print(f"{'Attendees':>10s}{'Tables':>8s}" + ''.join(f'{name + " (ms)":>26s}' for name in assignment_solvers) +
+          f"{'Same optimum':>14s}")
+    for m, n in sizes:
+        elapsed = {name: 0.0 for name in assignment_solvers}
+        same_optimum = True
+        for _ in range(repeats):
+            # marginal scores are sums of small integer counts, so use integer costs of a similar range
+            costs = rng.integers(0, 100, size=(m, n)).astype(float)
+            objectives = []
+            for name, solver in assignment_solvers.items():
+                start = time.perf_counter()
+                assignments = solver(costs)
+                elapsed[name] += time.perf_counter() - start
+                objectives.append(sum(costs[row, column] for row, column in assignments))
+            same_optimum = same_optimum and max(objectives) - min(objectives) < 1e-6
+        print(f'{m:10d}{n:8d}' + ''.join(f'{1000 * elapsed[name] / repeats:26.2f}' for name in assignment_solvers) +
+              f'{str(same_optimum):>14s}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="number of random cost matrices per size")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random cost matrices")
+    args = parser.parse_args()
+    benchmark(default_sizes, args.repeats, args.seed)
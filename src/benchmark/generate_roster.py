@@ -0,0 +1,86 @@
+"""Synthetic rosters (attendees.csv and config.yml) for benchmarking.
+
+Run from the repository root with, for example:
+    python src/benchmark/generate_roster.py --num_attendees 1000 --cardinalities 40 8 3 3 --output_directory out
+"""
+import os
+import sys
+import argparse
+import random
+from pathlib import Path
+
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+default_cardinalities = [20, 6, 3, 3]
+
+
+def generate_roster(output_directory: Path, num_attendees: int, cardinalities: list[int], skew: float = 1.0,
+                    override_density: float = 0.0, seed: int = 0, max_table_size: int = 8,
+                    **parameter_overrides) -> Path:
+    """Write attendees.csv and config.yml to output_directory and return the path of config.yml.
+
+    Attribute i has cardinalities[i] items, the k-th item drawn with probability proportional to 1 / k ** skew (so 0 is
+    uniform).  override_density is the fraction of pairs of items of different attributes that get an
+    override_sameness_score, of -2, -1, 1 or 2.  parameter_overrides are written to config.yml as they are.
+    """
+    rng = random.Random(seed)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    attribute_field_names = [f'Attribute_{i + 1}' for i in range(len(cardinalities))]
+    items = [[f'A{i + 1}_{k + 1}' for k in range(cardinality)] for i, cardinality in enumerate(cardinalities)]
+    weights = [[1.0 / (k + 1) ** skew for k in range(cardinality)] for cardinality in cardinalities]
+
+    with open(output_directory / 'attendees.csv', 'w') as attendee_file:
+        attendee_file.write(','.join(['ID', 'Name'] + attribute_field_names) + '\n')
+        columns = [rng.choices(attribute_items, weights=attribute_weights, k=num_attendees)
+                   for attribute_items, attribute_weights in zip(items, weights)]
+        for attendee in range(num_attendees):
+            attendee_file.write(','.join([str(attendee + 1), f'Attendee {attendee + 1}'] +
+                                         [column[attendee] for column in columns]) + '\n')
+
+    override_sameness_score = [[attribute_field_names[i], item1, attribute_field_names[j], item2,
+                                rng.choice([-2, -1, 1, 2])]
+                               for i in range(len(cardinalities))
+                               for j in range(i + 1, len(cardinalities))
+                               for item1 in items[i]
+                               for item2 in items[j]
+                               if rng.random() < override_density]
+
+    config = {'max_table_size': max_table_size,
+              'data_directory': str(output_directory),
+              'attendee_file_name': 'attendees.csv',
+              'log_file_name': 'log.txt',
+              'table_assignments_file_name': 'table_assignments.csv',
+              'table_summary_statistics': 'table_summary.csv',
+              'id_field_name': 'ID',
+              'name_field_name': 'Name',
+              'attribute_field_names': attribute_field_names,
+              'default_quadratic_penalty': 1,
+              'override_quadratic_penalty': {},
+              'default_sameness_score': 0,
+              'override_sameness_score': override_sameness_score,
+              'max_run_time_seconds': 30,
+              'max_iterations': 400,
+              'assignment_solver': 'linear_assignment',
+              **parameter_overrides}
+    config_path = output_directory / 'config.yml'
+    with open(config_path, 'w') as config_file:
+        yaml.safe_dump(config, config_file, default_flow_style=None, sort_keys=False)
+    return config_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_attendees", type=int, required=True)
+    parser.add_argument("--cardinalities", type=int, nargs='+', default=default_cardinalities,
+                        help="number of items of each attribute")
+    parser.add_argument("--skew", type=float, default=1.0, help="0 for uniform items, larger for more skewed items")
+    parser.add_argument("--override_density", type=float, default=0.0,
+                        help="fraction of item pairs with an override_sameness_score")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max_table_size", type=int, default=8)
+    parser.add_argument("--output_directory", type=str, required=True)
+    args = parser.parse_args()
+    print(generate_roster(Path(args.output_directory), args.num_attendees, args.cardinalities, args.skew,
+                          args.override_density, args.seed, args.max_table_size))
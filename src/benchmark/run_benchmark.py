@@ -0,0 +1,290 @@
+"""End to end benchmark on synthetic rosters from 50 to 10,000 attendees, compared with a stored baseline.
+
+Each roster size runs read_attendees -> initialize_tables -> initial_solution -> iterate_reoptimization in a fresh
+process and records the wall time of each stage, the peak memory after reading the attendees and at the end, the
+score trajectory, the final score and the upper bound violations.  Run from the repository root with:
+    python src/benchmark/run_benchmark.py --compare_to src/benchmark/baseline.json
+The process exits with status 1, listing the regressions, if a result is worse than the baseline by more than the
+tolerances.  --save_baseline writes the results as the new baseline.  --num_zones also runs each size with
+solve_by_zones and prints its time and score against the flat run, the quality lost by splitting the tables into zones.
+--exact_solver also solves the sizes up to --exact_max_size with solve_exactly and prints the gap of the heuristic to
+the proven bound; a heuristic score below the bound is an inconsistency, and the process exits with status 1.
+"""
+import os
+import sys
+import io
+import json
+import time
+import datetime
+import argparse
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.benchmark.generate_roster import generate_roster, default_cardinalities
+
+default_sizes = [50, 200, 1000, 2500, 5000, 10000]
+default_baseline = Path(__file__).with_name('baseline.json')
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident memory of this process, None where the resource module is not available (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def run_size(config_path: Path) -> dict:
+    """Run the model on one generated roster, in the current process, and return its measurements"""
+    from src.parameters.parameters import Parameters
+    from src.data_layer.read_attendees import read_attendees
+    from src.optimization_layer.initialize_tables import initialize_tables
+    from src.optimization_layer.develop_initial_solution import initial_solution
+    from src.optimization_layer.reoptimize import iterate_reoptimization
+    from src.optimization_layer.lower_bound import lower_bound
+    from src.util.profiling import profiler
+
+    parameters = Parameters(config_path)
+    profiler.enabled = True
+    seconds_by_stage = dict()
+    # the model prints progress, which is not part of what is measured
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        attendees = read_attendees(parameters)
+        seconds_by_stage['read_attendees'] = time.perf_counter() - start
+        memory_after_read = peak_memory_mb()
+
+        start = time.perf_counter()
+        tables = initialize_tables(parameters, attendees)
+        seconds_by_stage['initialize_tables'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        initial_solution(tables, attendees, parameters)
+        seconds_by_stage['initial_solution'] = time.perf_counter() - start
+        initial_score = sum(table.score() for table in tables)
+
+        start = time.perf_counter()
+        problem = tables[0].problem
+        problem.start_time = datetime.datetime.now()
+        iterate_reoptimization(parameters, tables)
+        seconds_by_stage['iterate_reoptimization'] = time.perf_counter() - start
+
+    return {'num_attendees': len(attendees),
+            'num_tables': len(tables),
+            'seconds_by_stage': seconds_by_stage,
+            'total_seconds': sum(seconds_by_stage.values()),
+            'peak_memory_mb': peak_memory_mb(),
+            'peak_memory_after_read_mb': memory_after_read,
+            'initial_score': float(initial_score),
+            'final_score': float(sum(table.score() for table in tables)),
+            'lower_bound': lower_bound(problem, parameters.max_table_size),
+            'upper_bound_violations': int(sum(table.upper_bound_violations() for table in tables)),
+            'iterations': len(profiler.trajectory),
+            'trajectory': [{'elapsed_seconds': elapsed_seconds, 'best_score': best_score}
+                           for _iteration, elapsed_seconds, _score, best_score in profiler.trajectory]}
+
+
+def run_size_by_zones(config_path: Path, num_zones: int) -> dict:
+    """Run the model on one generated roster with num_zones zones, in the current process, and return its
+    measurements"""
+    from src.parameters.parameters import Parameters
+    from src.data_layer.read_attendees import read_attendees
+    from src.optimization_layer.initialize_tables import initialize_tables
+    from src.optimization_layer.zones import solve_by_zones
+
+    parameters = Parameters(config_path)
+    parameters.num_zones = num_zones
+    with contextlib.redirect_stdout(io.StringIO()):
+        attendees = read_attendees(parameters)
+        start = time.perf_counter()
+        tables = initialize_tables(parameters, attendees)
+        solve_by_zones(parameters, tables, attendees)
+        seconds = time.perf_counter() - start
+    return {'num_zones': num_zones,
+            'total_seconds': seconds,
+            'final_score': float(sum(table.score() for table in tables)),
+            'upper_bound_violations': int(sum(table.upper_bound_violations() for table in tables))}
+
+
+def run_size_exactly(config_path: Path, exact_solver: str, max_seconds: float) -> dict:
+    """Run the model on one generated roster with the exact solver, in the current process, and return its
+    measurements"""
+    from src.parameters.parameters import Parameters
+    from src.data_layer.read_attendees import read_attendees
+    from src.optimization_layer.initialize_tables import initialize_tables
+    from src.optimization_layer.develop_initial_solution import initial_solution
+    from src.optimization_layer.exact_solve import solve_exactly
+
+    parameters = Parameters(config_path)
+    parameters.exact_solver = exact_solver
+    parameters.max_run_time_seconds = max_seconds
+    with contextlib.redirect_stdout(io.StringIO()):
+        attendees = read_attendees(parameters)
+        start = time.perf_counter()
+        tables = initialize_tables(parameters, attendees)
+        initial_solution(tables, attendees, parameters)
+        bound = solve_exactly(parameters, tables, attendees)
+        seconds = time.perf_counter() - start
+    return {'exact_solver': exact_solver,
+            'total_seconds': seconds,
+            'final_score': float(sum(table.score() for table in tables)),
+            'bound': float(bound)}
+
+
+def run_benchmark(sizes: list[int], output_directory: Path, cardinalities: list[int], skew: float,
+                  override_density: float, seed: int, iterations: int, max_seconds: float,
+                  num_zones: int = 1, exact_solver: Optional[str] = None, exact_max_size: int = 0,
+                  exact_max_seconds: float = 0.0) -> dict[str, dict]:
+    """Generate a roster of each size and run it in its own process so that the peak memory is per size.  With
+    num_zones above 1, each size is also run with that many zones, under 'zones' in its results.  With an
+    exact_solver, the sizes up to exact_max_size are also solved exactly, under 'exact' in their results."""
+    results = dict()
+    for size in sizes:
+        config_path = generate_roster(output_directory / f'attendees_{size}', size, cardinalities, skew,
+                                      override_density, seed,
+                                      max_iterations=iterations, max_run_time_seconds=max_seconds, random_seed=seed)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            result = executor.submit(run_size, config_path).result()
+        results[str(size)] = result
+        print(f"{size:10d}{result['num_tables']:8d}{result['seconds_by_stage']['read_attendees']:8.2f}"
+              f"{result['peak_memory_after_read_mb'] or float('nan'):9.1f}{result['total_seconds']:10.2f}"
+              f"{result['peak_memory_mb'] or float('nan'):10.1f}{result['initial_score']:14.1f}"
+              f"{result['final_score']:14.1f}{result['lower_bound']:14.1f}{result['upper_bound_violations']:12d}")
+        if num_zones > 1:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result['zones'] = executor.submit(run_size_by_zones, config_path, num_zones).result()
+        if exact_solver is not None and size <= exact_max_size:
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                result['exact'] = executor.submit(run_size_exactly, config_path, exact_solver,
+                                                  exact_max_seconds).result()
+    if num_zones > 1:
+        print(f"\n{'Attendees':>10s}{'Zones':>8s}{'Flat s':>10s}{'Zones s':>10s}{'Flat':>14s}{'Zones':>14s}"
+              f"{'Loss':>8s}{'Violations':>12s}")
+        for size, result in results.items():
+            zones = result['zones']
+            loss = (zones['final_score'] - result['final_score']) / max(abs(result['final_score']), 1)
+            print(f"{size:>10s}{num_zones:8d}{result['total_seconds']:10.2f}{zones['total_seconds']:10.2f}"
+                  f"{result['final_score']:14.1f}{zones['final_score']:14.1f}{loss:8.2%}"
+                  f"{zones['upper_bound_violations']:12d}")
+    if any('exact' in result for result in results.values()):
+        print(f"\n{'Attendees':>10s}{'Heur. s':>10s}{'Exact s':>10s}{'Heuristic':>14s}{'Exact':>14s}{'Bound':>14s}"
+              f"{'Gap':>8s}")
+        for size, result in results.items():
+            if 'exact' not in result:
+                continue
+            exact = result['exact']
+            # the solver may stop before proving a bound better than the lower bound
+            bound = max(exact['bound'], result['lower_bound'])
+            gap = (result['final_score'] - bound) / max(abs(result['final_score']), 1)
+            print(f"{size:>10s}{result['total_seconds']:10.2f}{exact['total_seconds']:10.2f}"
+                  f"{result['final_score']:14.1f}{exact['final_score']:14.1f}{bound:14.1f}{gap:8.2%}")
+    return results
+
+
+def find_inconsistencies(results: dict[str, dict]) -> list[str]:
+    """Describe each size where the heuristic or the exact solver scored below the bound proven by the exact solver,
+    which would mean one of them is wrong"""
+    inconsistencies = list()
+    for size, result in results.items():
+        if 'exact' not in result:
+            continue
+        bound = result['exact']['bound']
+        tolerance = 1e-6 * max(abs(bound), 1)
+        for name, score in (('heuristic', result['final_score']), ('exact', result['exact']['final_score'])):
+            if score < bound - tolerance:
+                inconsistencies.append(f'{size} attendees: {name} score {score} is below the proven bound {bound}')
+    return inconsistencies
+
+
+def find_regressions(results: dict[str, dict], baseline: dict[str, dict], time_tolerance: float,
+                     memory_tolerance: float, score_tolerance: float) -> list[str]:
+    """Describe each measurement that is worse than the baseline by more than its (relative) tolerance"""
+    regressions = list()
+    for size, result in results.items():
+        if size not in baseline:
+            print(f'No baseline for {size} attendees')
+            continue
+        expected = baseline[size]
+        if result['total_seconds'] > expected['total_seconds'] * (1 + time_tolerance):
+            regressions.append(f"{size} attendees: {result['total_seconds']:.2f} seconds, "
+                               f"baseline {expected['total_seconds']:.2f}")
+        if result['peak_memory_mb'] is not None and expected['peak_memory_mb'] is not None and \
+                result['peak_memory_mb'] > expected['peak_memory_mb'] * (1 + memory_tolerance):
+            regressions.append(f"{size} attendees: peak memory {result['peak_memory_mb']:.1f} MB, "
+                               f"baseline {expected['peak_memory_mb']:.1f}")
+        if result['final_score'] > expected['final_score'] + score_tolerance * max(abs(expected['final_score']), 1):
+            regressions.append(f"{size} attendees: score {result['final_score']}, baseline {expected['final_score']}")
+        if result['upper_bound_violations'] > expected['upper_bound_violations']:
+            regressions.append(f"{size} attendees: {result['upper_bound_violations']} upper bound violations, "
+                               f"baseline {expected['upper_bound_violations']}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs='+', default=default_sizes, help="numbers of attendees")
+    parser.add_argument("--cardinalities", type=int, nargs='+', default=default_cardinalities,
+                        help="number of items of each attribute")
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--override_density", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=50, help="max_iterations of the reoptimization")
+    parser.add_argument("--max_seconds", type=float, default=600.0, help="max_run_time_seconds of the reoptimization")
+    parser.add_argument("--num_zones", type=int, default=1,
+                        help="above 1, also run each size with this many zones and compare with the flat run")
+    parser.add_argument("--exact_solver", type=str, default=None,
+                        help="also solve the small sizes with this exact solver (highs or cp_sat) and check the "
+                             "heuristic against its bound")
+    parser.add_argument("--exact_max_size", type=int, default=200, help="largest size solved with --exact_solver")
+    parser.add_argument("--exact_max_seconds", type=float, default=120.0,
+                        help="max_run_time_seconds of each --exact_solver run")
+    parser.add_argument("--output_directory", type=str, default=None,
+                        help="keep the rosters and results.json (with the score trajectories) in this directory")
+    parser.add_argument("--compare_to", type=str, default=None, help="baseline JSON file to compare the results to")
+    parser.add_argument("--save_baseline", type=str, nargs='?', const=str(default_baseline), default=None,
+                        help="write the results as a baseline JSON file")
+    parser.add_argument("--time_tolerance", type=float, default=0.5)
+    parser.add_argument("--memory_tolerance", type=float, default=0.25)
+    parser.add_argument("--score_tolerance", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory = Path(args.output_directory or temporary_directory)
+        print(f"{'Attendees':>10s}{'Tables':>8s}{'Read s':>8s}{'Read MB':>9s}{'Seconds':>10s}{'Peak MB':>10s}"
+              f"{'Initial':>14s}{'Final':>14s}{'Bound':>14s}{'Violations':>12s}")
+        benchmark_results = run_benchmark(args.sizes, directory, args.cardinalities, args.skew,
+                                          args.override_density, args.seed, args.iterations, args.max_seconds,
+                                          args.num_zones, args.exact_solver, args.exact_max_size,
+                                          args.exact_max_seconds)
+        if args.output_directory is not None:
+            with open(directory / 'results.json', 'w') as results_file:
+                json.dump(benchmark_results, results_file, indent=2)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({size: {key: value for key, value in result.items()
+                              if key not in ('trajectory', 'zones', 'exact')}
+                       for size, result in benchmark_results.items()}, baseline_file, indent=2)
+    inconsistencies = find_inconsistencies(benchmark_results)
+    for inconsistency in inconsistencies:
+        print(f'INCONSISTENCY {inconsistency}')
+    if args.compare_to is not None:
+        with open(args.compare_to) as baseline_file:
+            found = find_regressions(benchmark_results, json.load(baseline_file), args.time_tolerance,
+                                     args.memory_tolerance, args.score_tolerance)
+        for regression in found:
+            print(f'REGRESSION {regression}')
+        if len(found) > 0:
+            sys.exit(1)
+        print('No regressions')
+    if len(inconsistencies) > 0:
+        sys.exit(1)
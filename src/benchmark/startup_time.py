@@ -0,0 +1,87 @@
+"""Start up time of run.py and of the modules needed to optimize, with a budget.
+
+Run from the repository root with:
+    python src/benchmark/startup_time.py
+It measures, each as the median of --repeats fresh processes,
+- the wall time of "python src/run.py --help", which imports no model module, and
+- the import time of the modules on the optimization path (python -X importtime), which must not load pandas,
+  networkx or scipy (these are imported when output is written or the solver that needs them is used).
+The process exits with status 1, listing the problems, if a time is over its budget or a module is loaded.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+repository_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+optimization_modules = ['src.parameters.parameters',
+                        'src.data_layer.read_attendees',
+                        'src.optimization_layer.initialize_tables',
+                        'src.optimization_layer.develop_initial_solution',
+                        'src.optimization_layer.reoptimize',
+                        'src.optimization_layer.parallel_reoptimize']
+deferred_modules = ['pandas', 'networkx', 'scipy']
+help_budget_seconds = 0.3
+import_budget_seconds = 0.4
+
+
+def help_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(repository_root, 'src', 'run.py'), '--help'],
+                   check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def import_seconds() -> tuple[float, dict[str, float]]:
+    """Cumulative import time of the optimization modules, and of each top level package they load"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             '; '.join(f'import {module}' for module in optimization_modules)],
+                            check=True, capture_output=True, text=True, cwd=repository_root)
+    seconds_by_package: dict[str, float] = dict()
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            # top level imports only, the nested ones are included in their cumulative time
+            seconds_by_package[name.strip()] = int(cumulative) / 1e6
+    return sum(seconds_by_package.values()), seconds_by_package
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--help_budget_seconds", type=float, default=help_budget_seconds,
+                        help="budget of the wall time of run.py --help")
+    parser.add_argument("--import_budget_seconds", type=float, default=import_budget_seconds,
+                        help="budget of the import time of the optimization modules")
+    args = parser.parse_args()
+
+    help_times = [help_seconds() for _ in range(args.repeats)]
+    import_results = [import_seconds() for _ in range(args.repeats)]
+    help_time = statistics.median(help_times)
+    import_time = statistics.median(seconds for seconds, _ in import_results)
+    seconds_by_package = import_results[-1][1]
+
+    print(f'run.py --help: {help_time:.3f} seconds (budget {args.help_budget_seconds})')
+    print(f'optimization modules: {import_time:.3f} seconds to import (budget {args.import_budget_seconds})')
+    for package, seconds in sorted(seconds_by_package.items(), key=lambda item: -item[1])[:10]:
+        print(f'    {package:60s}{seconds:8.3f}')
+
+    problems = list()
+    if help_time > args.help_budget_seconds:
+        problems.append(f'run.py --help took {help_time:.3f} seconds')
+    if import_time > args.import_budget_seconds:
+        problems.append(f'importing the optimization modules took {import_time:.3f} seconds')
+    for module in deferred_modules:
+        if module in seconds_by_package:
+            problems.append(f'{module} is imported by the optimization modules')
+    for problem in problems:
+        print(f'OVER BUDGET {problem}')
+    if len(problems) > 0:
+        sys.exit(1)
+    print('Within budget')
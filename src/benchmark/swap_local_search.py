@@ -0,0 +1,66 @@
+"""Score improvement per second of the swap local search compared with the flow-based reoptimization step alone.
+
+Both start from the same initial solution.  Run from the repository root with:
+    python src/benchmark/swap_local_search.py --config_location path_to_config.yml
+"""
+import os
+import sys
+import time
+import datetime
+import argparse
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.parameters.parameters import Parameters
+from src.entity.table import Table
+from src.data_layer.read_attendees import read_attendees
+from src.optimization_layer.initialize_tables import initialize_tables
+from src.optimization_layer.develop_initial_solution import initial_solution
+from src.optimization_layer.local_search import swap_local_search
+from src.optimization_layer.reoptimize import iterate_reoptimization
+
+
+def seat(tables: list[Table], attendees: list, table_ids: list[int]) -> None:
+    for table in tables:
+        for attendee in list(table.attendees):
+            table.remove_attendee(attendee)
+    for attendee, table_id in zip(attendees, table_ids):
+        tables[table_id].add_attendee(attendee)
+
+
+def run_phase(name: str, phase, tables: list[Table], initial_score: float) -> None:
+    tables[0].problem.start_time = datetime.datetime.now()
+    start = time.perf_counter()
+    phase()
+    elapsed = time.perf_counter() - start
+    score = sum(table.score() for table in tables)
+    print(f'{name:25s}{elapsed:10.2f}{score:12.1f}{initial_score - score:14.1f}'
+          f'{(initial_score - score) / max(elapsed, 1e-9):14.1f}')
+
+
+def benchmark(parameters: Parameters, seconds: float) -> None:
+    attendees = read_attendees(parameters)
+    tables = initialize_tables(parameters, attendees)
+    initial_solution(tables, attendees, parameters)
+    initial_table_ids = [attendee.assigned_to_table.table_id for attendee in attendees]
+    initial_score = sum(table.score() for table in tables)
+    parameters.max_run_time_seconds = seconds
+    parameters.swap_local_search = False
+
+    print(f'{len(attendees)} attendees, {len(tables)} tables, initial score {initial_score}')
+    print(f"{'Phase':25s}{'Seconds':>10s}{'Score':>12s}{'Improvement':>14s}{'Per second':>14s}")
+    run_phase('swap local search', lambda: swap_local_search(tables, parameters), tables, initial_score)
+    seat(tables, attendees, initial_table_ids)
+    run_phase('flow reoptimization', lambda: iterate_reoptimization(parameters, tables), tables, initial_score)
+    seat(tables, attendees, initial_table_ids)
+    run_phase('swap, then flow', lambda: (swap_local_search(tables, parameters),
+                                          iterate_reoptimization(parameters, tables)), tables, initial_score)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_location", type=str, required=True, help="YAML configuration file location")
+    parser.add_argument("--seconds", type=float, default=10.0, help="time budget of each phase")
+    args = parser.parse_args()
+    benchmark(Parameters(Path(args.config_location)), args.seconds)
@@ -0,0 +1,37 @@
+import os
+import json
+import logging
+from pathlib import Path
+from typing import Optional
+
+from src.entity.attendee import Attendee
+
+logger = logging.getLogger(__name__)
+
+
+def write_checkpoint(path: Path, attendees: list[Attendee], score: float, rng_state: Optional[tuple]) -> None:
+    """Write the best table of each attendee, its score and the state of the random number generator as JSON.
+
+    The file is replaced in one step, so a run killed while writing leaves the previous checkpoint intact.
+    """
+    checkpoint = {'score': float(score),
+                  'rng_state': rng_state,
+                  'table_by_id': {str(attendee.id).strip(): attendee.best_assignment.table_id
+                                  for attendee in attendees}}
+    temporary_path = path.with_name(path.name + '.tmp')
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+def read_checkpoint(path: Path) -> tuple[dict[str, int], Optional[tuple]]:
+    """Table (0 for the first table) of each attendee ID and the random number generator state of a checkpoint"""
+    with open(path) as checkpoint_file:
+        checkpoint = json.load(checkpoint_file)
+    logger.info(f'Read checkpoint {path} with score {checkpoint["score"]}')
+    rng_state = checkpoint['rng_state']
+    if rng_state is not None:
+        # random.Random.setstate needs tuples, JSON gives lists
+        version, internal_state, gauss_next = rng_state
+        rng_state = (version, tuple(internal_state), gauss_next)
+    return checkpoint['table_by_id'], rng_state
@@ -1,17 +1,49 @@
+import csv
+import sys
 import logging
-import pandas as pd
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, TYPE_CHECKING
+
+import numpy as np
 
 from src.parameters.parameters import Parameters
 from src.entity.attendee import Attendee
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 logger = logging.getLogger(__name__)
 
+parquet_suffixes = ('.parquet', '.pq')
+
 
 def read_attendees(parameters: Parameters) -> list[Attendee]:
-    attendees_df = pd.read_csv(parameters.data_directory / parameters.attendee_file_name)
+    """Read the attendee file (CSV, or Parquet if it ends in .parquet) in chunks of parameters.read_chunk_size rows.
+
+    Only the ID, name and attribute columns are kept.  CSV files are read with the csv module, so pandas is not
+    imported.
+    """
+    path = parameters.data_directory / parameters.attendee_file_name
+    columns = [parameters.id_field_name, parameters.name_field_name] + parameters.attribute_field_names
+    if path.suffix.lower() in parquet_suffixes:
+        check_columns(_parquet_columns(path), parameters)
+        chunks = _read_parquet_chunks(path, columns, parameters.read_chunk_size)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as attendee_file:
+            check_columns(next(csv.reader(attendee_file), []), parameters)
+        chunks = _read_csv_chunks(path, columns, parameters.read_chunk_size)
+    return attendees_from_chunks(chunks, parameters)
+
 
-    # sanity check
-    columns = set(attendees_df.columns)
+def attendees_from_df(attendees_df: 'pd.DataFrame', parameters: Parameters) -> list[Attendee]:
+    check_columns(list(attendees_df.columns), parameters)
+    return attendees_from_chunks([{column: attendees_df[column].astype(str).tolist()
+                                   for column in attendees_df.columns}], parameters)
+
+
+def check_columns(columns: list[str], parameters: Parameters) -> None:
+    columns = set(columns)
     errors_found = False
     if parameters.id_field_name not in columns:
         logger.error(f'ID field {parameters.id_field_name} is not found in attendee file')
@@ -28,16 +60,67 @@ def read_attendees(parameters: Parameters) -> list[Attendee]:
 
     assert not errors_found, "Attendee file did not have the expected columns"
 
-    attendee_list = []
-    for row in attendees_df.itertuples(index=False):
-        # noinspection PyProtectedMember
-        row_as_dict = row._asdict()
-        attributes_used = {k.strip(): str(v).strip()
-                           for k, v in row_as_dict.items()
-                           if k.strip() in parameters.attribute_field_names}
-        attendee = Attendee(row_as_dict[parameters.id_field_name],
-                            row_as_dict[parameters.name_field_name],
-                            attributes_used)
-        attendee_list.append(attendee)
-
-    return attendee_list
+
+def attendees_from_chunks(chunks: Iterable[dict[str, list[str]]], parameters: Parameters) -> list[Attendee]:
+    """Build the attendees from chunks of rows of the attendee file (the values of each column), encoding the
+    attributes as they come.
+
+    Each (attribute type, item) pair gets a code, those of each attribute type following on from those of the
+    previous one, so every pair gets a distinct code in range(number of distinct pairs).  The item strings are
+    interned, so attendees with the same item share one string, and the codes of all attendees are rows of one array.
+    """
+    attribute_names = [sys.intern(attribute_name.strip()) for attribute_name in parameters.attribute_field_names]
+    # code of each item within its attribute type, in order of first appearance
+    code_by_item: list[dict[str, int]] = [dict() for _ in attribute_names]
+    ids: list = list()
+    names: list = list()
+    items: list[list[str]] = [list() for _ in attribute_names]
+    chunk_codes: list[np.ndarray] = list()
+
+    for chunk in chunks:
+        ids.extend(chunk[parameters.id_field_name])
+        names.extend(chunk[parameters.name_field_name])
+        codes = np.empty((len(chunk[parameters.id_field_name]), len(attribute_names)), dtype=np.int64)
+        for column, field_name in enumerate(parameters.attribute_field_names):
+            item_codes = code_by_item[column]
+            column_items = [sys.intern(item.strip()) for item in chunk[field_name]]
+            codes[:, column] = [item_codes.setdefault(item, len(item_codes)) for item in column_items]
+            items[column].extend(column_items)
+        chunk_codes.append(codes)
+
+    offsets = np.cumsum([0] + [len(item_codes) for item_codes in code_by_item[:-1]], dtype=np.int64)
+    attribute_codes = (np.concatenate(chunk_codes) if len(chunk_codes) > 0 else
+                       np.zeros((0, len(attribute_names)), dtype=np.int64)) + offsets
+
+    return [Attendee(item_id, attendee_id, name, dict(zip(attribute_names, attendee_items)), codes)
+            for item_id, (attendee_id, name, attendee_items, codes) in enumerate(zip(ids, names, zip(*items),
+                                                                                     attribute_codes))]
+
+
+def _read_csv_chunks(path: Path, columns: list[str], chunk_size: int) -> Iterator[dict[str, list[str]]]:
+    with open(path, newline='', encoding='utf-8-sig') as attendee_file:
+        reader = csv.reader(attendee_file)
+        header = next(reader)
+        indexes = [header.index(column) for column in columns]
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if len(rows) == 0:
+                return
+            # blank lines are skipped, and missing trailing fields are empty
+            rows = [row for row in rows if len(row) > 0]
+            yield {column: [row[index] if index < len(row) else '' for row in rows]
+                   for column, index in zip(columns, indexes)}
+
+
+def _parquet_columns(path: Path) -> list[str]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Reading Parquet attendee files needs pyarrow (pip install pyarrow)')
+    return pq.ParquetFile(path).schema_arrow.names
+
+
+def _read_parquet_chunks(path: Path, columns: list[str], chunk_size: int) -> Iterator[dict[str, list[str]]]:
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+        yield {column: [str(value) for value in batch.column(column).to_pylist()] for column in columns}
@@ -0,0 +1,75 @@
+import csv
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from src.parameters.parameters import Parameters
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def read_table_assignments(parameters: Parameters, path: Path) -> dict[str, int]:
+    """Table (0 for the first table) of each attendee ID in a table assignments file written by the model"""
+    with open(path, newline='', encoding='utf-8-sig') as assignments_file:
+        reader = csv.DictReader(assignments_file)
+        if reader.fieldnames is None or 'Table' not in reader.fieldnames or \
+                parameters.id_field_name not in reader.fieldnames:
+            raise ValueError(f'Expected the columns Table and {parameters.id_field_name} in {path}')
+        return {row[parameters.id_field_name].strip(): int(row['Table']) - 1 for row in reader}
+
+
+def read_roster_changes(parameters: Parameters, table_assignments_path: Path,
+                        roster_changes_path: Path) -> tuple['pd.DataFrame', dict[str, int], set[str]]:
+    """Apply a file of roster changes to the attendees of a table assignments file written by the model.
+
+    The roster changes file has a Change column (add, remove or change), the ID field and, for added and changed
+    attendees, the name and attribute fields.  Blank fields of a changed attendee keep their previous value, and an
+    added attendee must have every attribute field.
+    Returns the new attendees (with the columns of the attendee file), the previous table (0 for the first table) of
+    each previous attendee ID, and the IDs that were added, removed or changed.
+    """
+    import pandas as pd
+    id_field, name_field = parameters.id_field_name, parameters.name_field_name
+    columns = [id_field, name_field] + parameters.attribute_field_names
+    previous_df = pd.read_csv(table_assignments_path, dtype=str).rename(columns={'NAME': name_field})
+    previous_table_by_id = {attendee_id.strip(): int(table) - 1
+                            for attendee_id, table in zip(previous_df[id_field], previous_df['Table'])}
+    roster = {attendee_id.strip(): row for attendee_id, row in zip(previous_df[id_field],
+                                                                   previous_df[columns].to_dict('records'))}
+
+    changes_df = pd.read_csv(roster_changes_path, dtype=str)
+    if 'Change' not in changes_df.columns or id_field not in changes_df.columns:
+        raise ValueError(f'Expected the columns Change and {id_field} in {roster_changes_path}')
+    changed_ids: set[str] = set()
+    for change in changes_df.to_dict('records'):
+        attendee_id = str(change[id_field]).strip()
+        kind = str(change['Change']).strip().lower()
+        if kind == 'remove':
+            if roster.pop(attendee_id, None) is None:
+                logger.warning(f'Attendee {attendee_id} to be removed is not in {table_assignments_path}')
+        elif kind in ('add', 'change'):
+            if kind == 'change' and attendee_id not in roster:
+                raise ValueError(f'Attendee {attendee_id} to be changed is not in {table_assignments_path}')
+            if kind == 'add' and attendee_id in roster:
+                raise ValueError(f'Attendee {attendee_id} to be added is already in {table_assignments_path}')
+            if kind == 'add':
+                missing = [column for column in parameters.attribute_field_names
+                           if column not in change or pd.isna(change[column])]
+                if len(missing) > 0:
+                    raise ValueError(f'Attendee {attendee_id} to be added has no {", ".join(missing)} in '
+                                     f'{roster_changes_path}')
+            row = roster.get(attendee_id, {column: '' for column in columns})
+            roster[attendee_id] = {column: change[column] if column in change and not pd.isna(change[column])
+                                   else row[column] for column in columns}
+            roster[attendee_id][id_field] = attendee_id
+        else:
+            raise ValueError(f'Unknown change {change["Change"]} for attendee {attendee_id}, '
+                             'expected add, remove or change')
+        changed_ids.add(attendee_id)
+    logger.info(f'Roster changes: {len(changed_ids)} attendees added, removed or changed, '
+                f'{len(roster)} attendees')
+
+    return pd.DataFrame(list(roster.values()), columns=columns), previous_table_by_id, changed_ids
@@ -1,18 +1,30 @@
 from typing import Union, Optional, TYPE_CHECKING
 
+import numpy as np
+
 if TYPE_CHECKING:
     from src.entity.table import Table
 
 
 class Attendee:
-    class_item_id: int = 0
-
-    def __init__(self, _id: Union[str, int], name: str, attributes: dict[str, str]):
-        self.item_id: int = Attendee.class_item_id   # internal to this program
-        Attendee.class_item_id += 1
+    # no per-instance __dict__, which matters for rosters of 100,000 attendees
+    __slots__ = ('item_id', 'id', 'name', 'attributes', 'codes', 'profile_id', 'previous_table_id',
+                 'assigned_to_table', 'best_assignment', 'best_penalty_assignment')
+
+    def __init__(self, item_id: int, _id: Union[str, int], name: str, attributes: dict[str, str], codes: np.ndarray):
+        # internal to this program, the position of the attendee in the roster, so that the attendees of a roster
+        # hash the same whatever else was read in the process
+        self.item_id: int = item_id
         self.id: Union[str, int] = _id         # comes from data input
         self.name: str = name
         self.attributes: dict[str, str] = attributes
+        # integer code of each attribute (in attribute_field_names order); each (attribute type, item) pair
+        # has its own code, so the codes index the columns of Problem.counts
+        self.codes: np.ndarray = codes
+        # attendees with identical codes share a profile, set by Problem
+        self.profile_id: int = -1
+        # table of the attendee in an earlier arrangement, moving them elsewhere costs Problem.movement_penalty
+        self.previous_table_id: Optional[int] = None
         self.assigned_to_table: Optional[Table] = None
         self.best_assignment: Optional[Table] = None
         self.best_penalty_assignment: Optional[Table] = None
@@ -27,6 +39,18 @@ class Attendee:
     def move_assignment_to_best_penalty(self):
         self.best_penalty_assignment = self.assigned_to_table
 
+    def __getstate__(self):
+        # table references are not pickled (e.g. when sent to another process), the tables are rebuilt there
+        state = {slot: getattr(self, slot) for slot in Attendee.__slots__}
+        state['assigned_to_table'] = None
+        state['best_assignment'] = None
+        state['best_penalty_assignment'] = None
+        return state
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
     def __hash__(self):
         return hash(self.item_id)
 
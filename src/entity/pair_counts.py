@@ -0,0 +1,69 @@
+from typing import Iterable
+
+import numpy as np
+
+
+class PairCounts:
+    """Number of times each pair of attendees shared a table in some arrangements, by attendee item_id.
+
+    Each attendee only meets the others at their table, so the counts are kept as sparse rows: the partners of
+    attendee a are partners[indptr[a]:indptr[a + 1]] (sorted) and the number of times they met is in counts.  This
+    takes memory in proportion to attendees x table size x arrangements rather than attendees squared.
+    """
+    def __init__(self, num_attendees: int, table_ids_by_arrangement: Iterable[np.ndarray]):
+        """table_ids_by_arrangement has, for each arrangement, the table of each attendee (by item_id)"""
+        self.num_attendees = num_attendees
+        self._count_pairs(members for table_ids in table_ids_by_arrangement for members in _tables_of(table_ids))
+
+    @classmethod
+    def from_groups(cls, num_attendees: int, groups: Iterable[np.ndarray]) -> 'PairCounts':
+        """Number of groups (arrays of item_ids) each pair of attendees shares"""
+        pair_counts = cls(num_attendees, [])
+        pair_counts._count_pairs(groups)
+        return pair_counts
+
+    def _count_pairs(self, groups: Iterable[np.ndarray]) -> None:
+        num_attendees = self.num_attendees
+        rows: list[np.ndarray] = [np.zeros(0, dtype=np.int64)]
+        columns: list[np.ndarray] = [np.zeros(0, dtype=np.int64)]
+        for members in groups:
+            row, column = np.meshgrid(members, members, indexing='ij')
+            different = row != column
+            rows.append(row[different])
+            columns.append(column[different])
+        pairs, pair_counts = np.unique(np.concatenate(rows) * num_attendees + np.concatenate(columns),
+                                       return_counts=True)
+        self.partners: np.ndarray = pairs % num_attendees
+        self.counts: np.ndarray = np.minimum(pair_counts, np.iinfo(np.uint8).max).astype(np.uint8)
+        self.indptr: np.ndarray = np.r_[0, np.cumsum(np.bincount(pairs // num_attendees, minlength=num_attendees))]
+
+    def row(self, item_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """The attendees the attendee met and how many times"""
+        start, end = self.indptr[item_id], self.indptr[item_id + 1]
+        return self.partners[start:end], self.counts[start:end]
+
+    def block(self, item_ids1: np.ndarray, item_ids2: np.ndarray) -> np.ndarray:
+        """Number of times each of item_ids1 (rows) met each of item_ids2 (columns)"""
+        block = np.zeros((len(item_ids1), len(item_ids2)), dtype=np.int64)
+        for index, item_id in enumerate(item_ids1):
+            partners, counts = self.row(item_id)
+            positions = np.minimum(np.searchsorted(partners, item_ids2), max(len(partners) - 1, 0))
+            if len(partners) > 0:
+                block[index] = np.where(partners[positions] == item_ids2, counts[positions], 0)
+        return block
+
+    def num_repeated_pairs(self) -> int:
+        """Number of pairs of attendees that met more than once"""
+        return int((self.counts > 1).sum()) // 2
+
+    def num_repeats(self) -> int:
+        """Number of times pairs of attendees met again, sum over pairs of (times met - 1)"""
+        return int((self.counts[self.counts > 1].astype(np.int64) - 1).sum()) // 2
+
+
+def _tables_of(table_ids: np.ndarray) -> list[np.ndarray]:
+    """The item_ids of the attendees at each table of an arrangement"""
+    order = np.argsort(table_ids, kind='stable')
+    sorted_table_ids = np.asarray(table_ids)[order]
+    starts = np.flatnonzero(np.r_[True, sorted_table_ids[1:] != sorted_table_ids[:-1]])
+    return np.split(order, starts[1:])
@@ -0,0 +1,340 @@
+from typing import Collection, Sequence, Optional, TYPE_CHECKING
+from collections import defaultdict
+from math import ceil
+import datetime
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.pair_counts import PairCounts
+from src.entity.seating_constraints import SeatingConstraints, has_seating_constraints
+from src.util.profiling import profiler
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.entity.table import Table
+
+
+class Problem:
+    """Everything about one seating problem that its tables share: the scoring parameters, the arrays indexed by the
+    attendee codes, the counts of every table, and the clock of the run.
+
+    Each Table belongs to one Problem, so several problems can be solved in the same process.
+    """
+    # beyond this many profiles the profile_interaction matrix is not kept, the rows needed are computed when scoring
+    max_profiles_for_interaction_matrix: int = 2000
+
+    def __init__(self, parameters: Parameters, attendees: Collection[Attendee],
+                 start_time: Optional[datetime.datetime] = None, num_tables: Optional[int] = None):
+        """num_tables defaults to the fewest tables of max_table_size that seat the attendees"""
+        # max_run_time_seconds is measured from start_time, and stop_execution is set on ctrl-c
+        self.start_time: datetime.datetime = datetime.datetime.now() if start_time is None else start_time
+        self.stop_execution: bool = False
+
+        self.default_different_score: float = parameters.default_sameness_score
+        # added to the score for each attendee seated away from their previous_table_id (set_movement_penalty)
+        self.movement_penalty: float = 0.0 if parameters.movement_penalty is None else parameters.movement_penalty
+        # added to the score for each pair of attendees at a table for each time they met before (set_earlier_pairs)
+        self.repeat_pair_penalty: float = parameters.repeat_pair_penalty
+        self.attribute_types: list[str] = parameters.attribute_field_names.copy()
+        self.attribute_type_weights: dict[str, float] = {attribute_name: parameters.default_quadratic_penalty
+                                                         if attribute_name not in parameters.override_quadratic_penalty
+                                                         else parameters.override_quadratic_penalty[attribute_name]
+                                                         for attribute_name in self.attribute_types}
+        self.override_different_score: dict[tuple[str, str, str, str], float] = dict()
+        for attribute_type_1, item1, attribute_type_2, item2, score in parameters.override_sameness_score:
+            self.override_different_score[(attribute_type_1, item1,
+                                           attribute_type_2, item2)] = score
+
+        num_attendees = len(attendees)
+        self.num_tables: int = ceil(num_attendees / parameters.max_table_size) if num_tables is None else num_tables
+
+        self.attribute_counter: dict[str, defaultdict] = {attribute_type: defaultdict(int)
+                                                          for attribute_type in parameters.attribute_field_names}
+        for attendee in attendees:
+            attendee.assigned_to_table = None
+            for attribute_type, item in attendee.attributes.items():
+                self.attribute_counter[attribute_type][item] += 1
+
+        self.upper_bound_by_item: dict[str, dict[str, int]] = {attribute_name: {item: ceil(count / self.num_tables)
+                                                                                for item, count in item_counts.items()}
+                                                               for attribute_name, item_counts in
+                                                               self.attribute_counter.items()}
+
+        self._initialize_arrays(attendees)
+        # hard constraints, None if there are none so that the moves do not check them
+        self.constraints: Optional[SeatingConstraints] = \
+            SeatingConstraints(parameters, attendees, self.num_tables) if has_seating_constraints(parameters) else None
+
+    def _initialize_arrays(self, attendees: Collection[Attendee]):
+        # array versions of the above, indexed by the attendee codes (one code per (attribute type, item) pair)
+        num_codes = 1 + max((int(attendee.codes.max()) for attendee in attendees), default=-1)
+        self.items_by_code: list[tuple[str, str]] = [('', '')] * num_codes
+        for attendee in attendees:
+            for attribute_type, code in zip(self.attribute_types, attendee.codes):
+                self.items_by_code[code] = (attribute_type, attendee.attributes[attribute_type])
+        self.code_by_item: dict[tuple[str, str], int] = {item: code for code, item in enumerate(self.items_by_code)}
+
+        # codes that no attendee has (e.g. when the attendees are part of a larger roster) weigh nothing
+        self.weight_by_code: np.ndarray = np.array([self.attribute_type_weights.get(attribute_type, 0.0)
+                                                    for attribute_type, _ in self.items_by_code], dtype=float)
+        self.upper_bound_by_code: np.ndarray = np.array([self.upper_bound_by_item.get(attribute_type, {}).get(item, 0)
+                                                         for attribute_type, item in self.items_by_code],
+                                                        dtype=np.int64)
+
+        # override_matrix[code1, code2] is the override_different_score of (attribute 1, item 1, attribute 2, item 2)
+        self.override_matrix: np.ndarray = np.zeros((num_codes, num_codes))
+        for (attribute_type_1, item1, attribute_type_2, item2), score in self.override_different_score.items():
+            # overrides of items that no attendee has can never apply
+            if (attribute_type_1, item1) in self.code_by_item and (attribute_type_2, item2) in self.code_by_item:
+                self.override_matrix[self.code_by_item[(attribute_type_1, item1)],
+                                     self.code_by_item[(attribute_type_2, item2)]] += score
+
+        # number of attendees with each code (columns) at each table (rows)
+        self.counts: np.ndarray = np.zeros((self.num_tables, num_codes), dtype=np.int64)
+        # score() of each table and its marginal_scores_by_code, kept until an attendee is added to or removed from
+        # the table (table_changed)
+        self.cached_scores: np.ndarray = np.zeros(self.num_tables)
+        self.score_is_cached: np.ndarray = np.zeros(self.num_tables, dtype=bool)
+        self.cached_marginal_scores_by_code: np.ndarray = np.zeros((self.num_tables, num_codes))
+        self.marginal_scores_are_cached: np.ndarray = np.zeros(self.num_tables, dtype=bool)
+        # sum of the pair_with_itself of the attendees at each table
+        self.pair_with_itself_by_table: np.ndarray = np.zeros(self.num_tables)
+        # number of attendees at each table seated away from their previous_table_id
+        self.moved_by_table: np.ndarray = np.zeros(self.num_tables, dtype=np.int64)
+        # times the pairs of attendees at each table met before, and met_by_table[table, item_id] the times the
+        # attendee met those at the table, only kept once set_earlier_pairs is called
+        self.earlier_pairs: Optional[PairCounts] = None
+        self.met_by_table: Optional[np.ndarray] = None
+        self.repeats_by_table: np.ndarray = np.zeros(self.num_tables, dtype=np.int64)
+
+        self._initialize_profiles(attendees)
+
+    def _initialize_profiles(self, attendees: Collection[Attendee]):
+        # attendees with identical codes share a profile; profile_codes has the codes of each profile (rows)
+        profile_by_codes: dict[tuple[int, ...], int] = dict()
+        for attendee in attendees:
+            attendee.profile_id = profile_by_codes.setdefault(tuple(attendee.codes.tolist()), len(profile_by_codes))
+        self.profile_codes: np.ndarray = np.array(list(profile_by_codes.keys()), dtype=np.int64).reshape(
+            len(profile_by_codes), len(self.attribute_types))
+
+        num_profiles = len(self.profile_codes)
+        # number of attendees with each profile
+        self.num_by_profile: np.ndarray = np.bincount([attendee.profile_id for attendee in attendees],
+                                                      minlength=num_profiles)
+        # profile_interaction[profile1, profile2] is the sameness and override score of a pair of attendees with these
+        # profiles (on the diagonal, the score of the pair of an attendee with itself).  Only kept if there are at
+        # most max_profiles_for_interaction_matrix profiles.
+        self.profile_interaction: Optional[np.ndarray]
+        # sameness and override score of the pair of an attendee with itself, by profile
+        self.pair_with_itself: np.ndarray
+        if num_profiles <= self.max_profiles_for_interaction_matrix:
+            self.profile_interaction = self._compute_profile_interaction(np.arange(num_profiles))
+            self.pair_with_itself = np.diagonal(self.profile_interaction).copy()
+        else:
+            self.profile_interaction = None
+            self.pair_with_itself = np.array([self._compute_profile_interaction(np.array([profile]))[0, 0]
+                                              for profile in range(num_profiles)])
+        # increase in score() from the pair of an attendee with itself and the attendee's own counts, by profile
+        self.profile_self_score: np.ndarray = (self.weight_by_code[self.profile_codes].sum(axis=1) +
+                                               self.pair_with_itself)
+
+    def elapsed_seconds(self) -> float:
+        """Seconds since start_time"""
+        return (datetime.datetime.now() - self.start_time).total_seconds()
+
+    def set_earlier_pairs(self, earlier_pairs: Optional[PairCounts]) -> None:
+        """Add repeat_pair_penalty to the score for each pair of attendees at a table for each time they met before,
+        as counted by earlier_pairs (None to stop).  The tables must be empty.
+        """
+        if self.counts.any():
+            raise ValueError('The earlier pairs can only be set while the tables are empty')
+        self.earlier_pairs = earlier_pairs
+        self.met_by_table = None if earlier_pairs is None else \
+            np.zeros((self.num_tables, earlier_pairs.num_attendees), dtype=np.int32)
+        self.repeats_by_table[:] = 0
+        self.score_is_cached[:] = False
+
+    def set_movement_penalty(self, movement_penalty: float) -> None:
+        """Change the movement_penalty, which changes the scores of the tables with moved attendees"""
+        self.movement_penalty = movement_penalty
+        self.score_is_cached[:] = False
+
+    def table_changed(self, table_id: int) -> None:
+        """Drop the cached score and marginal scores of the table, when an attendee is added to or removed from it"""
+        self.score_is_cached[table_id] = False
+        self.marginal_scores_are_cached[table_id] = False
+
+    def update_earlier_pairs(self, table_id: int, attendee: Attendee, change: int) -> None:
+        """Keep met_by_table and repeats_by_table up to date when the attendee is added to (change 1) or removed from
+        (change -1) the table"""
+        met = self.met_by_table[table_id]
+        partners, counts = self.earlier_pairs.row(attendee.item_id)
+        if change > 0:
+            self.repeats_by_table[table_id] += met[attendee.item_id]
+            met[partners] += counts
+        else:
+            met[partners] -= counts
+            self.repeats_by_table[table_id] -= met[attendee.item_id]
+
+    def stop(self, _signum=None, _frame=None) -> None:
+        """Stop optimizing after the current iteration, keeping the best answer so far (usable as a signal handler)"""
+        self.stop_execution = True
+
+    def _compute_profile_interaction(self, profiles1: np.ndarray, profiles2: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sameness and override score of a pair of attendees for each pair of profiles1 (rows) and profiles2"""
+        indicators1 = self._profile_indicators(profiles1)
+        indicators2 = indicators1 if profiles2 is None else self._profile_indicators(profiles2)
+        interaction = self.default_different_score * (indicators1 @ indicators2.T)
+        if self.override_matrix.any():
+            interaction += (indicators1 @ self.override_matrix @ indicators2.T +
+                            indicators1 @ self.override_matrix.T @ indicators2.T)
+        return interaction
+
+    def _profile_indicators(self, profiles: np.ndarray) -> np.ndarray:
+        indicators = np.zeros((len(profiles), len(self.items_by_code)))
+        np.put_along_axis(indicators, self.profile_codes[profiles], 1.0, axis=1)
+        return indicators
+
+    def profile_interaction_block(self, profiles1: np.ndarray, profiles2: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sub-matrix of profile_interaction for profiles1 (rows) and profiles2 (columns, profiles1 if not given)"""
+        if self.profile_interaction is not None:
+            return self.profile_interaction[np.ix_(profiles1, profiles1 if profiles2 is None else profiles2)]
+        return self._compute_profile_interaction(profiles1, profiles2)
+
+    def pair_score_matrix(self, attendees1: Sequence[Attendee], attendees2: Sequence[Attendee]) -> np.ndarray:
+        """Score of each pair of attendees1 (rows) and attendees2 (columns) when they are at the same table.
+
+        A table's score() is the sum of the pair scores of all pairs of different attendees at the table plus, for
+        each attendee, profile_self_score.  The pair score includes the cross term of the quadratic penalty.
+        """
+        profiles1 = np.array([attendee.profile_id for attendee in attendees1], dtype=np.int64)
+        profiles2 = np.array([attendee.profile_id for attendee in attendees2], dtype=np.int64)
+        quadratic = 2 * (self._profile_indicators(profiles1) * self.weight_by_code) @ \
+            self._profile_indicators(profiles2).T
+        return quadratic + self.profile_interaction_block(profiles1, profiles2)
+
+    def build_upper_bound_df(self) -> 'pd.DataFrame':
+        import pandas as pd
+        df = pd.DataFrame({'Upper_Bound': [upper_bound
+                                           for attribute_name, upper_bounds in self.upper_bound_by_item.items()
+                                           for item, upper_bound in upper_bounds.items()]},
+                          index=[[attribute_name for attribute_name, upper_bounds in self.upper_bound_by_item.items()
+                                  for _ in upper_bounds.keys()],
+                                 [item for attribute_name, upper_bounds in self.upper_bound_by_item.items()
+                                  for item in upper_bounds.keys()]
+                                 ])
+
+        return df
+
+    def scores_by_table(self) -> np.ndarray:
+        """score() of every table, only computing those of the tables changed since they were last computed"""
+        changed = np.flatnonzero(~self.score_is_cached)
+        profiler.count('Problem.scores_by_table.cache_hit', self.num_tables - len(changed))
+        profiler.count('Problem.scores_by_table.cache_miss', len(changed))
+        if len(changed) > 0:
+            self.cached_scores[changed] = self._compute_scores(changed)
+            self.score_is_cached[changed] = True
+        return self.cached_scores.copy()
+
+    def total_score(self) -> float:
+        """Sum of score() over all the tables"""
+        return float(self.scores_by_table().sum())
+
+    def _compute_scores(self, table_ids: np.ndarray) -> np.ndarray:
+        """score() of the tables, computed from their counts at once.
+
+        Summed over every ordered pair of attendees at a table (including an attendee with itself), the sameness
+        scores add up to default_different_score * counts @ counts and the overrides to 2 * counts @ override @ counts,
+        so the pairs of different attendees only need the counts and the pairs of an attendee with itself.
+        """
+        counts = self.counts[table_ids]
+        scores = (counts * counts) @ (self.weight_by_code + self.default_different_score / 2)
+        if self.override_matrix.any():
+            scores += ((counts @ self.override_matrix) * counts).sum(axis=1)
+        return scores + self.pair_with_itself_by_table[table_ids] / 2 + \
+            self.movement_penalty * self.moved_by_table[table_ids] + \
+            self.repeat_pair_penalty * self.repeats_by_table[table_ids]
+
+    def upper_bound_violations_by_table(self) -> np.ndarray:
+        """upper_bound_violations() of every table"""
+        return np.maximum(0, self.counts - self.upper_bound_by_code).sum(axis=1)
+
+    def marginal_score_matrix(self, attendees: Sequence[Attendee], counts: np.ndarray) -> np.ndarray:
+        """Increase in score() for each attendee (rows) if added to a table with each row of counts (columns).
+
+        Every pair of attendees at a table (including an attendee with itself) adds the sameness score for each
+        attribute type they share and the overrides in both directions.  So the attendee contributes one pair with
+        each of the attendees already at the table plus the pair with itself, which only needs the table counts.
+        """
+        return self._marginal_score_matrix(attendees, self._marginal_scores_by_code(counts))
+
+    def marginal_score_matrix_of_tables(self, attendees: Sequence[Attendee], table_ids: np.ndarray) -> np.ndarray:
+        """marginal_score_matrix with the counts of the tables, from their cached marginal_scores_by_code"""
+        return self._marginal_score_matrix(attendees, self.marginal_scores_by_code(table_ids))
+
+    def _marginal_score_matrix(self, attendees: Sequence[Attendee], score_by_code: np.ndarray) -> np.ndarray:
+        profiler.count('Problem.marginal_score_matrix')
+        # attendees with the same profile have the same marginal scores, so only compute them once per profile
+        profiles, profile_index = np.unique(np.array([attendee.profile_id for attendee in attendees], dtype=np.int64),
+                                            return_inverse=True)
+        codes = self.profile_codes[profiles]
+        marginal_scores = score_by_code.T[codes].sum(axis=1) + self.profile_self_score[profiles][:, None]
+        return marginal_scores[profile_index.reshape(-1)]
+
+    def _marginal_scores_by_code(self, counts: np.ndarray) -> np.ndarray:
+        """Contribution of the attendees already at a table with each row of counts (rows) to the increase in score()
+        of an added attendee with each code (columns)"""
+        score_by_code = counts * (2 * self.weight_by_code + self.default_different_score)
+        if self.override_matrix.any():
+            score_by_code = score_by_code + counts @ (self.override_matrix + self.override_matrix.T)
+        return score_by_code
+
+    def marginal_scores_by_code(self, table_ids: np.ndarray) -> np.ndarray:
+        """_marginal_scores_by_code of the tables (rows), only computing those of the tables changed since they were
+        last computed.  An attendee's increase in score() at a table is the sum over their codes plus
+        profile_self_score."""
+        changed = np.unique(table_ids[~self.marginal_scores_are_cached[table_ids]])
+        profiler.count('Problem.marginal_scores_by_code.cache_hit', len(table_ids) - len(changed))
+        profiler.count('Problem.marginal_scores_by_code.cache_miss', len(changed))
+        if len(changed) > 0:
+            self.cached_marginal_scores_by_code[changed] = self._marginal_scores_by_code(self.counts[changed])
+            self.marginal_scores_are_cached[changed] = True
+        return self.cached_marginal_scores_by_code[table_ids]
+
+    def marginal_scores_if_attendees_are_added(self, attendees: Sequence[Attendee],
+                                               tables: Sequence['Table']) -> np.ndarray:
+        """Increase in score() for each attendee (rows) if added to each table (columns), computed in one pass"""
+        table_ids = np.array([table.table_id for table in tables], dtype=np.int64)
+        marginal_scores = self.marginal_score_matrix_of_tables(attendees, table_ids)
+        if self.movement_penalty != 0:
+            marginal_scores += self.movement_penalty_matrix(attendees, table_ids)
+        if self.met_by_table is not None:
+            marginal_scores += self.repeat_penalty_matrix(attendees, table_ids)
+        return marginal_scores
+
+    def marginal_scores_if_units_are_added(self, units: Sequence[Sequence[Attendee]],
+                                           tables: Sequence['Table']) -> np.ndarray:
+        """Increase in score() for each unit of attendees seated together (rows) if added to each table (columns), inf
+        where the seating constraints forbid it.  The pairs within a unit score the same at every table, so they are
+        left out."""
+        members = [attendee for unit in units for attendee in unit]
+        unit_index = np.repeat(np.arange(len(units)), [len(unit) for unit in units])
+        marginal_scores = np.zeros((len(units), len(tables)))
+        np.add.at(marginal_scores, unit_index, self.marginal_scores_if_attendees_are_added(members, tables))
+        if self.constraints is not None:
+            table_ids = np.array([table.table_id for table in tables], dtype=np.int64)
+            marginal_scores[self.constraints.forbidden(units, table_ids)] = np.inf
+        return marginal_scores
+
+    def movement_penalty_matrix(self, attendees: Sequence[Attendee], table_ids: np.ndarray) -> np.ndarray:
+        """movement_penalty for each attendee (rows) with a previous table if seated at each table (columns)"""
+        previous_table_ids = np.array([-1 if attendee.previous_table_id is None else attendee.previous_table_id
+                                       for attendee in attendees], dtype=np.int64)[:, None]
+        return self.movement_penalty * ((previous_table_ids >= 0) & (previous_table_ids != table_ids[None, :]))
+
+    def repeat_penalty_matrix(self, attendees: Sequence[Attendee], table_ids: np.ndarray) -> np.ndarray:
+        """repeat_pair_penalty times the times each attendee (rows) met those at each table (columns) before"""
+        item_ids = np.array([attendee.item_id for attendee in attendees], dtype=np.int64)
+        return self.repeat_pair_penalty * self.met_by_table[np.ix_(table_ids, item_ids)].T
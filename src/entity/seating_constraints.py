@@ -0,0 +1,192 @@
+import logging
+from collections import defaultdict
+from typing import Collection, Sequence
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.pair_counts import PairCounts
+
+logger = logging.getLogger(__name__)
+
+
+def has_seating_constraints(parameters: Parameters) -> bool:
+    return len(parameters.pinned_seats) > 0 or len(parameters.sit_together) > 0 or len(parameters.sit_apart) > 0
+
+
+class SeatingConstraints:
+    """Hard constraints on the arrangements of a problem, by attendee item_id: attendees pinned to a table
+    (pinned_seats), groups that sit at one table (sit_together) and groups no two of whom share a table (sit_apart).
+
+    They are kept by the moves rather than through the score.  A group is seated as one unit, pinned attendees and
+    groups are never swapped, and a table where an attendee would join someone they must sit apart from is not
+    offered to them.  apart_by_table[table, apart_index[item_id]] is the number of attendees at the table the attendee
+    must sit apart from, kept up to date by Table.add_attendee and Table.remove_attendee.
+    """
+    def __init__(self, parameters: Parameters, attendees: Collection[Attendee], num_tables: int):
+        num_attendees = 1 + max((attendee.item_id for attendee in attendees), default=-1)
+        attendee_by_id = {str(attendee.id).strip(): attendee for attendee in attendees}
+        constraint_ids = {str(attendee_id).strip() for attendee_id in parameters.pinned_seats.keys()}.union(
+            str(attendee_id).strip() for group in parameters.sit_together + parameters.sit_apart
+            for attendee_id in group)
+        unknown_ids = sorted(constraint_ids - attendee_by_id.keys())
+        if len(unknown_ids) > 0:
+            logger.warning(f'Seating constraints of attendees {unknown_ids} not in the attendee file are ignored')
+
+        def known_attendees(attendee_ids) -> list[Attendee]:
+            return [attendee_by_id[str(attendee_id).strip()] for attendee_id in attendee_ids
+                    if str(attendee_id).strip() in attendee_by_id]
+
+        errors = ''
+        # groups sharing an attendee are merged
+        parent = list(range(num_attendees))
+
+        def root(item_id: int) -> int:
+            while parent[item_id] != item_id:
+                parent[item_id] = parent[parent[item_id]]
+                item_id = parent[item_id]
+            return item_id
+
+        grouped: dict[int, Attendee] = dict()
+        for group in parameters.sit_together:
+            members = known_attendees(group)
+            for attendee in members:
+                grouped[attendee.item_id] = attendee
+                parent[root(attendee.item_id)] = root(members[0].item_id)
+        members_by_root: dict[int, list[Attendee]] = defaultdict(list)
+        for item_id in sorted(grouped.keys()):
+            members_by_root[root(item_id)].append(grouped[item_id])
+        # the attendees of each group, and the group (index in groups) of each attendee, -1 if none
+        self.groups: list[list[Attendee]] = [members for members in members_by_root.values() if len(members) > 1]
+        self.group_by_item_id: np.ndarray = np.full(num_attendees, -1, dtype=np.int64)
+        for group_index, members in enumerate(self.groups):
+            self.group_by_item_id[[attendee.item_id for attendee in members]] = group_index
+            if len(members) > parameters.max_table_size:
+                errors += f'  - the group {[attendee.id for attendee in members]} has more than max_table_size ' \
+                          f'attendees\n'
+
+        # table (0 for the first table) of each pinned attendee, -1 if not pinned; groups sit at the table of any
+        # pinned member
+        self.pinned_table: np.ndarray = np.full(num_attendees, -1, dtype=np.int64)
+        for attendee_id, table_number in parameters.pinned_seats.items():
+            for attendee in known_attendees([attendee_id]):
+                if not 1 <= int(table_number) <= num_tables:
+                    errors += f'  - attendee {attendee.id} is pinned to table {table_number}, there are ' \
+                              f'{num_tables} tables\n'
+                else:
+                    self.pinned_table[attendee.item_id] = int(table_number) - 1
+        for members in self.groups:
+            item_ids = [attendee.item_id for attendee in members]
+            pinned_tables = set(self.pinned_table[item_ids].tolist()) - {-1}
+            if len(pinned_tables) > 1:
+                errors += f'  - the group {[attendee.id for attendee in members]} is pinned to more than one table\n'
+            elif len(pinned_tables) == 1:
+                self.pinned_table[item_ids] = pinned_tables.pop()
+        num_pinned_by_table = np.bincount(self.pinned_table[self.pinned_table >= 0], minlength=num_tables)
+        for table_id in np.flatnonzero(num_pinned_by_table > parameters.max_table_size):
+            errors += f'  - more than max_table_size attendees are pinned to table {table_id + 1}\n'
+
+        # attendees that must sit apart from someone are numbered by apart_index (-1 for the others)
+        apart_groups = [np.unique([attendee.item_id for attendee in known_attendees(group)])
+                        for group in parameters.sit_apart]
+        apart_groups = [item_ids for item_ids in apart_groups if len(item_ids) > 1]
+        apart_item_ids = np.unique(np.concatenate(apart_groups)) if len(apart_groups) > 0 else \
+            np.zeros(0, dtype=np.int64)
+        self.apart_index: np.ndarray = np.full(num_attendees, -1, dtype=np.int64)
+        self.apart_index[apart_item_ids] = np.arange(len(apart_item_ids))
+        self.apart_pairs: PairCounts = PairCounts.from_groups(len(apart_item_ids),
+                                                              [self.apart_index[item_ids] for item_ids in apart_groups])
+        self.apart_by_table: np.ndarray = np.zeros((num_tables, len(apart_item_ids)), dtype=np.int32)
+        id_by_item_id = {attendee.item_id: attendee.id for attendee in attendees}
+        for item_ids in apart_groups:
+            groups, pinned_tables = self.group_by_item_id[item_ids], self.pinned_table[item_ids]
+            if len(np.unique(groups[groups >= 0])) < (groups >= 0).sum():
+                errors += f'  - attendees of the group {[id_by_item_id[item_id] for item_id in item_ids.tolist()]} ' \
+                          f'must sit apart and together\n'
+            if len(np.unique(pinned_tables[pinned_tables >= 0])) < (pinned_tables >= 0).sum():
+                errors += f'  - attendees of the group {[id_by_item_id[item_id] for item_id in item_ids.tolist()]} ' \
+                          f'must sit apart and are pinned to the same table\n'
+
+        if len(errors) > 0:
+            raise ValueError('Illegal seating constraints\n' + errors)
+        # attendees that may be swapped one for one: neither pinned nor in a group
+        self.free: np.ndarray = (self.pinned_table < 0) & (self.group_by_item_id < 0)
+
+    def update(self, table_id: int, attendee: Attendee, change: int) -> None:
+        """Keep apart_by_table up to date when the attendee is added to (change 1) or removed from (change -1) the
+        table"""
+        index = self.apart_index[attendee.item_id]
+        if index < 0:
+            return
+        partners, counts = self.apart_pairs.row(index)
+        if change > 0:
+            self.apart_by_table[table_id, partners] += counts
+        else:
+            self.apart_by_table[table_id, partners] -= counts
+
+    def units(self, attendees: Sequence[Attendee]) -> list[list[Attendee]]:
+        """The attendees split into the units that are seated together: each group, and each other attendee alone"""
+        units: list[list[Attendee]] = list()
+        unit_by_group: dict[int, list[Attendee]] = dict()
+        for attendee in attendees:
+            group = int(self.group_by_item_id[attendee.item_id])
+            if group < 0:
+                units.append([attendee])
+            elif group in unit_by_group:
+                unit_by_group[group].append(attendee)
+            else:
+                unit_by_group[group] = [attendee]
+                units.append(unit_by_group[group])
+        return units
+
+    def movable(self, attendees: Sequence[Attendee]) -> list[Attendee]:
+        """The attendees without the pinned ones and with the rest of the group of each grouped one"""
+        movable_attendees: list[Attendee] = list()
+        seen: set[int] = set()
+        for attendee in attendees:
+            if self.pinned_table[attendee.item_id] >= 0 or attendee.item_id in seen:
+                continue
+            group = self.group_by_item_id[attendee.item_id]
+            for member in [attendee] if group < 0 else self.groups[group]:
+                if member.item_id not in seen:
+                    seen.add(member.item_id)
+                    movable_attendees.append(member)
+        return movable_attendees
+
+    def forbidden(self, units: Sequence[Sequence[Attendee]], table_ids: np.ndarray) -> np.ndarray:
+        """Whether each unit (rows, not seated) may not be seated at each table (columns): a member is pinned to
+        another table or must sit apart from someone at the table"""
+        unit_index = np.repeat(np.arange(len(units)), [len(unit) for unit in units])
+        item_ids = np.array([attendee.item_id for unit in units for attendee in unit], dtype=np.int64)
+        pinned_tables = self.pinned_table[item_ids][:, None]
+        member_forbidden = (pinned_tables >= 0) & (pinned_tables != table_ids[None, :])
+        apart_indexes = self.apart_index[item_ids]
+        has_apart = apart_indexes >= 0
+        if has_apart.any():
+            member_forbidden[has_apart] |= self.apart_by_table[np.ix_(table_ids, apart_indexes[has_apart])].T > 0
+        forbidden = np.zeros((len(units), len(table_ids)), dtype=bool)
+        np.logical_or.at(forbidden, unit_index, member_forbidden)
+        return forbidden
+
+    def swap_forbidden(self, attendees1: Sequence[Attendee], attendees2: Sequence[Attendee],
+                       table_id1: int, table_id2: int) -> np.ndarray:
+        """Whether each attendee of table_id1 (rows) may not be swapped with each attendee of table_id2 (columns)"""
+        item_ids1 = np.array([attendee.item_id for attendee in attendees1], dtype=np.int64)
+        item_ids2 = np.array([attendee.item_id for attendee in attendees2], dtype=np.int64)
+        forbidden = ~self.free[item_ids1][:, None] | ~self.free[item_ids2][None, :]
+        apart_indexes1, apart_indexes2 = self.apart_index[item_ids1], self.apart_index[item_ids2]
+        has_apart1, has_apart2 = apart_indexes1 >= 0, apart_indexes2 >= 0
+        if not (has_apart1.any() or has_apart2.any()):
+            return forbidden
+        # those each attendee must sit apart from at the other table, except the attendee they swap with
+        apart_between = np.zeros((len(item_ids1), len(item_ids2)), dtype=np.int64)
+        apart_between[np.ix_(has_apart1, has_apart2)] = self.apart_pairs.block(apart_indexes1[has_apart1],
+                                                                               apart_indexes2[has_apart2])
+        apart_at_table2 = np.where(has_apart1, self.apart_by_table[table_id2, apart_indexes1], 0)
+        apart_at_table1 = np.where(has_apart2, self.apart_by_table[table_id1, apart_indexes2], 0)
+        return forbidden | (apart_at_table2[:, None] > apart_between) | (apart_at_table1[None, :] > apart_between)
+
+    def __repr__(self):
+        return f'{int((self.pinned_table >= 0).sum())} pinned attendees, {len(self.groups)} groups sitting together, ' \
+               f'{len(self.apart_pairs.counts) // 2} pairs sitting apart'
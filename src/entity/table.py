@@ -1,123 +1,122 @@
-from typing import Iterable, Collection
-from collections import defaultdict
-from math import ceil
+from typing import TYPE_CHECKING
 
-import pandas as pd
+import numpy as np
 
-from src.parameters.parameters import Parameters
 from src.entity.attendee import Attendee
+from src.util.profiling import profiler
+
+if TYPE_CHECKING:
+    from src.entity.problem import Problem
 
 
 class Table:
-    attribute_type_weights: dict[str, float] = dict()
-    attribute_types: Iterable[str] = list()
-    default_different_score: float = 0.0
-    override_different_score: dict[tuple[str, str, str, str], float] = dict()
-    num_tables: int = 0
-    upper_bound_by_item: dict[str, dict[str, int]] = dict()
-    attribute_counter: dict[str, defaultdict] = dict()
-
-    @classmethod
-    def initialize_parameters(cls, parameters: Parameters, attendees: Collection[Attendee]):
-        cls.default_different_score = parameters.default_sameness_score
-        cls.attribute_types = parameters.attribute_field_names.copy()
-        cls.attribute_type_weights = {attribute_name: parameters.default_quadratic_penalty
-                                      if attribute_name not in parameters.override_quadratic_penalty
-                                      else parameters.override_quadratic_penalty[attribute_name]
-                                      for attribute_name in cls.attribute_types}
-        for attribute_type_1, item1, attribute_type_2, item2, score in parameters.override_sameness_score:
-            cls.override_different_score[(attribute_type_1, item1,
-                                          attribute_type_2, item2)] = score
-
-        num_attendees = len(attendees)
-        cls.num_tables = ceil(num_attendees / parameters.max_table_size)
-
-        cls.attribute_counter: dict[str, defaultdict] = {attribute_type: defaultdict(int)
-                                                         for attribute_type in parameters.attribute_field_names}
-        for attendee in attendees:
-            attendee.assigned_to_table = None
-            for attribute_type, item in attendee.attributes.items():
-                cls.attribute_counter[attribute_type][item] += 1
-
-        cls.upper_bound_by_item: dict[str, dict[str, int]] = {attribute_name: {item: ceil(count / cls.num_tables)
-                                                                               for item, count in cls.attribute_counter[
-                                                                                   attribute_name].items()}
-                                                              for attribute_name, item_counts in
-                                                              cls.attribute_counter.items()}
-
-    @classmethod
-    def build_upper_bound_df(cls) -> pd.DataFrame:
-        df = pd.DataFrame({'Upper_Bound': [upper_bound
-                                           for attribute_name, upper_bounds in cls.upper_bound_by_item.items()
-                                           for item, upper_bound in upper_bounds.items()]},
-                          index=[[attribute_name for attribute_name, upper_bounds in cls.upper_bound_by_item.items()
-                                  for _ in upper_bounds.keys()],
-                                 [item for attribute_name, upper_bounds in cls.upper_bound_by_item.items()
-                                  for item in upper_bounds.keys()]
-                                 ])
-
-        return df
-
-    def __init__(self, table_id: int):
+    def __init__(self, table_id: int, problem: 'Problem'):
         self.table_id = table_id
+        # the problem the table belongs to, with the parameters and the counts of all its tables
+        self.problem = problem
 
         self.attendees: set[Attendee] = set()
-        # number of people at the table with specific attribute (e.g. Princeton) by attribute_type (e.g. Office)
-        self.num_by_attribute_value: dict[str, defaultdict[str, int]] = {attribute_name: defaultdict(int)
-                                                                         for attribute_name in Table.attribute_types}
+        # number of people at the table with each attendee code, a row of problem.counts
+        self.counts: np.ndarray = problem.counts[table_id]
+
+    @property
+    def num_by_attribute_value(self) -> dict[str, dict[str, int]]:
+        """number of people at the table with specific attribute (e.g. Princeton) by attribute_type (e.g. Office)"""
+        num_by_attribute_value: dict[str, dict[str, int]] = {attribute_name: dict()
+                                                             for attribute_name in self.problem.attribute_types}
+        for code in np.flatnonzero(self.counts):
+            attribute_type, item = self.problem.items_by_code[code]
+            num_by_attribute_value[attribute_type][item] = int(self.counts[code])
+        return num_by_attribute_value
 
     def add_attendee(self, attendee: Attendee):
         if attendee in self.attendees:
             raise ValueError('Attendee already at table')
         self.attendees.add(attendee)
         attendee.assigned_to_table = self
-        for attribute_type, attribute in attendee.attributes.items():
-            self.num_by_attribute_value[attribute_type][attribute] += 1
+        self.counts[attendee.codes] += 1
+        self.problem.table_changed(self.table_id)
+        self.problem.pair_with_itself_by_table[self.table_id] += self.problem.pair_with_itself[attendee.profile_id]
+        if attendee.previous_table_id is not None and attendee.previous_table_id != self.table_id:
+            self.problem.moved_by_table[self.table_id] += 1
+        if self.problem.earlier_pairs is not None:
+            self.problem.update_earlier_pairs(self.table_id, attendee, 1)
+        if self.problem.constraints is not None:
+            self.problem.constraints.update(self.table_id, attendee, 1)
 
     def remove_attendee(self, attendee: Attendee):
         if attendee not in self.attendees:
             raise AttributeError('Trying to remove an attendee not at a table')
         self.attendees.remove(attendee)
         attendee.assigned_to_table = None
-        for attribute_type, attribute in attendee.attributes.items():
-            self.num_by_attribute_value[attribute_type][attribute] -= 1
+        self.counts[attendee.codes] -= 1
+        self.problem.table_changed(self.table_id)
+        self.problem.pair_with_itself_by_table[self.table_id] -= self.problem.pair_with_itself[attendee.profile_id]
+        if attendee.previous_table_id is not None and attendee.previous_table_id != self.table_id:
+            self.problem.moved_by_table[self.table_id] -= 1
+        if self.problem.earlier_pairs is not None:
+            self.problem.update_earlier_pairs(self.table_id, attendee, -1)
+        if self.problem.constraints is not None:
+            self.problem.constraints.update(self.table_id, attendee, -1)
 
     def upper_bound_violations(self) -> float:
-        penalty = sum(max(0, count - Table.upper_bound_by_item[attribute_name][item])
-                      for attribute_name, item_counts in self.num_by_attribute_value.items()
-                      for item, count in item_counts.items()
-                      )
+        penalty = int(np.maximum(0, self.counts - self.problem.upper_bound_by_code).sum())
         return penalty
 
     def score(self) -> float:
-        penalty_score = 0.0
-        for attribute_type, attribute_count in self.num_by_attribute_value.items():
-            attribute_type_weight = Table.attribute_type_weights[attribute_type]
-            for count in attribute_count.values():
-                penalty_score += attribute_type_weight * count * count
-        for attendee1 in self.attendees:
-            for attendee2 in self.attendees:
-                if attendee1.item_id > attendee2.item_id:
-                    continue
-                for attribute_type_1 in Table.attribute_types:
-                    if attendee1.attributes[attribute_type_1] == attendee2.attributes[attribute_type_1]:
-                        penalty_score += Table.default_different_score
-                    for attribute_type_2 in Table.attribute_types:
-                        a_tuple = (attribute_type_1, attendee1.attributes[attribute_type_1],
-                                   attribute_type_2, attendee2.attributes[attribute_type_2])
-                        if a_tuple in Table.override_different_score:
-                            penalty_score += Table.override_different_score[a_tuple]
-                        a_tuple = (attribute_type_2, attendee2.attributes[attribute_type_2],
-                                   attribute_type_1, attendee1.attributes[attribute_type_1])
-                        if a_tuple in Table.override_different_score:
-                            penalty_score += Table.override_different_score[a_tuple]
+        if self.problem.score_is_cached[self.table_id]:
+            profiler.count('Table.score.cache_hit')
+            return float(self.problem.cached_scores[self.table_id])
+        profiler.count('Table.score.cache_miss')
+        penalty_score = self._compute_score()
+        self.problem.cached_scores[self.table_id] = penalty_score
+        self.problem.score_is_cached[self.table_id] = True
+        return penalty_score
+
+    def _compute_score(self) -> float:
+        penalty_score = float(self.problem.weight_by_code @ (self.counts * self.counts))
+        penalty_score += self.problem.movement_penalty * int(self.problem.moved_by_table[self.table_id])
+        penalty_score += self.problem.repeat_pair_penalty * int(self.problem.repeats_by_table[self.table_id])
+        if len(self.attendees) == 0:
+            return penalty_score
+        # every pair of attendees (including an attendee with itself) adds their sameness and override scores
+        profiles, num_by_profile = np.unique([attendee.profile_id for attendee in self.attendees], return_counts=True)
+        interaction = self.problem.profile_interaction_block(profiles)
+        penalty_score += float(num_by_profile @ interaction @ num_by_profile +
+                               np.diagonal(interaction) @ num_by_profile) / 2
         return penalty_score
 
+    def _movement_penalty(self, attendee: Attendee) -> float:
+        if attendee.previous_table_id is None or attendee.previous_table_id == self.table_id:
+            return 0.0
+        return self.problem.movement_penalty
+
+    def _repeat_penalty(self, attendee: Attendee) -> float:
+        # the attendee never met themselves, so this is the same whether or not they are at the table
+        if self.problem.met_by_table is None:
+            return 0.0
+        return self.problem.repeat_pair_penalty * int(self.problem.met_by_table[self.table_id, attendee.item_id])
+
+    def marginal_score_if_attendee_is_added(self, attendee: Attendee) -> float:
+        """Increase in score() if the attendee were added to the table"""
+        if attendee in self.attendees:
+            raise ValueError('Attendee already at table')
+        score_by_code = self.problem.marginal_scores_by_code(np.array([self.table_id]))[0]
+        return float(score_by_code[attendee.codes].sum() + self.problem.profile_self_score[attendee.profile_id]) + \
+            self._movement_penalty(attendee) + self._repeat_penalty(attendee)
+
+    def marginal_score_if_attendee_is_removed(self, attendee: Attendee) -> float:
+        """Change in score() (usually negative) if the attendee were removed from the table"""
+        if attendee not in self.attendees:
+            raise AttributeError('Trying to remove an attendee not at a table')
+        # minus the increase of adding the attendee to the table without them: the marginal scores by code of the
+        # table, less the attendee's own contribution (profile_self_score plus their weights), plus profile_self_score
+        score_by_code = self.problem.marginal_scores_by_code(np.array([self.table_id]))[0]
+        return -float(score_by_code[attendee.codes].sum() - self.problem.weight_by_code[attendee.codes].sum()) - \
+            self._movement_penalty(attendee) - self._repeat_penalty(attendee)
+
     def score_if_attendee_is_added_to_table(self, attendee: Attendee) -> float:
-        self.add_attendee(attendee)
-        score = self.score()
-        self.remove_attendee(attendee)
-        return score
+        return self.score() + self.marginal_score_if_attendee_is_added(attendee)
 
     def __hash__(self):
         return hash(self.table_id)
@@ -1,5 +0,0 @@
-import datetime
-
-
-stop_execution = False
-start_time = datetime.datetime.now()
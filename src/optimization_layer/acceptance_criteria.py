@@ -0,0 +1,81 @@
+import math
+import random
+
+from src.parameters.parameters import Parameters
+
+
+class AcceptanceCriterion:
+    """Decides whether the reoptimization moves to a candidate arrangement that does not improve the score.
+
+    budget_used is the fraction (0 to 1) of max_run_time_seconds or max_iterations used so far, whichever is larger,
+    so that schedules always run their course within the run.
+    """
+    def accept(self, current_score: float, candidate_score: float, budget_used: float) -> bool:
+        return candidate_score <= current_score
+
+
+class HillClimbing(AcceptanceCriterion):
+    """Only accept arrangements that are at least as good as the current one"""
+
+
+class SimulatedAnnealing(AcceptanceCriterion):
+    """Accept a worse arrangement with probability exp(-increase / temperature).
+
+    The temperature falls geometrically from initial_temperature to final_temperature over the budget.
+    """
+    def __init__(self, initial_temperature: float, final_temperature: float, rng: random.Random):
+        self.initial_temperature = initial_temperature
+        self.final_temperature = final_temperature
+        self.rng = rng
+
+    def temperature(self, budget_used: float) -> float:
+        return self.initial_temperature * (self.final_temperature / self.initial_temperature) ** min(1.0, budget_used)
+
+    def accept(self, current_score: float, candidate_score: float, budget_used: float) -> bool:
+        if candidate_score <= current_score:
+            return True
+        return self.rng.random() < math.exp(-(candidate_score - current_score) / self.temperature(budget_used))
+
+
+class LateAcceptance(AcceptanceCriterion):
+    """Late acceptance hill climbing: accept if not worse than the current score or the score history_length moves
+    ago"""
+    def __init__(self, history_length: int):
+        self.history: list[float] = list()
+        self.history_length = history_length
+        self.num_decisions = 0
+
+    def accept(self, current_score: float, candidate_score: float, budget_used: float) -> bool:
+        if len(self.history) < self.history_length:
+            self.history.append(current_score)
+        position = self.num_decisions % self.history_length
+        accepted = candidate_score <= current_score or candidate_score <= self.history[position]
+        self.history[position] = candidate_score if accepted else current_score
+        self.num_decisions += 1
+        return accepted
+
+
+class ThresholdAccepting(AcceptanceCriterion):
+    """Accept if the score increases by less than a threshold falling linearly from initial to final threshold"""
+    def __init__(self, initial_threshold: float, final_threshold: float):
+        self.initial_threshold = initial_threshold
+        self.final_threshold = final_threshold
+
+    def threshold(self, budget_used: float) -> float:
+        return self.initial_threshold + (self.final_threshold - self.initial_threshold) * min(1.0, budget_used)
+
+    def accept(self, current_score: float, candidate_score: float, budget_used: float) -> bool:
+        return candidate_score - current_score <= self.threshold(budget_used)
+
+
+def build_acceptance_criterion(parameters: Parameters, rng: random.Random) -> AcceptanceCriterion:
+    if parameters.acceptance_criterion == 'hill_climbing':
+        return HillClimbing()
+    if parameters.acceptance_criterion == 'simulated_annealing':
+        return SimulatedAnnealing(parameters.initial_temperature, parameters.final_temperature, rng)
+    if parameters.acceptance_criterion == 'late_acceptance':
+        return LateAcceptance(parameters.late_acceptance_length)
+    if parameters.acceptance_criterion == 'threshold_accepting':
+        return ThresholdAccepting(parameters.initial_temperature, parameters.final_temperature)
+    raise ValueError(f'Unknown acceptance_criterion {parameters.acceptance_criterion}, expected one of '
+                     f'hill_climbing, simulated_annealing, late_acceptance, threshold_accepting')
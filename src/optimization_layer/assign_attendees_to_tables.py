@@ -1,48 +1,53 @@
-import networkx as nx
+from typing import Collection, Optional, Sequence
+
+import numpy as np
 
 from src.entity.attendee import Attendee
 from src.entity.table import Table
+from src.optimization_layer.assignment_solvers import get_assignment_solver
+from src.util.profiling import profiler
+
+
+def assign_attendees_to_tables(attendees_to_be_assigned: Collection[Attendee],
+                               tables_to_be_assigned: Collection[Table],
+                               assignment_solver: str = 'network_flow',
+                               seats_left: Optional[Sequence[int]] = None) -> list[tuple[Attendee, Table]]:
+    """Assign at most one attendee to each table, minimizing the total increase in table scores.
+
+    If there are more attendees than tables some attendees are not assigned, and if there are fewer attendees than
+    tables some tables do not receive an attendee.  With seating constraints, each group whose members are among the
+    attendees is assigned as one, to a table with at least its size in seats_left (the seats left at each table, if
+    given), and no attendee is assigned where the constraints forbid it.
+    """
+    attendees_to_be_assigned = list(attendees_to_be_assigned)
+    tables_to_be_assigned = list(tables_to_be_assigned)
+    if len(attendees_to_be_assigned) == 0 or len(tables_to_be_assigned) == 0:
+        return []
+    problem = tables_to_be_assigned[0].problem
+    if problem.constraints is not None:
+        return _assign_units_to_tables(problem.constraints.units(attendees_to_be_assigned), tables_to_be_assigned,
+                                       assignment_solver, seats_left)
+    with profiler.timer('assign_attendees_to_tables.cost_matrix'):
+        scores = problem.marginal_scores_if_attendees_are_added(attendees_to_be_assigned, tables_to_be_assigned)
+
+    assignments = get_assignment_solver(assignment_solver)(scores)
+
+    attendee_assigned_to_table: list[tuple[Attendee, Table]] = [(attendees_to_be_assigned[row],
+                                                                 tables_to_be_assigned[column])
+                                                                for row, column in assignments]
+    return attendee_assigned_to_table
 
 
-def assign_attendees_to_tables(attendees_to_be_assigned, tables_to_be_assigned) -> list[tuple[Attendee, Table]]:
-    g = nx.DiGraph()
-
-    # items_to_be_assigned = [item for item in items if attendees[item].assigned_to_group == -1]
-    m = len(attendees_to_be_assigned)
-    n = len(tables_to_be_assigned)
-
-    for attendee in attendees_to_be_assigned:
-        g.add_node(attendee.item_id, attendee=attendee, demand=-1)
-    for table in tables_to_be_assigned:
-        g.add_node(f'table_{table.table_id}', table=table, demand=1)
-    g.add_node('Fake', demand=m - n)
-
-    for attendee in attendees_to_be_assigned:
-        for table in tables_to_be_assigned:
-            score = table.score_if_attendee_is_added_to_table(attendee)
-            g.add_edge(attendee.item_id, f'table_{table.table_id}', weight=score)
-
-    if m < n:
-        for table in tables_to_be_assigned:
-            g.add_edge('Fake', f'table_{table.table_id}', weight=0.0)
-    else:
-        for attendee in attendees_to_be_assigned:
-            g.add_edge(attendee.item_id, 'Fake', weight=0.0)
-    # with open(r'c:/temp/edges.txt','w') as ff:
-    #     ff.write(str(g.edges.data()))
-
-    flows = nx.min_cost_flow(g, demand='demand', weight='weight')
-
-    attendee_assigned_to_table: list[tuple[Attendee, Table]] = list()
-    for from_node, to_nodes in flows.items():
-        if 'attendee' in g.nodes[from_node]:
-            attendee = g.nodes[from_node]['attendee']
-
-            # should be exactly one to_node with positive value
-            to_node = [_to_node for _to_node, value in to_nodes.items() if value > 0.01][0]
+def _assign_units_to_tables(units: list[list[Attendee]], tables_to_be_assigned: list[Table], assignment_solver: str,
+                            seats_left: Optional[Sequence[int]]) -> list[tuple[Attendee, Table]]:
+    # a group is a single node of the assignment, and the forbidden pairs are infinite costs, which the solvers leave
+    # out
+    with profiler.timer('assign_attendees_to_tables.cost_matrix'):
+        scores = tables_to_be_assigned[0].problem.marginal_scores_if_units_are_added(units, tables_to_be_assigned)
+        if seats_left is not None:
+            unit_sizes = np.array([len(unit) for unit in units])
+            scores[unit_sizes[:, None] > np.asarray(seats_left)[None, :]] = np.inf
 
-            if 'table' in g.nodes[to_node]:
-                table = g.nodes[to_node]['table']
-                attendee_assigned_to_table.append((attendee, table))
+    assignments = get_assignment_solver(assignment_solver)(scores)
 
-    return attendee_assigned_to_table
+    return [(attendee, tables_to_be_assigned[column]) for row, column in assignments for attendee in units[row]]
@@ -0,0 +1,193 @@
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.util.profiling import profiler
+
+
+# candidate tables of each attendee (and candidate attendees of each table) in the graph of sparse_network_flow
+candidate_tables_per_attendee: int = 16
+
+
+def solve_with_network_flow(costs: np.ndarray) -> list[tuple[int, int]]:
+    """Min cost flow from the attendees (rows) to the tables (columns), with a 'Fake' node to balance supply/demand.
+
+    Returns the (row, column) pairs of the attendees assigned to a table.  This is the reference implementation.
+    Infinite costs are left out of the graph.  If there are any, an attendee may go to 'Fake' and 'Fake' may fill a
+    table, at a cost above that of any assignment, so that as many attendees as possible are assigned.
+    """
+    rows, columns = np.nonzero(np.isfinite(costs))
+    return _min_cost_flow(costs, rows, columns, 'network_flow')
+
+
+def solve_with_sparse_network_flow(costs: np.ndarray, num_candidates: int = candidate_tables_per_attendee,
+                                   max_pricing_rounds: int = 10) -> list[tuple[int, int]]:
+    """The min cost flow of solve_with_network_flow on a graph with only the candidate edges: the num_candidates
+    cheapest tables of each attendee, the num_candidates cheapest attendees of each table, and attendee i to table i,
+    which is enough for a feasible flow.
+
+    The answer is checked against every edge left out: with potentials from the shortest paths (Bellman-Ford) in the
+    residual graph of the sparse flow, no edge left out may have a negative reduced cost.  Then the flow is optimal for
+    the full graph too.  Otherwise the num_candidates edges of each attendee with the most negative reduced costs are
+    added and the flow solved again, up to max_pricing_rounds times, after which the full graph is solved.
+    """
+    m, n = costs.shape
+    finite = np.isfinite(costs)
+    if num_candidates >= min(m, n):
+        return solve_with_network_flow(costs)
+    with profiler.timer('sparse_network_flow.candidates'):
+        candidates = np.zeros((m, n), dtype=bool)
+        np.put_along_axis(candidates, np.argpartition(costs, num_candidates - 1, axis=1)[:, :num_candidates], True,
+                          axis=1)
+        np.put_along_axis(candidates, np.argpartition(costs, num_candidates - 1, axis=0)[:num_candidates, :], True,
+                          axis=0)
+        backbone = np.arange(min(m, n))
+        candidates[backbone, backbone] = True
+        candidates &= finite
+    tolerance = 1e-9 * (1.0 + float(np.abs(costs[finite]).max(initial=0.0)))
+
+    for _ in range(1 + max_pricing_rounds):
+        rows, columns = np.nonzero(candidates)
+        assignments = _min_cost_flow(costs, rows, columns, 'sparse_network_flow', has_forbidden=not finite.all())
+        with profiler.timer('sparse_network_flow.verify'):
+            potentials = _residual_potentials(costs, rows, columns, assignments, not finite.all())
+            if potentials is None:
+                break
+            attendee_potentials, table_potentials = potentials
+            reduced_costs = np.where(finite & ~candidates,
+                                     costs + attendee_potentials[:, None] - table_potentials[None, :], 0.0)
+            if reduced_costs.min() >= -tolerance:
+                profiler.count('sparse_network_flow.verified')
+                return assignments
+            profiler.count('sparse_network_flow.pricing_rounds')
+            # the edges that could improve the flow
+            most_negative = np.argpartition(reduced_costs, num_candidates - 1, axis=1)[:, :num_candidates]
+            candidates[np.arange(m)[:, None], most_negative] |= \
+                np.take_along_axis(reduced_costs, most_negative, axis=1) < -tolerance
+    profiler.count('sparse_network_flow.dense_fallback')
+    return solve_with_network_flow(costs)
+
+
+def _min_cost_flow(costs: np.ndarray, rows: np.ndarray, columns: np.ndarray, timer_name: str,
+                   has_forbidden: Optional[bool] = None) -> list[tuple[int, int]]:
+    # the network flow of solve_with_network_flow with the edges (rows[i], columns[i]); has_forbidden defaults to
+    # whether any cost is infinite
+    import networkx as nx
+    m, n = costs.shape
+    if has_forbidden is None:
+        has_forbidden = not np.isfinite(costs).all()
+    with profiler.timer(f'{timer_name}.build_graph'):
+        g = nx.DiGraph()
+
+        for row in range(m):
+            g.add_node(('attendee', row), demand=-1)
+        for column in range(n):
+            g.add_node(('table', column), demand=1)
+        g.add_node('Fake', demand=m - n)
+
+        for row, column, cost in zip(rows.tolist(), columns.tolist(), costs[rows, columns].tolist()):
+            g.add_edge(('attendee', row), ('table', column), weight=cost)
+
+        to_fake_cost, from_fake_cost = _fake_edge_costs(costs, has_forbidden)
+        if from_fake_cost is not None:
+            for column in range(n):
+                g.add_edge('Fake', ('table', column), weight=from_fake_cost)
+        if to_fake_cost is not None:
+            for row in range(m):
+                g.add_edge(('attendee', row), 'Fake', weight=to_fake_cost)
+
+    with profiler.timer(f'{timer_name}.min_cost_flow'):
+        flows = nx.min_cost_flow(g, demand='demand', weight='weight')
+
+    assignments: list[tuple[int, int]] = list()
+    for row in range(m):
+        # should be exactly one to_node with positive value
+        to_node = [_to_node for _to_node, value in flows[('attendee', row)].items() if value > 0.01][0]
+        if to_node != 'Fake':
+            assignments.append((row, to_node[1]))
+    return assignments
+
+
+def _fake_edge_costs(costs: np.ndarray, has_forbidden: bool) -> tuple[Optional[float], Optional[float]]:
+    # the costs of the attendee -> 'Fake' and 'Fake' -> table edges, None where there are no such edges
+    m, n = costs.shape
+    if has_forbidden:
+        return 0.0, unassigned_attendee_cost(costs)
+    if m < n:
+        return None, 0.0
+    return 0.0, None
+
+
+def _residual_potentials(costs: np.ndarray, rows: np.ndarray, columns: np.ndarray, assignments: list[tuple[int, int]],
+                         has_forbidden: bool) -> Optional[tuple[np.ndarray, np.ndarray]]:
+    # potentials of the attendees and tables: shortest path lengths (Bellman-Ford) from a source with a 0 cost edge
+    # to every node of the residual graph of the flow, None if the graph has a negative cycle (the flow is not optimal)
+    m, n = costs.shape
+    fake = m + n
+    assigned_rows = np.array([row for row, _ in assignments], dtype=np.int64)
+    assigned_columns = np.array([column for _, column in assignments], dtype=np.int64)
+    # the attendee -> table edges have no capacity, so they are all in the residual graph, and the reverse of those
+    # with a flow
+    sources = [rows, m + assigned_columns]
+    targets = [m + columns, assigned_rows]
+    weights = [costs[rows, columns], -costs[assigned_rows, assigned_columns]]
+    to_fake_cost, from_fake_cost = _fake_edge_costs(costs, has_forbidden)
+    if to_fake_cost is not None:
+        unassigned = np.setdiff1d(np.arange(m), assigned_rows)
+        sources += [np.arange(m), np.full(len(unassigned), fake)]
+        targets += [np.full(m, fake), unassigned]
+        weights += [np.full(m, to_fake_cost), np.full(len(unassigned), -to_fake_cost)]
+    if from_fake_cost is not None:
+        unfilled = m + np.setdiff1d(np.arange(n), assigned_columns)
+        sources += [np.full(n, fake), unfilled]
+        targets += [m + np.arange(n), np.full(len(unfilled), fake)]
+        weights += [np.full(n, from_fake_cost), np.full(len(unfilled), -from_fake_cost)]
+    sources, targets, weights = np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+
+    tolerance = 1e-9 * (1.0 + float(np.abs(weights).max(initial=0.0)))
+    distances = np.zeros(m + n + 1)
+    for _ in range(m + n + 1):
+        relaxed = distances.copy()
+        np.minimum.at(relaxed, targets, distances[sources] + weights)
+        if not (relaxed < distances - tolerance).any():
+            return distances[:m], distances[m:fake]
+        distances = relaxed
+    return None
+
+
+def solve_with_linear_assignment(costs: np.ndarray) -> list[tuple[int, int]]:
+    """Rectangular linear assignment on the dense cost matrix (scipy's linear_sum_assignment).
+
+    Assigns min(attendees, tables) pairs, one attendee per table, which is the same problem as the network flow with
+    the 'Fake' node.
+    """
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError as exc:
+        raise ImportError('assignment_solver "linear_assignment" requires scipy (pip install scipy)') from exc
+
+    forbidden = ~np.isfinite(costs)
+    if forbidden.any():
+        # as the network flow, assign as many attendees as possible without the forbidden pairs
+        costs = np.where(forbidden, unassigned_attendee_cost(costs), costs)
+    with profiler.timer('linear_assignment.linear_sum_assignment'):
+        rows, columns = linear_sum_assignment(costs)
+    return [(row, column) for row, column in zip(rows.tolist(), columns.tolist()) if not forbidden[row, column]]
+
+
+def unassigned_attendee_cost(costs: np.ndarray) -> float:
+    """A cost above the difference between any two assignments of the finite costs"""
+    return 1.0 + 2.0 * float(np.abs(costs[np.isfinite(costs)]).sum())
+
+
+assignment_solvers: dict[str, Callable[[np.ndarray], list[tuple[int, int]]]] = {
+    'network_flow': solve_with_network_flow,
+    'sparse_network_flow': solve_with_sparse_network_flow,
+    'linear_assignment': solve_with_linear_assignment,
+}
+
+
+def get_assignment_solver(name: str) -> Callable[[np.ndarray], list[tuple[int, int]]]:
+    if name not in assignment_solvers:
+        raise ValueError(f'Unknown assignment_solver {name}, expected one of {list(assignment_solvers.keys())}')
+    return assignment_solvers[name]
@@ -0,0 +1,99 @@
+import random
+from typing import Callable
+
+import numpy as np
+
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+
+
+def destroy_random(tables: list[Table], rng: random.Random, num_per_table: int) -> list[Attendee]:
+    """num_per_table randomly chosen attendees from every table"""
+    return [attendee
+            for table in tables
+            for attendee in rng.sample(list(table.attendees), min(num_per_table, len(table.attendees)))]
+
+
+def destroy_worst(tables: list[Table], rng: random.Random, num_per_table: int) -> list[Attendee]:
+    """From every table, num_per_table of the 2 * num_per_table attendees whose removal lowers the score the most"""
+    attendees_to_remove = list()
+    for table in tables:
+        attendees = sorted(table.attendees, key=table.marginal_score_if_attendee_is_removed)
+        candidates = attendees[:2 * num_per_table]
+        attendees_to_remove.extend(rng.sample(candidates, min(num_per_table, len(candidates))))
+    return attendees_to_remove
+
+
+def destroy_violated_item(tables: list[Table], rng: random.Random, num_per_table: int) -> list[Attendee]:
+    """For a randomly chosen item over its upper bound at some table, the attendees with that item over the bound.
+
+    As many attendees without that item are taken from tables under the bound, so that the item can be moved there.
+    If no item is over its upper bound this is destroy_random.
+    """
+    problem = tables[0].problem
+    excess = np.maximum(0, problem.counts - problem.upper_bound_by_code)
+    violated_codes = np.flatnonzero(excess.sum(axis=0))
+    if len(violated_codes) == 0:
+        return destroy_random(tables, rng, num_per_table)
+    code = int(rng.choice(violated_codes.tolist()))
+
+    attendees_to_remove = list()
+    for table in tables:
+        num_excess = int(excess[table.table_id, code])
+        if num_excess > 0:
+            attendees_with_item = [attendee for attendee in table.attendees if code in attendee.codes]
+            attendees_to_remove.extend(rng.sample(attendees_with_item, num_excess))
+
+    tables_under_bound = [table for table in tables if table.counts[code] < problem.upper_bound_by_code[code]]
+    rng.shuffle(tables_under_bound)
+    num_to_exchange = len(attendees_to_remove)
+    for table in tables_under_bound[:num_to_exchange]:
+        attendees_without_item = [attendee for attendee in table.attendees if code not in attendee.codes]
+        if len(attendees_without_item) > 0:
+            attendees_to_remove.append(rng.choice(attendees_without_item))
+    return attendees_to_remove
+
+
+def destroy_table_cluster(tables: list[Table], rng: random.Random, num_per_table: int) -> list[Attendee]:
+    """Every attendee of a cluster of randomly chosen tables, num_per_table + 1 tables (at most all of them)"""
+    cluster = rng.sample(tables, min(len(tables), num_per_table + 1))
+    return [attendee for table in cluster for attendee in table.attendees]
+
+
+destroy_operators: dict[str, Callable[[list[Table], random.Random, int], list[Attendee]]] = {
+    'random': destroy_random,
+    'worst': destroy_worst,
+    'violated_item': destroy_violated_item,
+    'table_cluster': destroy_table_cluster,
+}
+
+
+class AdaptiveOperatorSelector:
+    """Roulette wheel choice of the destroy operators, favouring those that recently improved the score.
+
+    After each use the weight of the operator moves towards the reward of the outcome, by reaction_factor:
+    w = (1 - reaction_factor) * w + reaction_factor * reward
+    """
+    reward_by_outcome: dict[str, float] = {'improved': 3.0, 'accepted': 1.0, 'rejected': 0.0}
+    min_weight: float = 0.1
+
+    def __init__(self, operator_names: list[str], reaction_factor: float, rng: random.Random):
+        unknown_operators = [name for name in operator_names if name not in destroy_operators]
+        if len(unknown_operators) > 0 or len(operator_names) == 0:
+            raise ValueError(f'Unknown destroy_operators {unknown_operators}, expected a list from '
+                             f'{list(destroy_operators.keys())}')
+        self.operator_names = list(operator_names)
+        self.reaction_factor = reaction_factor
+        self.rng = rng
+        self.weights: dict[str, float] = {name: 1.0 for name in self.operator_names}
+
+    def choose(self) -> str:
+        return self.rng.choices(self.operator_names, weights=[self.weights[name] for name in self.operator_names])[0]
+
+    def update(self, operator_name: str, outcome: str) -> None:
+        weight = ((1.0 - self.reaction_factor) * self.weights[operator_name] +
+                  self.reaction_factor * AdaptiveOperatorSelector.reward_by_outcome[outcome])
+        self.weights[operator_name] = max(AdaptiveOperatorSelector.min_weight, weight)
+
+    def __repr__(self):
+        return ', '.join(f'{name}: {weight:.2f}' for name, weight in self.weights.items())
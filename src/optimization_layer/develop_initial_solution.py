@@ -1,10 +1,12 @@
 from collections import defaultdict
+from math import ceil
 import logging
 
+import numpy as np
+
 from src.parameters.parameters import Parameters
 from src.entity.attendee import Attendee
 from src.entity.table import Table
-from src.optimization_layer.print_attendees_assigned_to_tables import print_tables_compressed
 from src.optimization_layer.assign_attendees_to_tables import assign_attendees_to_tables
 
 logger: logging.Logger = logging.getLogger(__name__)
@@ -13,22 +15,88 @@ logger: logging.Logger = logging.getLogger(__name__)
 def initial_solution(tables: list[Table],
                      attendees: list[Attendee],
                      parameters: Parameters) -> None:
-    # for now, find the attribute_type with the most items
+    """Seat every attendee with parameters.initial_solution_method, table sizes differ by at most one.
+
+    With seating constraints the pinned attendees and the groups are seated first (seat_constrained_attendees), so
+    table sizes may differ by more.
+    """
+    if parameters.initial_solution_method not in initial_solution_methods:
+        raise ValueError(f'Unknown initial_solution_method {parameters.initial_solution_method}, '
+                         f'expected one of {list(initial_solution_methods.keys())}')
+    if tables[0].problem.constraints is not None:
+        attendees = seat_constrained_attendees(tables, attendees, parameters)
+    initial_solution_methods[parameters.initial_solution_method](tables, attendees, parameters)
+
+
+def seat_constrained_attendees(tables: list[Table],
+                               attendees: list[Attendee],
+                               parameters: Parameters) -> list[Attendee]:
+    """Seat the pinned attendees at their table, then the groups, largest first, each at the table where it adds the
+    least to the score among those with room for it (seat_group).  Returns the other attendees.
+    """
+    problem = tables[0].problem
+    table_by_id = {table.table_id: table for table in tables}
+    balanced_table_size = ceil(len(attendees) / len(tables))
+    groups: list[list[Attendee]] = list()
+    other_attendees: list[Attendee] = list()
+    for unit in problem.constraints.units(attendees):
+        pinned_table_id = int(problem.constraints.pinned_table[unit[0].item_id])
+        if pinned_table_id >= 0:
+            for attendee in unit:
+                table_by_id[pinned_table_id].add_attendee(attendee)
+        elif len(unit) > 1:
+            groups.append(unit)
+        else:
+            other_attendees.append(unit[0])
+
+    for group in sorted(groups, key=len, reverse=True):
+        seat_group(tables, group, balanced_table_size, parameters)
+    logger.info(f'Seated {len(attendees) - len(other_attendees)} pinned and grouped attendees')
+    return other_attendees
+
 
-    cntr: dict[str, defaultdict] = {attribute_type: defaultdict(int)
-                                    for attribute_type in parameters.attribute_field_names}
+def attendees_by_item(attendees: list[Attendee],
+                      parameters: Parameters) -> dict[str, dict[str, list[Attendee]]]:
+    """The attendees with each item, by attribute type, in the order of the attendees"""
+    buckets: dict[str, dict[str, list[Attendee]]] = {attribute_type: defaultdict(list)
+                                                     for attribute_type in parameters.attribute_field_names}
     for attendee in attendees:
-        attendee.assigned_to_table = None
         for attribute_type, item in attendee.attributes.items():
-            cntr[attribute_type][item] += 1
+            buckets[attribute_type][item].append(attendee)
+    return buckets
+
+
+def seat_group(tables: list[Table], group: list[Attendee], balanced_table_size: int, parameters: Parameters) -> None:
+    """Seat the group at the table where it adds the least to the score among those with room for it: that stay
+    within balanced_table_size, or failing that max_table_size"""
+    table_sizes = np.array([len(table.attendees) for table in tables])
+    marginal_scores = tables[0].problem.marginal_scores_if_units_are_added([group], tables)[0]
+    for size_limit in (balanced_table_size, parameters.max_table_size):
+        allowed_scores = np.where(table_sizes + len(group) <= size_limit, marginal_scores, np.inf)
+        if np.isfinite(allowed_scores).any():
+            break
+    else:
+        raise ValueError(f'No table has room for the group {[attendee.id for attendee in group]} within the '
+                         f'seating constraints')
+    table = tables[int(np.argmin(allowed_scores))]
+    for attendee in group:
+        table.add_attendee(attendee)
+
+
+def flow_by_item(tables: list[Table],
+                 attendees: list[Attendee],
+                 parameters: Parameters) -> None:
+    """Seat the attendees with each item of the attribute type with the most items, one flow per table size"""
+    buckets = attendees_by_item(attendees, parameters)
+    for attendee in attendees:
+        attendee.assigned_to_table = None
     # go through list of attribute types, return the one that maximizes the number of items used of that type
-    attribute_max = max(parameters.attribute_field_names, key=lambda attribute: len(cntr[attribute]))
+    attribute_max = max(parameters.attribute_field_names, key=lambda attribute: len(buckets[attribute]))
 
-    for item in cntr[attribute_max].keys():
+    for item, attendees_with_item in buckets[attribute_max].items():
         while True:
-            attendees_to_be_assigned = [attendee for attendee in attendees
-                                        if attendee.assigned_to_table is None and
-                                        attendee.attributes[attribute_max] == item]
+            attendees_to_be_assigned = [attendee for attendee in attendees_with_item
+                                        if attendee.assigned_to_table is None]
             if len(attendees_to_be_assigned) == 0:
                 break
             largest_table_size = max(len(table.attendees) for table in tables)
@@ -38,12 +106,92 @@ def initial_solution(tables: list[Table],
             else:
                 tables_to_be_assigned = {table for table in tables if len(table.attendees) < largest_table_size}
 
-            attendee_assigned_to_group = assign_attendees_to_tables(attendees_to_be_assigned, tables_to_be_assigned)
+            attendee_assigned_to_group = assign_attendees_to_tables(attendees_to_be_assigned, tables_to_be_assigned,
+                                                                    parameters.assignment_solver)
+            if len(attendee_assigned_to_group) == 0:
+                # the seating constraints forbid the smaller tables, so use any table with room
+                attendee_assigned_to_group = assign_attendees_to_tables(
+                    attendees_to_be_assigned, [table for table in tables
+                                               if len(table.attendees) < parameters.max_table_size],
+                    parameters.assignment_solver)
+                if len(attendee_assigned_to_group) == 0:
+                    raise ValueError(f'Could not seat {attendees_to_be_assigned} within the seating constraints')
 
             for attendee, table in attendee_assigned_to_group:
                 attendee.assigned_to_table = table
                 table.add_attendee(attendee)
+            attendees_with_item = attendees_to_be_assigned
+
+
+def stratified_order(attendees: list[Attendee], parameters: Parameters) -> list[Attendee]:
+    """The attendees grouped by their items, starting with the attribute type with the most items and the most
+    frequent items"""
+    buckets = attendees_by_item(attendees, parameters)
+    attribute_order = sorted(parameters.attribute_field_names, key=lambda attribute: -len(buckets[attribute]))
+    return sorted(attendees, key=lambda attendee: tuple(
+        (-len(buckets[attribute_type][attendee.attributes[attribute_type]]), attendee.attributes[attribute_type])
+        for attribute_type in attribute_order))
+
+
+def stratified_greedy(tables: list[Table],
+                      attendees: list[Attendee],
+                      parameters: Parameters) -> None:
+    """Seat the attendees one at a time at the table with the smallest increase in score that still has room.
+
+    The attendees are grouped by their items, starting with the attribute type with the most items and the most
+    frequent items, so that the attendees of an item are seated one after the other and spread over the tables.  The
+    increase in score of seating an attendee at each table is kept up to date for every code, so that seating an
+    attendee costs one pass over the tables.
+    """
+    for attendee in attendees:
+        attendee.assigned_to_table = None
+    attendees_in_order = stratified_order(attendees, parameters)
+
+    problem = tables[0].problem
+    table_ids = np.array([table.table_id for table in tables], dtype=np.int64)
+    # score_by_code[table, code] is the increase in score at the table of an attendee with the code, without the
+    # pair of the attendee with itself, as in Problem.marginal_score_matrix
+    counts = problem.counts[table_ids]
+    score_by_code = counts * (2 * problem.weight_by_code + problem.default_different_score)
+    has_overrides = bool(problem.override_matrix.any())
+    override_both_ways = problem.override_matrix + problem.override_matrix.T
+    if has_overrides:
+        score_by_code = score_by_code + counts @ override_both_ways
+    code_score = 2 * problem.weight_by_code + problem.default_different_score
+
+    # balanced table sizes: num_large_tables tables get one more attendee than the others (the attendees seated
+    # already, e.g. by seat_constrained_attendees, count)
+    table_sizes = np.array([len(table.attendees) for table in tables], dtype=np.int64)
+    num_seated = len(attendees) + int(table_sizes.sum())
+    small_table_size = num_seated // len(tables)
+    num_large_tables = num_seated - small_table_size * len(tables) - int((table_sizes > small_table_size).sum())
+    max_table_size = small_table_size + (1 if num_large_tables > 0 else 0)
+    for attendee in attendees_in_order:
+        marginal_scores = score_by_code[:, attendee.codes].sum(axis=1)
+        if problem.met_by_table is not None:
+            marginal_scores = marginal_scores + \
+                problem.repeat_pair_penalty * problem.met_by_table[table_ids, attendee.item_id]
+        size_limit = max_table_size
+        if problem.constraints is not None and problem.constraints.apart_index[attendee.item_id] >= 0:
+            marginal_scores = np.where(problem.constraints.forbidden([[attendee]], table_ids)[0], np.inf,
+                                       marginal_scores)
+            if not np.isfinite(marginal_scores[table_sizes < max_table_size]).any():
+                # the seating constraints forbid every table with room, so use any table below max_table_size
+                size_limit = parameters.max_table_size
+                if not np.isfinite(marginal_scores[table_sizes < size_limit]).any():
+                    raise ValueError(f'Could not seat attendee {attendee.id} within the seating constraints')
+        marginal_scores = np.where(table_sizes < size_limit, marginal_scores, np.inf)
+        table_index = int(np.argmin(marginal_scores))
+        tables[table_index].add_attendee(attendee)
+        score_by_code[table_index, attendee.codes] += code_score[attendee.codes]
+        if has_overrides:
+            score_by_code[table_index] += override_both_ways[attendee.codes].sum(axis=0)
+        table_sizes[table_index] += 1
+        if table_sizes[table_index] == small_table_size + 1:
+            num_large_tables -= 1
+            if num_large_tables == 0:
+                max_table_size = small_table_size
 
-            print_tables_compressed(tables)
 
-    return
+initial_solution_methods = {'flow_by_item': flow_by_item,
+                            'stratified_greedy': stratified_greedy}
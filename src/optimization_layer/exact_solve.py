@@ -0,0 +1,338 @@
+import logging
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.optimization_layer.lower_bound import lower_bound, optimality_gap
+from src.util.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+
+class LinearModel:
+    """A mixed integer linear program: minimize cost @ x subject to the bounds and integrality of the variables and
+    row_lower <= row @ x <= row_upper for each sparse row (variables, coefficients)"""
+    def __init__(self):
+        self.lower: list[float] = list()
+        self.upper: list[float] = list()
+        self.integer: list[bool] = list()
+        self.cost: list[float] = list()
+        self.rows: list[tuple[list[int], list[float]]] = list()
+        self.row_lower: list[float] = list()
+        self.row_upper: list[float] = list()
+
+    @property
+    def num_variables(self) -> int:
+        return len(self.cost)
+
+    def add_variable(self, lower: float, upper: float, integer: bool, cost: float = 0.0) -> int:
+        self.lower.append(lower)
+        self.upper.append(upper)
+        self.integer.append(integer)
+        self.cost.append(cost)
+        return len(self.cost) - 1
+
+    def add_constraint(self, variables: list[int], coefficients: list[float], lower: float, upper: float) -> None:
+        self.rows.append((variables, coefficients))
+        self.row_lower.append(lower)
+        self.row_upper.append(upper)
+
+
+class ExactResult:
+    """The best solution found (None if none), its objective, the best bound on the objective and whether the solution
+    is proven optimal"""
+    def __init__(self, values: Optional[np.ndarray], objective: float, bound: float, optimal: bool):
+        self.values = values
+        self.objective = objective
+        self.bound = bound
+        self.optimal = optimal
+
+
+class SeatingModel:
+    """The seating of the attendees at the tables as a LinearModel whose objective is the total score() of the tables.
+
+    Attendees with the same profile are interchangeable, so the variables are the numbers of attendees of each profile
+    at each table, and the tables keep their current sizes.  The count n of a code at a table is the sum of its
+    increments d_1 >= d_2 >= ..., so that n^2 is the sum of (2k - 1) d_k.  The increments are continuous where the
+    weight of n^2 is positive and n is in no override product, since the cheapest increments are then used first.  An
+    override product n * m is the sum of d_k * m, each linearized with a variable bounded by McCormick inequalities,
+    which are exact for a 0/1 increment.
+    """
+    def __init__(self, tables: list[Table], attendees: list[Attendee]):
+        problem = tables[0].problem
+        self.tables = tables
+        self.model = LinearModel()
+        num_tables = len(tables)
+        self.profiles: np.ndarray = np.unique([attendee.profile_id for attendee in attendees])
+        num_by_profile = np.bincount([attendee.profile_id for attendee in attendees])[self.profiles]
+        table_sizes = [len(table.attendees) for table in tables]
+        profile_codes = problem.profile_codes[self.profiles]
+        self.codes: np.ndarray = np.unique(profile_codes)
+        # the profiles (rows of count_variables) having each code
+        self.profiles_with_code: list[np.ndarray] = [np.flatnonzero((profile_codes == code).any(axis=1))
+                                                     for code in self.codes]
+
+        # the score of a table is counts @ quadratic @ counts + the pairs of each attendee with itself / 2
+        quadratic = np.diag(problem.weight_by_code + problem.default_different_score / 2) + \
+            (problem.override_matrix + problem.override_matrix.T) / 2
+        quadratic = quadratic[np.ix_(self.codes, self.codes)]
+        self.products: list[tuple[int, int]] = [(c1, c2) for c1 in range(len(self.codes))
+                                                for c2 in range(c1 + 1, len(self.codes)) if quadratic[c1, c2] != 0]
+        in_product = {c for pair in self.products for c in pair}
+
+        self.count_variables: np.ndarray = np.zeros((len(self.profiles), num_tables), dtype=np.int64)
+        for index, profile in enumerate(self.profiles.tolist()):
+            for table_index in range(num_tables):
+                self.count_variables[index, table_index] = self.model.add_variable(
+                    0, min(int(num_by_profile[index]), table_sizes[table_index]), True,
+                    float(problem.pair_with_itself[profile]) / 2)
+            # everyone is seated
+            self.model.add_constraint(self.count_variables[index].tolist(), [1.0] * num_tables,
+                                      num_by_profile[index], num_by_profile[index])
+        for table_index in range(num_tables):
+            self.model.add_constraint(self.count_variables[:, table_index].tolist(), [1.0] * len(self.profiles),
+                                      table_sizes[table_index], table_sizes[table_index])
+
+        # increments[(table, code)], and product_variables[(table, pair of codes)] one for each increment of the code
+        # with fewer of them
+        self.increments: dict[tuple[int, int], list[int]] = dict()
+        self.product_variables: dict[tuple[int, tuple[int, int]], list[int]] = dict()
+        for table_index in range(num_tables):
+            for c in range(len(self.codes)):
+                having_code = self.profiles_with_code[c]
+                max_count = min(int(num_by_profile[having_code].sum()), table_sizes[table_index])
+                binary = c in in_product or quadratic[c, c] < 0
+                increments = [self.model.add_variable(0, 1, binary, float(quadratic[c, c] * (2 * k - 1)))
+                              for k in range(1, max_count + 1)]
+                self.increments[(table_index, c)] = increments
+                self.model.add_constraint(increments + self.count_variables[having_code, table_index].tolist(),
+                                          [1.0] * len(increments) + [-1.0] * len(having_code), 0, 0)
+                if binary:
+                    for first, second in zip(increments, increments[1:]):
+                        self.model.add_constraint([first, second], [1.0, -1.0], 0, np.inf)
+
+            for c1, c2 in self.products:
+                # the pairs (c1, c2) and (c2, c1)
+                product_cost = 2 * float(quadratic[c1, c2])
+                increments, other_increments = self._product_factors(table_index, c1, c2)
+                max_other = len(other_increments)
+                product_variables = list()
+                for increment in increments:
+                    product = self.model.add_variable(0, max_other, True, product_cost)
+                    product_variables.append(product)
+                    if product_cost > 0:
+                        # product >= m - max_other * (1 - increment)
+                        self.model.add_constraint([product, increment] + other_increments,
+                                                  [1.0, -max_other] + [-1.0] * max_other, -max_other, np.inf)
+                    else:
+                        # product <= max_other * increment and product <= m
+                        self.model.add_constraint([product, increment], [1.0, -max_other], -np.inf, 0)
+                        self.model.add_constraint([product] + other_increments, [1.0] + [-1.0] * max_other,
+                                                  -np.inf, 0)
+                self.product_variables[(table_index, (c1, c2))] = product_variables
+
+        # tables of the same size are interchangeable, so neighbouring ones are ordered by a key of their attendees
+        self.table_sizes = table_sizes
+        self.ordered_tables: bool = problem.constraints is None and problem.movement_penalty == 0.0 and \
+            problem.earlier_pairs is None
+        self.keys: np.ndarray = np.arange(1, len(self.profiles) + 1, dtype=float)
+        if self.ordered_tables:
+            for first in range(num_tables - 1):
+                if table_sizes[first] == table_sizes[first + 1]:
+                    self.model.add_constraint(self.count_variables[:, first].tolist() +
+                                              self.count_variables[:, first + 1].tolist(),
+                                              self.keys.tolist() + (-self.keys).tolist(), 0, np.inf)
+
+    def _product_factors(self, table_index: int, c1: int, c2: int) -> tuple[list[int], list[int]]:
+        # the increments of the code with fewer of them, and those of the other code
+        increments1, increments2 = self.increments[(table_index, c1)], self.increments[(table_index, c2)]
+        return (increments1, increments2) if len(increments1) <= len(increments2) else (increments2, increments1)
+
+    def values_of_arrangement(self) -> np.ndarray:
+        """The variables of the current arrangement of the tables, with tables of the same size swapped so that their
+        keys are in order"""
+        values = np.zeros(self.model.num_variables)
+        profile_index = {profile: index for index, profile in enumerate(self.profiles.tolist())}
+        counts = np.zeros(self.count_variables.shape)
+        for table_index, table in enumerate(self.tables):
+            for attendee in table.attendees:
+                counts[profile_index[attendee.profile_id], table_index] += 1
+        if self.ordered_tables:
+            # each run of neighbouring tables of the same size in decreasing order of their keys
+            first = 0
+            for last in range(1, len(self.tables) + 1):
+                if last == len(self.tables) or self.table_sizes[last] != self.table_sizes[first]:
+                    order = first + np.argsort(-(self.keys @ counts[:, first:last]), kind='stable')
+                    counts[:, first:last] = counts[:, order]
+                    first = last
+        values[self.count_variables] = counts
+        for (table_index, c), increments in self.increments.items():
+            count = int(values[self.count_variables[self.profiles_with_code[c], table_index]].sum())
+            values[increments[:count]] = 1
+        for (table_index, (c1, c2)), product_variables in self.product_variables.items():
+            increments, other_increments = self._product_factors(table_index, c1, c2)
+            values[product_variables] = values[increments] * values[other_increments].sum()
+        return values
+
+    def seat(self, values: np.ndarray, attendees: list[Attendee]) -> None:
+        """Seat the attendees as the count variables of values say"""
+        counts = np.rint(values[self.count_variables]).astype(np.int64)
+        attendees_by_profile: dict[int, list[Attendee]] = {profile: list() for profile in self.profiles.tolist()}
+        for attendee in attendees:
+            attendees_by_profile[attendee.profile_id].append(attendee)
+        for table in self.tables:
+            for attendee in list(table.attendees):
+                table.remove_attendee(attendee)
+        for index, profile in enumerate(self.profiles.tolist()):
+            profile_attendees = iter(attendees_by_profile[profile])
+            for table_index, table in enumerate(self.tables):
+                for _ in range(counts[index, table_index]):
+                    table.add_attendee(next(profile_attendees))
+
+
+def solve_with_highs(model: LinearModel, time_limit: float, gap_tolerance: float,
+                     start: np.ndarray) -> ExactResult:
+    """HiGHS through scipy.optimize.milp.  It cannot start from a solution, so start only gives a cutoff: the
+    objective must be at most that of start."""
+    try:
+        from scipy.optimize import milp, LinearConstraint, Bounds
+        from scipy.sparse import coo_matrix
+    except ImportError as exc:
+        raise ImportError('exact_solver "highs" requires scipy (pip install scipy)') from exc
+    cost = np.array(model.cost)
+    rows = np.concatenate([np.full(len(variables), row) for row, (variables, _) in enumerate(model.rows)])
+    columns = np.concatenate([variables for variables, _ in model.rows])
+    coefficients = np.concatenate([coefficients for _, coefficients in model.rows])
+    matrix = coo_matrix((coefficients, (rows, columns)), shape=(len(model.rows), model.num_variables)).tocsr()
+    start_objective = float(cost @ start)
+    constraints = [LinearConstraint(matrix, model.row_lower, model.row_upper),
+                   LinearConstraint(cost[None, :], -np.inf, start_objective + 1e-6 * (1 + abs(start_objective)))]
+    with profiler.timer('exact_solve.highs'):
+        result = milp(cost, constraints=constraints, integrality=np.array(model.integer, dtype=np.int64),
+                      bounds=Bounds(model.lower, model.upper),
+                      options={'time_limit': max(time_limit, 1.0), 'mip_rel_gap': gap_tolerance, 'disp': False})
+    bound = getattr(result, 'mip_dual_bound', None)
+    bound = -np.inf if bound is None or not np.isfinite(bound) else float(bound)
+    if result.x is None:
+        return ExactResult(None, np.inf, bound, False)
+    # status 0 is optimal within mip_rel_gap, (objective - bound) / |objective|
+    objective = float(result.fun)
+    return ExactResult(result.x, objective,
+                       max(bound, objective - gap_tolerance * abs(objective)) if result.status == 0 else bound,
+                       result.status == 0)
+
+
+def integer_scale(values: np.ndarray, max_digits: int = 6) -> tuple[int, bool]:
+    """The smallest power of 10, up to 10 ** max_digits, that makes the values integers, and whether it does"""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    for digits in range(max_digits + 1):
+        scaled = values * 10 ** digits
+        if np.all(np.abs(scaled - np.rint(scaled)) <= 1e-9 * np.maximum(1.0, np.abs(scaled))):
+            return 10 ** digits, True
+    return 10 ** max_digits, False
+
+
+def solve_with_cp_sat(model: LinearModel, time_limit: float, gap_tolerance: float,
+                      start: np.ndarray) -> ExactResult:
+    """OR-Tools CP-SAT, with start as the hint.  Every variable is integer in CP-SAT, which changes nothing since the
+    continuous variables of SeatingModel are 0/1 in an optimal solution.
+
+    CP-SAT only takes integer coefficients, so each row and the objective are multiplied by the integer_scale of their
+    coefficients.  Costs with more than 6 decimals are rounded, and the bound is then lowered by the most the rounding
+    can change the objective.
+    """
+    try:
+        from ortools.sat.python import cp_model
+    except ImportError as exc:
+        raise ImportError('exact_solver "cp_sat" requires OR-Tools (pip install ortools)') from exc
+    cp = cp_model.CpModel()
+    variables = [cp.NewIntVar(int(np.floor(lower)), int(np.ceil(upper)), f'x{index}')
+                 for index, (lower, upper) in enumerate(zip(model.lower, model.upper))]
+    for (row_variables, coefficients), lower, upper in zip(model.rows, model.row_lower, model.row_upper):
+        scale, exact = integer_scale(np.array(coefficients))
+        if not exact:
+            raise ValueError(f'exact_solver "cp_sat" cannot scale the constraint coefficients {coefficients} to '
+                             f'integers')
+        expression = sum(int(np.rint(coefficient * scale)) * variables[variable]
+                         for variable, coefficient in zip(row_variables, coefficients))
+        # the row of integers is at least ceil(lower * scale) and at most floor(upper * scale)
+        if np.isfinite(lower):
+            cp.Add(expression >= int(np.ceil(lower * scale - 1e-9)))
+        if np.isfinite(upper):
+            cp.Add(expression <= int(np.floor(upper * scale + 1e-9)))
+    cost = np.array(model.cost)
+    cost_scale, exact = integer_scale(cost)
+    integer_cost = np.rint(cost * cost_scale).astype(np.int64)
+    # the most the rounding of the costs can change the objective of a solution
+    rounding_error = 0.0 if exact else \
+        float(np.abs(integer_cost / cost_scale - cost) @ np.maximum(np.abs(model.lower), np.abs(model.upper)))
+    if not exact:
+        logger.warning(f'exact_solver "cp_sat" rounds the costs to 6 decimals, the bound is lowered by '
+                       f'{rounding_error}')
+    cp.Minimize(sum(int(coefficient) * variables[index] for index, coefficient in enumerate(integer_cost.tolist())
+                    if coefficient != 0))
+    for variable, value in zip(variables, np.rint(start).astype(np.int64).tolist()):
+        cp.AddHint(variable, value)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(time_limit, 1.0)
+    solver.parameters.relative_gap_limit = gap_tolerance
+    with profiler.timer('exact_solve.cp_sat'):
+        status = solver.Solve(cp)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return ExactResult(None, np.inf, -np.inf, False)
+    bound = solver.BestObjectiveBound() / cost_scale - rounding_error
+    values = np.array([solver.Value(variable) for variable in variables], dtype=float)
+    return ExactResult(values, float(cost @ values), bound, status == cp_model.OPTIMAL and exact)
+
+
+exact_solvers: dict[str, Callable[[LinearModel, float, float, np.ndarray], ExactResult]] = {
+    'highs': solve_with_highs,
+    'cp_sat': solve_with_cp_sat,
+}
+
+
+def get_exact_solver(name: str) -> Callable[[LinearModel, float, float, np.ndarray], ExactResult]:
+    if name not in exact_solvers:
+        raise ValueError(f'Unknown exact_solver {name}, expected one of {list(exact_solvers.keys())}')
+    return exact_solvers[name]
+
+
+def solve_exactly(parameters: Parameters, tables: list[Table], attendees: list[Attendee]) -> float:
+    """Improve the current arrangement, usually that of the reoptimization, with parameters.exact_solver in the time
+    left of max_run_time_seconds, stopping once the arrangement is within optimality_gap_tolerance of the best bound.
+
+    The tables keep their sizes, and the arrangement is only changed if the solver finds a better one, so it is never
+    worse than the one it starts from.  Returns the bound on the total score proven by the solver, -inf if it was not
+    run because no time was left or the arrangement is already within optimality_gap_tolerance of the lower bound.
+    """
+    problem = tables[0].problem
+    solver = get_exact_solver(parameters.exact_solver)
+    start_score = sum(table.score() for table in tables)
+    time_limit = parameters.max_run_time_seconds - problem.elapsed_seconds()
+    if time_limit <= 0 or problem.stop_execution:
+        logger.info(f'Exact solve with {parameters.exact_solver} skipped: no time left after the reoptimization')
+        return -np.inf
+    if optimality_gap(start_score, lower_bound(problem, parameters.max_table_size)) <= \
+            parameters.optimality_gap_tolerance:
+        logger.info(f'Exact solve with {parameters.exact_solver} skipped: the arrangement is within '
+                    f'optimality_gap_tolerance of the lower bound')
+        return -np.inf
+    with profiler.timer('exact_solve.build_model'):
+        seating_model = SeatingModel(tables, attendees)
+        start = seating_model.values_of_arrangement()
+    model = seating_model.model
+    logger.info(f'Exact solve with {parameters.exact_solver}: {model.num_variables} variables, {len(model.rows)} '
+                f'constraints, starting from score {start_score} with {time_limit:.1f} seconds left')
+    result = solver(model, parameters.max_run_time_seconds - problem.elapsed_seconds(),
+                    parameters.optimality_gap_tolerance, start)
+
+    if result.values is not None and result.objective < start_score - 1e-6 * (1 + abs(start_score)):
+        seating_model.seat(result.values, attendees)
+    score = sum(table.score() for table in tables)
+    logger.info(f'Exact solve {"proved optimal" if result.optimal else "stopped at the time limit with"} score '
+                f'{score}, best bound {result.bound}')
+    return result.bound
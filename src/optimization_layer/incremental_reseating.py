@@ -0,0 +1,77 @@
+import copy
+import logging
+import random
+from typing import Optional
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.optimization_layer.warm_start import warm_start
+from src.optimization_layer.reoptimize import iterate_reoptimization
+from src.util.progress import ProgressCallback
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def reseat_incrementally(parameters: Parameters, tables: list[Table], attendees: list[Attendee],
+                         previous_table_by_id: dict[str, int], changed_ids: set[str],
+                         rng: Optional[random.Random] = None,
+                         on_progress: Optional[ProgressCallback] = None) -> list[Table]:
+    """Seat the attendees as before, then reoptimize only the tables touched by the roster changes.
+
+    Unchanged attendees keep their previous table and added ones are seated at the smallest tables.  The tables
+    that lost, gained or changed an attendee, plus the incremental_extra_tables tables with the highest scores, are
+    then reoptimized; moving an attendee away from their previous table costs movement_penalty, by default the
+    automatic_movement_penalty of the previous arrangement.  The tables must be initialized with the new attendees.
+    on_progress is passed to iterate_reoptimization.  Returns the reoptimized tables.
+    """
+    for attendee in attendees:
+        attendee.previous_table_id = previous_table_by_id.get(str(attendee.id).strip())
+        if attendee.previous_table_id is not None and not 0 <= attendee.previous_table_id < len(tables):
+            # the table is gone, so the attendee moves wherever they sit
+            attendee.previous_table_id = None
+    warm_start(tables, attendees, previous_table_by_id, parameters)
+    problem = tables[0].problem
+    if parameters.movement_penalty is None:
+        problem.set_movement_penalty(automatic_movement_penalty(tables))
+        logger.info(f'movement_penalty: {problem.movement_penalty}')
+    elif parameters.movement_penalty == 0:
+        logger.warning('movement_penalty is 0, so the reoptimized tables may be reshuffled; leave it empty for an '
+                       'automatic penalty')
+
+    affected_tables = {tables[previous_table_by_id[attendee_id]] for attendee_id in changed_ids
+                       if 0 <= previous_table_by_id.get(attendee_id, -1) < len(tables)}
+    affected_tables.update(attendee.assigned_to_table for attendee in attendees
+                           if attendee.previous_table_id is None or
+                           attendee.previous_table_id != attendee.assigned_to_table.table_id)
+    other_tables = [table for table in tables if table not in affected_tables]
+    other_scores = problem.scores_by_table()[[table.table_id for table in other_tables]]
+    extra_tables = [other_tables[index] for index in np.argsort(-other_scores, kind='stable')
+                    [:parameters.incremental_extra_tables]]
+    neighborhood = sorted(affected_tables.union(extra_tables), key=lambda table: table.table_id)
+    logger.info(f'Reoptimizing {len(neighborhood)} of {len(tables)} tables: {len(affected_tables)} affected by the '
+                f'roster changes and {len(extra_tables)} with the highest scores')
+
+    # checkpoints only hold the attendees of the tables being reoptimized, so they are not written
+    neighborhood_parameters = copy.copy(parameters)
+    neighborhood_parameters.checkpoint_every_seconds = 0
+    if len(neighborhood) > 1:
+        iterate_reoptimization(neighborhood_parameters, neighborhood, rng, on_progress)
+
+    num_moved = sum(1 for attendee in attendees
+                    if attendee.previous_table_id is not None and
+                    attendee.previous_table_id != attendee.assigned_to_table.table_id)
+    logger.info(f'{num_moved} previously seated attendees moved to another table')
+    return neighborhood
+
+
+def automatic_movement_penalty(tables: list[Table], fraction: float = 0.25) -> float:
+    """fraction of the median, over the seated attendees, of the decrease in score if the attendee left their table
+    (in absolute value), rounded to 2 decimals and 1 if that is 0.  Only moves that improve the score by more than
+    this are made, so most attendees keep their table."""
+    decreases = [abs(table.marginal_score_if_attendee_is_removed(attendee))
+                 for table in tables for attendee in table.attendees]
+    penalty = round(fraction * float(np.median(decreases)), 2) if len(decreases) > 0 else 0.0
+    return penalty if penalty > 0 else 1.0
@@ -1,12 +1,17 @@
-from typing import Collection, List
+import datetime
+from typing import Collection, List, Optional
 
 from src.parameters.parameters import Parameters
 from src.entity.attendee import Attendee
+from src.entity.problem import Problem
 from src.entity.table import Table
 
 
-def initialize_tables(parameters: Parameters, attendees: Collection[Attendee]) -> List[Table]:
-    Table.initialize_parameters(parameters, attendees)
-    tables = [Table(table_id) for table_id in range(Table.num_tables)]
-    print(Table.upper_bound_by_item)
+def initialize_tables(parameters: Parameters, attendees: Collection[Attendee],
+                      start_time: Optional[datetime.datetime] = None, num_tables: Optional[int] = None) -> List[Table]:
+    """Empty tables of a new Problem for the attendees, whose clock starts at start_time (now if not given).  There are
+    num_tables tables, by default the fewest of max_table_size that seat the attendees."""
+    problem = Problem(parameters, attendees, start_time, num_tables)
+    tables = [Table(table_id, problem) for table_id in range(problem.num_tables)]
+    print(problem.upper_bound_by_item)
     return tables
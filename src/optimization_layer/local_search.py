@@ -0,0 +1,122 @@
+import logging
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.util.profiling import profiler
+
+logger = logging.getLogger(__name__)
+
+
+def swap_local_search(tables: list[Table], parameters: Parameters) -> float:
+    """Repeatedly make the best improving swap of two attendees at different tables, until no swap improves the score.
+
+    The best swap of every pair of tables is kept, and after a swap only the pairs involving the two changed tables
+    are evaluated again.  Stops early at max_run_time_seconds or ctrl-c.  Returns the change in the total score.
+    """
+    with profiler.timer('swap_local_search'):
+        return _swap_local_search(tables, parameters)
+
+
+def _swap_local_search(tables: list[Table], parameters: Parameters) -> float:
+    num_tables = len(tables)
+    if num_tables < 2:
+        return 0.0
+    problem = tables[0].problem
+    # best_change[i, j] (i < j) is the change in score of the best swap between tables[i] and tables[j]
+    best_change = np.full((num_tables, num_tables), np.inf)
+    best_swap: dict[tuple[int, int], tuple[Attendee, Attendee]] = dict()
+
+    def evaluate_pair(i: int, j: int) -> None:
+        change, attendee1, attendee2 = best_swap_between_tables(tables[i], tables[j])
+        best_change[i, j] = change
+        best_swap[(i, j)] = (attendee1, attendee2)
+
+    for i in range(num_tables):
+        for j in range(i + 1, num_tables):
+            evaluate_pair(i, j)
+
+    change_in_score = 0.0
+    num_swaps = 0
+    while True:
+        if problem.stop_execution:
+            break
+        if problem.elapsed_seconds() >= parameters.max_run_time_seconds:
+            break
+        i, j = np.unravel_index(np.argmin(best_change), best_change.shape)
+        if best_change[i, j] >= -1e-9:
+            break
+        attendee1, attendee2 = best_swap[(i, j)]
+        change_in_score += swap_attendees(attendee1, attendee2)
+        num_swaps += 1
+        evaluate_pair(i, j)
+        for k in range(num_tables):
+            if k != i and k != j:
+                for changed in (i, j):
+                    evaluate_pair(min(k, changed), max(k, changed))
+
+    logger.info(f'Swap local search made {num_swaps} swaps, change in score: {change_in_score}')
+    return change_in_score
+
+
+def best_swap_between_tables(table1: Table, table2: Table) -> tuple[float, Attendee, Attendee]:
+    """Change in the total score of the best swap of an attendee of table1 with an attendee of table2.
+
+    With score() written as a sum of pair scores (Problem.pair_score_matrix) plus a score per attendee, swapping a and
+    b changes table1 by pair_scores(b, table1 without a) - pair_scores(a, table1 without a), and similarly table2.
+    """
+    attendees1 = list(table1.attendees)
+    attendees2 = list(table2.attendees)
+    if len(attendees1) == 0 or len(attendees2) == 0:
+        return np.inf, None, None
+    attendees = attendees1 + attendees2
+    num1 = len(attendees1)
+    problem = table1.problem
+
+    profiles = np.array([attendee.profile_id for attendee in attendees], dtype=np.int64)
+    self_scores = problem.profile_self_score[profiles]
+    # sum of the pair scores of each attendee with everyone at table1 (column 0) and table2 (column 1)
+    pair_scores_with_tables = (problem.marginal_score_matrix_of_tables(attendees, np.array([table1.table_id,
+                                                                                           table2.table_id])) -
+                               self_scores[:, None])
+    pair_scores_with_self = self_scores + problem.weight_by_code[problem.profile_codes[profiles]].sum(axis=1)
+    pair_scores_between = problem.pair_score_matrix(attendees1, attendees2)
+
+    with_table1, with_table2 = pair_scores_with_tables[:, 0], pair_scores_with_tables[:, 1]
+    change1 = (with_table1[None, num1:] - with_table1[:num1, None] + pair_scores_with_self[:num1, None] -
+               pair_scores_between)
+    change2 = (with_table2[:num1, None] - with_table2[None, num1:] + pair_scores_with_self[None, num1:] -
+               pair_scores_between)
+    changes = change1 + change2
+    if problem.movement_penalty != 0:
+        # attendees of table1 move to table2 and attendees of table2 to table1
+        penalties = problem.movement_penalty_matrix(attendees, np.array([table1.table_id, table2.table_id]))
+        changes += (penalties[:num1, 1] - penalties[:num1, 0])[:, None] + \
+            (penalties[num1:, 0] - penalties[num1:, 1])[None, :]
+    if problem.met_by_table is not None:
+        # a and b leave those they met at their tables and join those at the other table, except each other
+        item_ids = np.array([attendee.item_id for attendee in attendees], dtype=np.int64)
+        met = problem.met_by_table[np.ix_([table1.table_id, table2.table_id], item_ids)].astype(np.int64)
+        changes += problem.repeat_pair_penalty * ((met[1, :num1] - met[0, :num1])[:, None] +
+                                                  (met[0, num1:] - met[1, num1:])[None, :] -
+                                                  2 * problem.earlier_pairs.block(item_ids[:num1], item_ids[num1:]))
+    if problem.constraints is not None:
+        changes[problem.constraints.swap_forbidden(attendees1, attendees2, table1.table_id, table2.table_id)] = np.inf
+    row, column = np.unravel_index(np.argmin(changes), changes.shape)
+    return float(changes[row, column]), attendees1[row], attendees2[column]
+
+
+def swap_attendees(attendee1: Attendee, attendee2: Attendee) -> float:
+    """Swap the tables of two attendees and return the change in the total score"""
+    table1, table2 = attendee1.assigned_to_table, attendee2.assigned_to_table
+    change_in_score = table1.marginal_score_if_attendee_is_removed(attendee1)
+    table1.remove_attendee(attendee1)
+    change_in_score += table2.marginal_score_if_attendee_is_removed(attendee2)
+    table2.remove_attendee(attendee2)
+    change_in_score += table1.marginal_score_if_attendee_is_added(attendee2)
+    table1.add_attendee(attendee2)
+    change_in_score += table2.marginal_score_if_attendee_is_added(attendee1)
+    table2.add_attendee(attendee1)
+    return change_in_score
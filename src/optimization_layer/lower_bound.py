@@ -0,0 +1,112 @@
+import numpy as np
+
+from src.entity.problem import Problem
+
+
+def balanced_sum_of_squares(total: int, num_tables: int) -> int:
+    """Smallest sum of squares of num_tables counts adding up to total: spread as evenly as possible"""
+    quotient, remainder = divmod(total, num_tables)
+    return (num_tables - remainder) * quotient * quotient + remainder * (quotient + 1) * (quotient + 1)
+
+
+def concentrated_sum_of_squares(total: int, max_table_size: int) -> int:
+    """Largest sum of squares of counts of at most max_table_size adding up to total: fill tables one at a time"""
+    quotient, remainder = divmod(total, max_table_size)
+    return quotient * max_table_size * max_table_size + remainder * remainder
+
+
+def lower_bound(problem: Problem, max_table_size: int) -> float:
+    """A lower bound on the total score of any arrangement of the attendees of the problem at its num_tables tables.
+
+    With c the counts of a table, the sameness score of all pairs (including each attendee with itself) is
+    default_different_score / 2 * (sum of c^2 + number of attribute types * table size), so together with the quadratic
+    penalty and the overrides of an item with itself the score is, summed over tables, a weighted sum of squared counts,
+    plus the cross products of the counts of override pairs, plus a constant.  Each sum of squares is bounded by the
+    most balanced (or, for a negative weight, the most concentrated) split of the item over the tables.  A positive
+    cross product is at least the balanced sum of squares of the attendees having both items.  The negative ones
+    together are at least the larger of two bounds: each override on its own filling every table it can, and the most
+    negative scores of each attendee with the others it could sit with (negative_override_bound).
+
+    The bound is tight for the quadratic penalty but weak when there are overrides, negative ones in particular, since
+    each term is bounded separately: the gap it gives then overstates how far the arrangement is from optimal, and
+    optimality_gap_tolerance may never be reached.
+    """
+    num_tables = problem.num_tables
+    num_attribute_types = problem.profile_codes.shape[1]
+    num_attendees = int(problem.num_by_profile.sum())
+    total_by_code = np.zeros(len(problem.items_by_code), dtype=np.int64)
+    np.add.at(total_by_code, problem.profile_codes, problem.num_by_profile[:, None])
+
+    # pair of each attendee with itself
+    override_with_itself = problem.override_matrix[problem.profile_codes[:, :, None],
+                                                   problem.profile_codes[:, None, :]].sum(axis=(1, 2))
+    bound = (problem.default_different_score * num_attribute_types * num_attendees / 2 +
+             float(problem.num_by_profile @ override_with_itself))
+
+    square_weights = problem.weight_by_code + problem.default_different_score / 2 + np.diagonal(problem.override_matrix)
+    for code, weight in enumerate(square_weights.tolist()):
+        total = int(total_by_code[code])
+        if weight >= 0:
+            bound += weight * balanced_sum_of_squares(total, num_tables)
+        else:
+            bound += weight * concentrated_sum_of_squares(total, max_table_size)
+
+    negative_overrides = 0.0
+    for code1, code2 in zip(*np.nonzero(problem.override_matrix)):
+        if code1 == code2:
+            continue
+        override = float(problem.override_matrix[code1, code2])
+        if override > 0:
+            has_both = (problem.profile_codes == code1).any(axis=1) & (problem.profile_codes == code2).any(axis=1)
+            bound += override * balanced_sum_of_squares(int(problem.num_by_profile[has_both].sum()), num_tables)
+        else:
+            total1, total2 = int(total_by_code[code1]), int(total_by_code[code2])
+            negative_overrides += override * min(total1 * min(total2, max_table_size),
+                                                 total2 * min(total1, max_table_size))
+    if negative_overrides < 0:
+        bound += max(negative_overrides, negative_override_bound(problem, max_table_size))
+    return bound
+
+
+def negative_override_bound(problem: Problem, max_table_size: int) -> float:
+    """A lower bound on the sum, over the tables, of the cross products of the counts of the negative overrides
+    (between different items).
+
+    The sum is over the ordered pairs of attendees at a table, including each attendee with itself, of the negative
+    overrides of the first attendee's items with the second's.  The attendees with themselves add a constant.  Every
+    attendee is the first of a pair with at most max_table_size - 1 others, so adds at least the sum of its
+    max_table_size - 1 most negative scores with the other attendees.  With too many profiles to compare them all, the
+    score of a pair is bounded by the most negative override of each item of the first attendee with each attribute
+    type.
+    """
+    negative = np.minimum(problem.override_matrix, 0.0)
+    np.fill_diagonal(negative, 0.0)
+    codes = problem.profile_codes
+    num_by_profile = problem.num_by_profile
+    with_itself = negative[codes[:, :, None], codes[:, None, :]].sum(axis=(1, 2))
+    num_companions = max_table_size - 1
+    num_profiles = len(codes)
+    if num_profiles <= problem.max_profiles_for_interaction_matrix:
+        indicators = np.zeros((num_profiles, len(problem.items_by_code)))
+        np.put_along_axis(indicators, codes, 1.0, axis=1)
+        # pair_scores[p, q] is the score of an attendee of profile p with one of profile q, most negative first
+        pair_scores = indicators @ negative @ indicators.T
+        order = np.argsort(pair_scores, axis=1, kind='stable')
+        pair_scores = np.take_along_axis(pair_scores, order, axis=1)
+        # the other attendees of each profile, not counting the attendee itself
+        available = num_by_profile[order] - (order == np.arange(num_profiles)[:, None])
+        before = np.cumsum(available, axis=1) - available
+        companions = np.clip(num_companions - before, 0, available)
+        companion_scores = (companions * pair_scores).sum(axis=1)
+    else:
+        # the most negative override of each code with each attribute type, summed over the attendee's codes
+        codes_by_type = [np.unique(codes[:, index]) for index in range(codes.shape[1])]
+        min_by_type = np.stack([negative[:, type_codes].min(axis=1) for type_codes in codes_by_type], axis=1)
+        min_by_type = min_by_type.sum(axis=1)
+        companion_scores = num_companions * min_by_type[codes].sum(axis=1)
+    return float(num_by_profile @ (with_itself + companion_scores))
+
+
+def optimality_gap(total_score: float, bound: float) -> float:
+    """Relative gap between the score of an arrangement and the lower bound"""
+    return (total_score - bound) / max(abs(total_score), 1.0)
@@ -0,0 +1,113 @@
+import copy
+import datetime
+import logging
+import random
+from typing import Optional, TYPE_CHECKING
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.entity.pair_counts import PairCounts
+from src.optimization_layer.develop_initial_solution import initial_solution
+from src.optimization_layer.local_search import swap_local_search
+from src.optimization_layer.reoptimize import iterate_reoptimization
+from src.optimization_layer.print_attendees_assigned_to_tables import output_solution, output_summary
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def seat_rounds(parameters: Parameters, tables: list[Table], attendees: list[Attendee],
+                rng: Optional[random.Random] = None) -> list[np.ndarray]:
+    """Seat the attendees parameters.num_rounds times, with as few pairs as possible sharing a table more than once.
+
+    The first pass builds each round in turn with initial_solution and reoptimizes it, penalizing by
+    repeat_pair_penalty the pairs that met in the rounds before.  Each further pass (multi_round_passes in all)
+    reoptimizes every round from its arrangement, penalizing the pairs that met in any other round, so that it can
+    also move pairs that a later round made meet again.  The rounds share max_run_time_seconds and max_iterations
+    evenly, a round that stops early leaves its time to the others.  Returns the table of each attendee (by item_id)
+    in each round.
+    """
+    if rng is None:
+        rng = random.Random(parameters.random_seed)
+    problem = tables[0].problem
+    run_start_time = problem.start_time
+    steps = [round_number for _ in range(max(1, parameters.multi_round_passes))
+             for round_number in range(parameters.num_rounds)]
+    step_parameters = copy.copy(parameters)
+    # checkpoints only hold one round, so they are not written
+    step_parameters.checkpoint_every_seconds = 0
+    step_parameters.max_iterations = max(1, parameters.max_iterations // len(steps))
+    table_ids_by_round: list[Optional[np.ndarray]] = [None] * parameters.num_rounds
+
+    try:
+        for step, round_number in enumerate(steps):
+            remaining_seconds = parameters.max_run_time_seconds - \
+                (datetime.datetime.now() - run_start_time).total_seconds()
+            step_parameters.max_run_time_seconds = max(0.0, remaining_seconds) / (len(steps) - step)
+            previous_table_ids = table_ids_by_round[round_number]
+            if previous_table_ids is not None and (remaining_seconds <= 0 or problem.stop_execution):
+                continue
+            other_rounds = [table_ids for other_round, table_ids in enumerate(table_ids_by_round)
+                            if other_round != round_number and table_ids is not None]
+            seat_round(tables, attendees, previous_table_ids, other_rounds)
+            problem.start_time = datetime.datetime.now()
+            if previous_table_ids is None:
+                initial_solution(tables, attendees, step_parameters)
+                if parameters.swap_local_search:
+                    swap_local_search(tables, step_parameters)
+            iterate_reoptimization(step_parameters, tables, rng)
+            table_ids_by_round[round_number] = table_ids_by_item_id(attendees)
+            logger.info(f'Round {round_number + 1}: score {sum(table.score() for table in tables)} with '
+                        f'{int(problem.repeats_by_table.sum())} pairs that met in another round')
+    finally:
+        problem.start_time = run_start_time
+
+    all_pairs = PairCounts(len(attendees), table_ids_by_round)
+    logger.info(f'{all_pairs.num_repeated_pairs()} pairs of attendees share a table in more than one round, '
+                f'{all_pairs.num_repeats()} repeated meetings in all')
+    return table_ids_by_round
+
+
+def table_ids_by_item_id(attendees: list[Attendee]) -> np.ndarray:
+    """The table of each attendee, by item_id"""
+    table_ids = np.zeros(len(attendees), dtype=np.int64)
+    table_ids[[attendee.item_id for attendee in attendees]] = [attendee.assigned_to_table.table_id
+                                                               for attendee in attendees]
+    return table_ids
+
+
+def seat_round(tables: list[Table], attendees: list[Attendee], table_ids: Optional[np.ndarray],
+               other_rounds: list[np.ndarray]) -> None:
+    """Empty the tables, penalize the pairs that met in other_rounds, then seat the attendees at table_ids (by item_id,
+    None to leave the tables empty)"""
+    for table in tables:
+        for attendee in list(table.attendees):
+            table.remove_attendee(attendee)
+    tables[0].problem.set_earlier_pairs(PairCounts(len(attendees), other_rounds))
+    if table_ids is not None:
+        for attendee in attendees:
+            tables[table_ids[attendee.item_id]].add_attendee(attendee)
+
+
+def output_rounds(parameters: Parameters, tables: list[Table], attendees: list[Attendee],
+                  table_ids_by_round: list[np.ndarray]) -> tuple['pd.DataFrame', 'pd.DataFrame']:
+    """Table assignments and table summary of every round, with the round first.
+
+    The scores of a round include repeat_pair_penalty for the pairs that met in the rounds before it, so that a pair
+    meeting in k rounds adds the penalty k * (k - 1) / 2 times to the total score.
+    """
+    import pandas as pd
+    solutions = list()
+    summaries = dict()
+    for round_number, table_ids in enumerate(table_ids_by_round):
+        seat_round(tables, attendees, table_ids, table_ids_by_round[:round_number])
+        solution = output_solution(parameters, tables)
+        solution.insert(0, 'Round', round_number + 1)
+        solutions.append(solution)
+        summaries[round_number + 1] = output_summary(parameters, tables)
+    return pd.concat(solutions, ignore_index=True), pd.concat(summaries, names=['Round'])
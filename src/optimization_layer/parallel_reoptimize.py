@@ -0,0 +1,72 @@
+import datetime
+import logging
+import os
+import random
+import signal
+from concurrent.futures import ProcessPoolExecutor
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.optimization_layer.initialize_tables import initialize_tables
+from src.optimization_layer.reoptimize import iterate_reoptimization, perturb_tables
+from src.data_layer.checkpoint import write_checkpoint
+
+logger = logging.getLogger(__name__)
+
+
+def parallel_reoptimization(parameters: Parameters, tables: list[Table], attendees: list[Attendee]) -> None:
+    """Run parameters.parallel_starts independent reoptimizations in a process pool and keep the best arrangement.
+
+    The first start continues from the current arrangement, the others from a randomly perturbed copy of it.  Start i
+    uses the seed random_seed + i (a random base seed is drawn if random_seed is not set), so a start can be repeated
+    with the same random_seed and the same number of iterations.  All starts share the max_run_time_seconds deadline.
+    """
+    base_seed = parameters.random_seed
+    if base_seed is None:
+        base_seed = random.SystemRandom().randrange(2 ** 32)
+    seeds = [base_seed + start for start in range(parameters.parallel_starts)]
+    table_ids = [attendee.assigned_to_table.table_id for attendee in attendees]
+    logger.info(f'Running {len(seeds)} reoptimizations in parallel with seeds {seeds}')
+
+    start_time = tables[0].problem.start_time
+    with ProcessPoolExecutor(max_workers=min(len(seeds), os.cpu_count() or 1)) as executor:
+        futures = [executor.submit(_reoptimize_from_start, parameters, attendees, table_ids, seed, start > 0,
+                                   start_time)
+                   for start, seed in enumerate(seeds)]
+        results = [future.result() for future in futures]
+
+    for seed, score, _ in results:
+        logger.info(f'Start with seed {seed} finished with score {score}')
+    best_seed, best_score, best_table_ids = min(results, key=lambda result: result[1])
+    logger.info(f'Best score {best_score} found with seed {best_seed}')
+
+    for table in tables:
+        for attendee in list(table.attendees):
+            table.remove_attendee(attendee)
+    for attendee, table_id in zip(attendees, best_table_ids):
+        tables[table_id].add_attendee(attendee)
+    if parameters.checkpoint_every_seconds > 0:
+        for attendee in attendees:
+            attendee.move_assignment_to_best()
+        write_checkpoint(parameters.data_directory / parameters.checkpoint_file_name, attendees, best_score, None)
+
+
+def _reoptimize_from_start(parameters: Parameters, attendees: list[Attendee], table_ids: list[int],
+                           seed: int, perturb: bool, start_time: datetime.datetime) -> tuple[int, float, list[int]]:
+    # the tables and their problem are rebuilt in the worker process, sharing the main process' deadline
+    tables = initialize_tables(parameters, attendees, start_time)
+    # on ctrl-c finish the current iteration and return the best answer
+    signal.signal(signal.SIGINT, tables[0].problem.stop)
+    for attendee, table_id in zip(attendees, table_ids):
+        tables[table_id].add_attendee(attendee)
+
+    # only the main process writes checkpoints
+    parameters.checkpoint_every_seconds = 0
+    rng = random.Random(seed)
+    if perturb:
+        perturb_tables(tables, rng, num_swaps=len(attendees))
+    iterate_reoptimization(parameters, tables, rng)
+
+    score = sum(table.score() for table in tables)
+    return seed, score, [attendee.assigned_to_table.table_id for attendee in attendees]
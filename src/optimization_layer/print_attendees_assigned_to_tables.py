@@ -1,15 +1,28 @@
-from typing import Union
+from typing import Union, TYPE_CHECKING
 import logging
 
-import pandas as pd
 import numpy as np
 
 from src.parameters.parameters import Parameters
 from src.entity.table import Table
+from src.util.profiling import profiler
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger: logging.Logger = logging.getLogger(__name__)
 
 
+def _import_pandas():
+    """pandas is only imported once output is produced, it is not needed to optimize"""
+    import pandas as pd
+    # the data frames are written to the log in full
+    pd.options.display.max_rows = None
+    pd.options.display.max_columns = None
+    pd.options.display.width = None
+    return pd
+
+
 def print_tables_compressed(tables: list[Table]):
     tables_to_print = {table: '; '.join(str(attendee) for attendee in table.attendees) for table in tables}
     logger.info("Table\tAttendee")
@@ -17,7 +30,13 @@ def print_tables_compressed(tables: list[Table]):
         logger.info(f"{str(table)}\t{attendees_to_print}")
 
 
-def output_solution(parameters: Parameters, tables: list[Table]) -> pd.DataFrame:
+def output_solution(parameters: Parameters, tables: list[Table]) -> 'pd.DataFrame':
+    with profiler.timer('output_solution'):
+        return _output_solution(parameters, tables)
+
+
+def _output_solution(parameters: Parameters, tables: list[Table]) -> 'pd.DataFrame':
+    pd = _import_pandas()
     attribute_lists: dict[str, list[str]] = {attribute_name: [] for attribute_name in parameters.attribute_field_names}
     table_id: list[int] = list()
     attendee_id: list[Union[str, int]] = list()
@@ -40,24 +59,28 @@ def output_solution(parameters: Parameters, tables: list[Table]) -> pd.DataFrame
     return table_assignments_df
 
 
-def output_summary(parameters: Parameters, tables: list[Table]) -> pd.DataFrame:
-    attendee_solution_df = output_solution(parameters, tables)
-    # attendee_solution_df.set_index('Table')
-    table_scores_df = pd.DataFrame({"Table": [table.table_id + 1 for table in tables],
-                                    "Score": [table.score() for table in tables],
-                                    "Penalty": [table.upper_bound_violations() for table in tables],
-                                    "Table_Size": [len(table.attendees) for table in tables]})
-    table_scores_df.set_index('Table', inplace=True)
+def output_summary(parameters: Parameters, tables: list[Table]) -> 'pd.DataFrame':
+    with profiler.timer('output_summary'):
+        return _output_summary(parameters, tables)
+
 
-    upper_bound_df = Table.build_upper_bound_df()
-    print(upper_bound_df.transpose())
+def _output_summary(parameters: Parameters, tables: list[Table]) -> 'pd.DataFrame':
+    """Score, upper bound violations, size and number of attendees with each item of each table.
 
-    summary_df = table_scores_df
+    Everything comes from the counts the tables keep up to date, so no attendee is visited.
+    """
+    pd = _import_pandas()
+    problem = tables[0].problem
+    table_ids = np.array([table.table_id for table in tables], dtype=np.int64)
+    counts = problem.counts[table_ids]
+    summary: dict[str, np.ndarray] = {"Score": problem.scores_by_table()[table_ids],
+                                      "Penalty": problem.upper_bound_violations_by_table()[table_ids],
+                                      "Table_Size": np.array([len(table.attendees) for table in tables])}
     for attribute_name in parameters.attribute_field_names:
-        summary_df = summary_df.join(attendee_solution_df.pivot_table(index="Table",
-                                                                      values=parameters.id_field_name,
-                                                                      columns=attribute_name,
-                                                                      fill_value=0,
-                                                                      aggfunc=np.count_nonzero))
+        codes = sorted((code for code, (attribute_type, _) in enumerate(problem.items_by_code)
+                        if attribute_type == attribute_name), key=lambda code: problem.items_by_code[code][1])
+        for code in codes:
+            item = problem.items_by_code[code][1]
+            summary[item if item not in summary else f'{attribute_name}_{item}'] = counts[:, code]
 
-    return summary_df
+    return pd.DataFrame(summary, index=pd.Index(table_ids + 1, name="Table"))
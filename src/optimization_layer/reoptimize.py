@@ -1,21 +1,92 @@
 import logging
 import random
-import datetime
+import functools
+import contextlib
+from typing import Iterator, Optional
 
 from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
 from src.entity.table import Table
 from src.optimization_layer.assign_attendees_to_tables import assign_attendees_to_tables
+from src.optimization_layer.destroy_operators import destroy_operators, AdaptiveOperatorSelector
+from src.optimization_layer.lower_bound import lower_bound, optimality_gap
+from src.optimization_layer.local_search import swap_local_search, swap_attendees
+from src.optimization_layer.acceptance_criteria import AcceptanceCriterion, HillClimbing, build_acceptance_criterion
 from src.optimization_layer.print_attendees_assigned_to_tables import output_summary
-import src.globals as _globals
+from src.data_layer.checkpoint import write_checkpoint
+from src.util.profiling import profiler
+from src.util.progress import ProgressEvent, ProgressCallback
 
 logger = logging.getLogger(__name__)
 
 
-def iterate_reoptimization(parameters: Parameters, tables: list[Table]):
+def iterate_reoptimization(parameters: Parameters, tables: list[Table], rng: Optional[random.Random] = None,
+                           on_progress: Optional[ProgressCallback] = None):
+    """Reoptimize the tables until max_iterations, max_run_time_seconds, ctrl-c or optimality_gap_tolerance.
+
+    on_progress is called with each event of reoptimization_events, and stops the reoptimization by returning True.
+    """
+    with contextlib.closing(reoptimization_events(parameters, tables, rng)) as events:
+        for event in events:
+            if on_progress is not None and on_progress(event):
+                logger.info('Stopped by the progress callback')
+                break
+
+
+def reoptimization_events(parameters: Parameters, tables: list[Table],
+                          rng: Optional[random.Random] = None) -> Iterator[ProgressEvent]:
+    """The reoptimization as a generator: yields a start event and then an event each time the best score improves.
+
+    Closing the generator (e.g. breaking out of a for loop over it) stops the reoptimization as ctrl-c does.  Either
+    way the tables are left with the best arrangement found, which is checkpointed.
+    """
+    if rng is None:
+        rng = random.Random(parameters.random_seed)
+    acceptance_criterion = build_acceptance_criterion(parameters, rng)
+    attendees = [attendee for table in tables for attendee in table.attendees]
+    for attendee in attendees:
+        attendee.move_assignment_to_best()
+    try:
+        yield from _iterate_reoptimization(parameters, tables, attendees, rng, acceptance_criterion)
+    finally:
+        if not isinstance(acceptance_criterion, HillClimbing):
+            # the current arrangement may be worse than the best one found
+            move_attendees_to_best_assignment(attendees)
+        if parameters.checkpoint_every_seconds > 0:
+            for attendee in attendees:
+                attendee.move_assignment_to_best()
+            write_checkpoint(parameters.data_directory / parameters.checkpoint_file_name, attendees,
+                             sum(table.score() for table in tables), rng.getstate())
+
+
+def _iterate_reoptimization(parameters: Parameters, tables: list[Table], attendees: list[Attendee],
+                            rng: random.Random, acceptance_criterion: AcceptanceCriterion) -> Iterator[ProgressEvent]:
     total_score = sum(table.score() for table in tables)
+    best_score = total_score
     print(f'Initial solution score: {total_score}')
 
-    if parameters.default_sameness_score == 0.0 and len(parameters.override_sameness_score) == 0:
+    problem = tables[0].problem
+    bound = lower_bound(problem, parameters.max_table_size)
+    # when only some of the tables are reoptimized, the others keep their score
+    score_of_other_tables = float(problem.scores_by_table().sum()) - total_score
+
+    def gap(score: float) -> float:
+        return optimality_gap(score + score_of_other_tables, bound)
+
+    def progress_event(event: str, iteration: Optional[int]) -> ProgressEvent:
+        # made when the tables hold the best arrangement
+        return ProgressEvent(event, iteration, problem.elapsed_seconds(), best_score + score_of_other_tables, bound,
+                             gap(best_score), int(problem.upper_bound_violations_by_table().sum()),
+                             functools.partial(arrangement_by_id, tables))
+
+    logger.info(f'Lower bound: {bound}, optimality gap of the initial solution: {gap(total_score):.2%}')
+    yield progress_event('start', None)
+    if gap(total_score) <= parameters.optimality_gap_tolerance:
+        logger.info("Optimality gap is within optimality_gap_tolerance")
+        return
+
+    if parameters.default_sameness_score == 0.0 and len(parameters.override_sameness_score) == 0 and \
+            problem.movement_penalty == 0.0 and problem.earlier_pairs is None:
         pure_quadratic_penalty = True
         # test if initial solution is optimal
         total_penalty_score = sum(table.upper_bound_violations() for table in tables)
@@ -25,37 +96,182 @@ def iterate_reoptimization(parameters: Parameters, tables: list[Table]):
     else:
         pure_quadratic_penalty = False
 
+    operator_selector: Optional[AdaptiveOperatorSelector] = None
+    if parameters.large_neighborhood_search:
+        operator_selector = AdaptiveOperatorSelector(parameters.destroy_operators,
+                                                     parameters.destroy_operator_reaction_factor, rng)
+    # the flow reassignment never makes the score worse, so other acceptance criteria need a random perturbation first
+    num_perturbation_swaps = 0 if isinstance(acceptance_criterion, HillClimbing) else parameters.perturbation_swaps
+    # the table summary is only logged every summary_every_improvements improvements or summary_every_seconds seconds
+    improvements_since_summary = 0
+    last_summary_seconds = problem.elapsed_seconds()
+    last_checkpoint_seconds = last_summary_seconds
+
     for iteration in range(parameters.max_iterations):
-        if _globals.stop_execution:
+        if problem.stop_execution:
             return
-        if (datetime.datetime.now() - _globals.start_time).total_seconds() >= parameters.max_run_time_seconds:
+        elapsed_seconds = problem.elapsed_seconds()
+        if elapsed_seconds >= parameters.max_run_time_seconds:
             return
-        attendees_to_assign = list()
-        for table in tables:
-            attendee = random.choice(list(table.attendees))
-            attendees_to_assign.append(attendee)
-            table.remove_attendee(attendee)
+        budget_used = max(elapsed_seconds / parameters.max_run_time_seconds, iteration / parameters.max_iterations)
+        profiler.record_iteration(iteration, elapsed_seconds, total_score, best_score)
+        if 0 < parameters.checkpoint_every_seconds <= elapsed_seconds - last_checkpoint_seconds:
+            write_checkpoint(parameters.data_directory / parameters.checkpoint_file_name, attendees, best_score,
+                             rng.getstate())
+            last_checkpoint_seconds = elapsed_seconds
+
+        if parameters.swap_local_search and iteration > 0 and iteration % parameters.swap_local_search_interval == 0:
+            total_score += swap_local_search(tables, parameters)
+            if total_score < best_score:
+                best_score = total_score
+                for attendee in attendees:
+                    attendee.move_assignment_to_best()
+                logger.info(f'Iteration: {iteration} swap local search improved score: {total_score}, '
+                            f'optimality gap: {gap(total_score):.2%}')
+                yield progress_event('improved', iteration)
+
+        previous_tables: dict[Attendee, Table] = dict()
+        change_in_score = perturb_tables(tables, rng, num_perturbation_swaps, previous_tables)
+        if operator_selector is None:
+            operator_name = None
+            attendees_to_assign = [rng.choice(list(table.attendees)) for table in tables]
+            iteration_description = f'Iteration: {iteration}'
+        else:
+            operator_name = operator_selector.choose()
+            attendees_to_assign = destroy_operators[operator_name](tables, rng,
+                                                                   parameters.destroy_attendees_per_table)
+            iteration_description = f'Iteration: {iteration} ({operator_name})'
+        if problem.constraints is not None:
+            # pinned attendees stay, and groups move as one
+            attendees_to_assign = problem.constraints.movable(attendees_to_assign)
+        for attendee in attendees_to_assign:
+            previous_tables.setdefault(attendee, attendee.assigned_to_table)
+
+        change_in_score += reassign_attendees(attendees_to_assign, tables, parameters.assignment_solver)
+        new_total_score = total_score + change_in_score
+
+        if not acceptance_criterion.accept(total_score, new_total_score, budget_used):
+            if operator_selector is None and num_perturbation_swaps == 0:
+                # made it worse.  That should never happen
+                logger.error('new score worse')
+            # go back to the previous arrangement
+            for attendee in previous_tables.keys():
+                attendee.assigned_to_table.remove_attendee(attendee)
+            for attendee, table in previous_tables.items():
+                table.add_attendee(attendee)
+            if operator_selector is not None:
+                operator_selector.update(operator_name, 'rejected')
+            logger.info(f'{iteration_description} did not improve score')
+            continue
 
-        attendee_assigned_to_group = assign_attendees_to_tables(attendees_to_assign, tables)
+        if operator_selector is not None:
+            operator_selector.update(operator_name, 'improved' if new_total_score < total_score else 'accepted')
+        total_score = new_total_score
 
+        if total_score >= best_score:
+            logger.info(f'{iteration_description} did not improve score' if total_score == best_score else
+                        f'{iteration_description} accepted score: {total_score} (best score: {best_score})')
+            continue
+
+        best_score = total_score
+        for attendee in attendees:
+            attendee.move_assignment_to_best()
+        logger.info(f'{iteration_description} improved score: {total_score}, '
+                    f'optimality gap: {gap(total_score):.2%}')
+        if operator_selector is not None:
+            logger.info(f'Destroy operator weights: {operator_selector}')
+        yield progress_event('improved', iteration)
+        improvements_since_summary += 1
+        elapsed_seconds = problem.elapsed_seconds()
+        if (0 < parameters.summary_every_improvements <= improvements_since_summary or
+                0 < parameters.summary_every_seconds <= elapsed_seconds - last_summary_seconds):
+            logger.info(f'\n{output_summary(parameters, tables)}')
+            improvements_since_summary = 0
+            last_summary_seconds = elapsed_seconds
+        if gap(total_score) <= parameters.optimality_gap_tolerance:
+            logger.info("Optimality gap is within optimality_gap_tolerance")
+            return
+        if pure_quadratic_penalty:
+            # if only the quadratic penalty is being used, and if there are no upper-bound violations, then finished
+            total_penalty_score = sum(table.upper_bound_violations() for table in tables)
+            if total_penalty_score == 0:
+                logger.info("Found optimal arrangements")
+                return
+
+
+def arrangement_by_id(tables: list[Table]) -> dict[str, int]:
+    """Table number (1 for the first table) of each attendee ID at the tables"""
+    return {str(attendee.id).strip(): table.table_id + 1 for table in tables for attendee in table.attendees}
+
+
+def move_attendees_to_best_assignment(attendees: list[Attendee]) -> None:
+    """Seat every attendee at their best_assignment table"""
+    for attendee in attendees:
+        if attendee.assigned_to_table is not attendee.best_assignment:
+            attendee.assigned_to_table.remove_attendee(attendee)
+    for attendee in attendees:
+        if attendee.assigned_to_table is None:
+            attendee.best_assignment.add_attendee(attendee)
+
+
+def reassign_attendees(attendees_to_assign: list[Attendee], tables: list[Table], assignment_solver: str) -> float:
+    """Take the attendees off their tables and assign them back so that every table ends up with its original size.
+
+    Each round assigns at most one attendee (or group) to each table that still has seats to fill.  If the seating
+    constraints leave attendees that cannot be seated at the seats still to fill, every attendee goes back to their
+    table.  Returns the change in the total score.
+    """
+    change_in_score = 0.0
+    previous_tables = {attendee: attendee.assigned_to_table for attendee in attendees_to_assign}
+    seats_to_fill = {table: 0 for table in tables}
+    for attendee in attendees_to_assign:
+        table = attendee.assigned_to_table
+        change_in_score += table.marginal_score_if_attendee_is_removed(attendee)
+        table.remove_attendee(attendee)
+        seats_to_fill[table] += 1
+
+    attendees_left = list(attendees_to_assign)
+    while len(attendees_left) > 0:
+        tables_to_be_assigned = [table for table in tables if seats_to_fill[table] > 0]
+        attendee_assigned_to_group = assign_attendees_to_tables(attendees_left, tables_to_be_assigned,
+                                                                assignment_solver,
+                                                                [seats_to_fill[table] for table in
+                                                                 tables_to_be_assigned])
+        if len(attendee_assigned_to_group) == 0:
+            for attendee in attendees_to_assign:
+                if attendee.assigned_to_table is not None:
+                    attendee.assigned_to_table.remove_attendee(attendee)
+            for attendee, table in previous_tables.items():
+                table.add_attendee(attendee)
+            return 0.0
         for attendee, table in attendee_assigned_to_group:
-            attendee.assigned_to_table = table
+            change_in_score += table.marginal_score_if_attendee_is_added(attendee)
             table.add_attendee(attendee)
+            seats_to_fill[table] -= 1
+        attendees_left = [attendee for attendee in attendees_left if attendee.assigned_to_table is None]
+    return change_in_score
 
-        new_total_score = sum(table.score() for table in tables)
-        if new_total_score > total_score:
-            # made it worse.  That should never happen
-            logger.error('new score worse')
-        elif new_total_score == total_score:
-            logger.info(f'Iteration: {iteration} did not improve score')
-        else:
-            logger.info(f'Iteration: {iteration} improved score: {new_total_score}')
-            logger.info(f'\n{output_summary(parameters, tables)}')
-            if pure_quadratic_penalty:
-                # if only the quadratic penalty is being used, and if there are no upper-bound violations, then finished
-                total_penalty_score = sum(table.upper_bound_violations() for table in tables)
-                if total_penalty_score == 0:
-                    logger.info("Found optimal arrangements")
-                    return
-
-            total_score = new_total_score
+
+def perturb_tables(tables: list[Table], rng: random.Random, num_swaps: int,
+                   previous_tables: Optional[dict[Attendee, Table]] = None) -> float:
+    """Swap randomly chosen attendees between randomly chosen pairs of tables, keeping the table sizes and skipping
+    swaps the seating constraints forbid.
+
+    The table each moved attendee was at before is added to previous_tables.  Returns the change in the total score.
+    """
+    change_in_score = 0.0
+    if len(tables) < 2:
+        return change_in_score
+    constraints = tables[0].problem.constraints
+    for _ in range(num_swaps):
+        table1, table2 = rng.sample(tables, 2)
+        attendee1 = rng.choice(list(table1.attendees))
+        attendee2 = rng.choice(list(table2.attendees))
+        if constraints is not None and \
+                constraints.swap_forbidden([attendee1], [attendee2], table1.table_id, table2.table_id)[0, 0]:
+            continue
+        if previous_tables is not None:
+            previous_tables.setdefault(attendee1, table1)
+            previous_tables.setdefault(attendee2, table2)
+        change_in_score += swap_attendees(attendee1, attendee2)
+    return change_in_score
@@ -0,0 +1,67 @@
+import logging
+from math import ceil
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.optimization_layer.assign_attendees_to_tables import assign_attendees_to_tables
+from src.optimization_layer.develop_initial_solution import seat_group
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def warm_start(tables: list[Table], attendees: list[Attendee], table_by_id: dict[str, int],
+               parameters: Parameters) -> None:
+    """Seat the attendees at their table in table_by_id (0 for the first table), instead of initial_solution.
+
+    Attendees that are not in table_by_id, or whose table no longer exists or is full, are then seated with the
+    assignment solver, one at each of the smallest tables at a time.  IDs of table_by_id that are not attendees
+    any more are ignored.
+
+    With seating constraints the pinned attendees are seated first, at their pinned table, then the groups, largest
+    first, so that the others do not leave them without room.  A group keeps its table if all its members were there,
+    it has room and no one there must sit apart from them, else it is seated with seat_group.
+    """
+    constraints = tables[0].problem.constraints
+    for attendee in attendees:
+        attendee.assigned_to_table = None
+    if constraints is None:
+        units = [[attendee] for attendee in attendees]
+    else:
+        units = sorted(constraints.units(attendees),
+                       key=lambda unit: (constraints.pinned_table[unit[0].item_id] < 0, -len(unit)))
+    attendees_to_seat: list[Attendee] = list()
+    for unit in units:
+        unit_table_ids = {table_by_id.get(str(attendee.id).strip()) for attendee in unit}
+        table_id = unit_table_ids.pop() if len(unit_table_ids) == 1 else None
+        if constraints is not None and constraints.pinned_table[unit[0].item_id] >= 0:
+            table_id = int(constraints.pinned_table[unit[0].item_id])
+        if table_id is not None and 0 <= table_id < len(tables) and \
+                len(tables[table_id].attendees) + len(unit) <= parameters.max_table_size and \
+                (constraints is None or not constraints.forbidden([unit], np.array([table_id]))[0, 0]):
+            for attendee in unit:
+                tables[table_id].add_attendee(attendee)
+        elif len(unit) > 1:
+            seat_group(tables, unit, ceil(len(attendees) / len(tables)), parameters)
+        else:
+            attendees_to_seat.extend(unit)
+    logger.info(f'Warm start: {len(attendees) - len(attendees_to_seat)} attendees seated at their previous table, '
+                f'{len(attendees_to_seat)} to be seated')
+
+    while len(attendees_to_seat) > 0:
+        smallest_table_size = min(len(table.attendees) for table in tables)
+        smallest_tables = [table for table in tables if len(table.attendees) == smallest_table_size]
+        assignments = assign_attendees_to_tables(attendees_to_seat, smallest_tables, parameters.assignment_solver)
+        if len(assignments) == 0:
+            # the seating constraints forbid the smallest tables, so use any table with room
+            assignments = assign_attendees_to_tables(attendees_to_seat,
+                                                     [table for table in tables
+                                                      if len(table.attendees) < parameters.max_table_size],
+                                                     parameters.assignment_solver)
+            if len(assignments) == 0:
+                raise ValueError(f'Could not seat {attendees_to_seat} within the seating constraints')
+        for attendee, table in assignments:
+            table.add_attendee(attendee)
+        attendees_to_seat = [attendee for attendee in attendees_to_seat if attendee.assigned_to_table is None]
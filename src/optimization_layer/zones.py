@@ -0,0 +1,180 @@
+import copy
+import datetime
+import logging
+import os
+import random
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from src.parameters.parameters import Parameters
+from src.entity.attendee import Attendee
+from src.entity.table import Table
+from src.optimization_layer.initialize_tables import initialize_tables
+from src.optimization_layer.develop_initial_solution import initial_solution, stratified_order
+from src.optimization_layer.local_search import swap_local_search
+from src.optimization_layer.reoptimize import iterate_reoptimization
+from src.data_layer.checkpoint import write_checkpoint
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def solve_by_zones(parameters: Parameters, tables: list[Table], attendees: list[Attendee],
+                   rng: Optional[random.Random] = None) -> None:
+    """Seat the attendees by splitting the tables into parameters.num_zones zones, instead of initial_solution and
+    iterate_reoptimization over all the tables.
+
+    The attendees are first split between the zones so that each zone gets its share of every item (split_into_zones).
+    Each zone is then a problem of its own, seated with initial_solution and reoptimized, the zones in parallel
+    processes.  Then zone_exchange_rounds times the zones are paired at random and the tables of each pair are
+    reoptimized together, so that attendees can move between zones.  The table scores do not depend on the other
+    tables, so each zone, and each pair, is optimized for the total score.  The stages share max_run_time_seconds and
+    max_iterations evenly.  Only the final arrangement is checkpointed.
+    """
+    if rng is None:
+        rng = random.Random(parameters.random_seed)
+    problem = tables[0].problem
+    num_zones = min(parameters.num_zones, len(tables))
+    zone_tables = [[tables[index] for index in zone] for zone in np.array_split(np.arange(len(tables)), num_zones)]
+    zone_by_item_id = split_into_zones(tables, attendees, zone_tables, parameters)
+    attendees_by_zone: list[list[Attendee]] = [list() for _ in zone_tables]
+    for attendee in attendees:
+        attendees_by_zone[zone_by_item_id[attendee.item_id]].append(attendee)
+    logger.info(f'Split {len(attendees)} attendees into {num_zones} zones of {[len(zone) for zone in zone_tables]} '
+                f'tables')
+
+    num_stages = 1 + (parameters.zone_exchange_rounds if num_zones > 1 else 0)
+    for stage in range(num_stages):
+        remaining_seconds = parameters.max_run_time_seconds - problem.elapsed_seconds()
+        if stage > 0 and (remaining_seconds <= 0 or problem.stop_execution):
+            break
+        stage_parameters = copy.copy(parameters)
+        stage_parameters.max_run_time_seconds = max(0.0, remaining_seconds) / (num_stages - stage)
+        stage_parameters.max_iterations = max(1, parameters.max_iterations // num_stages)
+        if stage == 0:
+            # each zone on its own, from an initial solution
+            subproblems = [(zone, None) for zone in zone_tables]
+        else:
+            # pairs of zones, from the current arrangement
+            order = rng.sample(range(num_zones), num_zones)
+            subproblems = [(zone_tables[zone1] + zone_tables[zone2],
+                            [attendee for zone in (zone1, zone2) for table in zone_tables[zone]
+                             for attendee in table.attendees])
+                           for zone1, zone2 in zip(order[0::2], order[1::2])]
+        jobs = list()
+        for subproblem_tables, subproblem_attendees in subproblems:
+            if subproblem_attendees is None:
+                subproblem_attendees = attendees_by_zone[zone_tables.index(subproblem_tables)]
+                local_table_ids = None
+            else:
+                local_table_ids = [subproblem_tables.index(attendee.assigned_to_table)
+                                   for attendee in subproblem_attendees]
+            jobs.append((subproblem_constraint_parameters(stage_parameters, subproblem_attendees, subproblem_tables),
+                         subproblem_attendees, local_table_ids, len(subproblem_tables), rng.randrange(2 ** 32)))
+
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+            results = list(executor.map(_solve_subproblem, *zip(*jobs)))
+
+        for (subproblem_tables, _), (_, subproblem_attendees, _, _, _), local_table_ids in \
+                zip(subproblems, jobs, results):
+            for table in subproblem_tables:
+                for attendee in list(table.attendees):
+                    table.remove_attendee(attendee)
+            for attendee, local_table_id in zip(subproblem_attendees, local_table_ids):
+                subproblem_tables[local_table_id].add_attendee(attendee)
+        logger.info(f'Zones {"solved" if stage == 0 else f"exchange round {stage}"}: score '
+                    f'{sum(table.score() for table in tables)}')
+
+    if parameters.checkpoint_every_seconds > 0:
+        for attendee in attendees:
+            attendee.move_assignment_to_best()
+        write_checkpoint(parameters.data_directory / parameters.checkpoint_file_name, attendees,
+                         sum(table.score() for table in tables), None)
+
+
+def split_into_zones(tables: list[Table], attendees: list[Attendee], zone_tables: list[list[Table]],
+                     parameters: Parameters) -> np.ndarray:
+    """The zone of each attendee (by item_id).  Each zone gets as many attendees as its tables seat when the table sizes
+    differ by at most one, and about its share of every item.
+
+    Pinned attendees go to the zone of their table, and a group to a single zone.  The others, in stratified_order,
+    each go to the zone with room where the items of the attendee are the least common relative to its size.
+    """
+    problem = tables[0].problem
+    constraints = problem.constraints
+    num_zones = len(zone_tables)
+    small_table_size, num_large_tables = divmod(len(attendees), len(tables))
+    table_sizes = np.full(len(tables), small_table_size)
+    table_sizes[:num_large_tables] += 1
+    index_by_table = {table: index for index, table in enumerate(tables)}
+    zone_sizes = np.array([sum(table_sizes[index_by_table[table]] for table in zone) for zone in zone_tables])
+    zone_by_table_id = {table.table_id: zone for zone, zone_of_tables in enumerate(zone_tables)
+                        for table in zone_of_tables}
+
+    zone_by_item_id = np.full(1 + max(attendee.item_id for attendee in attendees), -1, dtype=np.int64)
+    counts = np.zeros((num_zones, problem.counts.shape[1]), dtype=np.int64)
+    seated = np.zeros(num_zones, dtype=np.int64)
+
+    def seat(unit: list[Attendee], zone: int) -> None:
+        for attendee in unit:
+            zone_by_item_id[attendee.item_id] = zone
+            counts[zone, attendee.codes] += 1
+        seated[zone] += len(unit)
+
+    units = [[attendee] for attendee in stratified_order(attendees, parameters)] if constraints is None else \
+        sorted(constraints.units(stratified_order(attendees, parameters)),
+               key=lambda unit: (constraints.pinned_table[unit[0].item_id] < 0, -len(unit)))
+    for unit in units:
+        if constraints is not None and constraints.pinned_table[unit[0].item_id] >= 0:
+            seat(unit, zone_by_table_id[int(constraints.pinned_table[unit[0].item_id])])
+            continue
+        codes = np.concatenate([attendee.codes for attendee in unit])
+        shares = counts[:, codes].sum(axis=1) / zone_sizes
+        shares = np.where(seated + len(unit) <= zone_sizes, shares, np.inf)
+        if not np.isfinite(shares).any():
+            # pinned attendees and groups can fill a zone beyond its share
+            shares = np.where(seated + len(unit) <= np.array([len(zone) for zone in zone_tables]) *
+                              parameters.max_table_size, seated / zone_sizes, np.inf)
+        seat(unit, int(np.argmin(shares)))
+    return zone_by_item_id
+
+
+def subproblem_constraint_parameters(parameters: Parameters, attendees: list[Attendee],
+                                     tables: list[Table]) -> Parameters:
+    """The parameters of the problem of seating the attendees at the tables: the seating constraints are those among
+    the attendees, and the pinned tables are numbered within the tables"""
+    if tables[0].problem.constraints is None:
+        return parameters
+    ids = {str(attendee.id).strip() for attendee in attendees}
+    local_table_number = {table.table_id + 1: number for number, table in enumerate(tables, start=1)}
+    subproblem_parameters = copy.copy(parameters)
+    subproblem_parameters.pinned_seats = {attendee_id: local_table_number[table_number]
+                                          for attendee_id, table_number in parameters.pinned_seats.items()
+                                          if str(attendee_id).strip() in ids}
+    subproblem_parameters.sit_together, subproblem_parameters.sit_apart = \
+        [[[attendee_id for attendee_id in group if str(attendee_id).strip() in ids] for group in groups]
+         for groups in (parameters.sit_together, parameters.sit_apart)]
+    subproblem_parameters.sit_together = [group for group in subproblem_parameters.sit_together if len(group) > 1]
+    subproblem_parameters.sit_apart = [group for group in subproblem_parameters.sit_apart if len(group) > 1]
+    return subproblem_parameters
+
+
+def _solve_subproblem(parameters: Parameters, attendees: list[Attendee], table_ids: Optional[list[int]],
+                      num_tables: int, seed: int) -> list[int]:
+    # the subproblem is built in the worker process, its clock starts now
+    tables = initialize_tables(parameters, attendees, datetime.datetime.now(), num_tables)
+    # on ctrl-c finish the current iteration and return the best answer
+    signal.signal(signal.SIGINT, tables[0].problem.stop)
+    # only the main process writes checkpoints
+    parameters.checkpoint_every_seconds = 0
+    if table_ids is None:
+        initial_solution(tables, attendees, parameters)
+        if parameters.swap_local_search:
+            swap_local_search(tables, parameters)
+    else:
+        for attendee, table_id in zip(attendees, table_ids):
+            tables[table_id].add_attendee(attendee)
+    iterate_reoptimization(parameters, tables, random.Random(seed))
+    return [attendee.assigned_to_table.table_id for attendee in attendees]
@@ -1,12 +1,16 @@
 import os
 from pathlib import Path
+from typing import Optional, Any
 import yaml
 from yaml.scanner import ScannerError
 
 
 class Parameters:
-    def __init__(self, path_to_yaml=r"../../data_and_log_files/config.yml"):
-        """Read the config.yml configuration file and use it to populate the Parameters object"""
+    def __init__(self, path_to_yaml=r"../../data_and_log_files/config.yml", overrides: Optional[dict[str, Any]] = None):
+        """Read the config.yml configuration file and use it to populate the Parameters object.
+
+        overrides (e.g. from a batch manifest) take precedence over the file and must be known parameters.
+        """
 
         # set default values, which will be overwritten once the yml file is read
         # PyCharm also uses the below for 'intellisense'
@@ -20,6 +24,42 @@ class Parameters:
         self.override_sameness_score: list[tuple[str, str, str, str, float]] = list()
         self.max_run_time_seconds: int = 300
         self.max_iterations: int = 500
+        self.read_chunk_size: int = 100000
+        self.initial_solution_method: str = 'flow_by_item'
+        self.assignment_solver: str = 'network_flow'
+        self.random_seed: Optional[int] = None
+        self.parallel_starts: int = 1
+        self.large_neighborhood_search: bool = False
+        self.destroy_operators: list[str] = ['random', 'worst', 'violated_item', 'table_cluster']
+        self.destroy_attendees_per_table: int = 2
+        self.destroy_operator_reaction_factor: float = 0.1
+        self.acceptance_criterion: str = 'hill_climbing'
+        self.initial_temperature: float = 10.0
+        self.final_temperature: float = 0.1
+        self.late_acceptance_length: int = 50
+        self.perturbation_swaps: int = 1
+        self.swap_local_search: bool = False
+        self.swap_local_search_interval: int = 50
+        self.optimality_gap_tolerance: float = 0.0
+        self.summary_every_improvements: int = 0
+        self.summary_every_seconds: float = 60.0
+        self.checkpoint_every_seconds: float = 60.0
+        # None: automatic_movement_penalty of the previous arrangement
+        self.movement_penalty: Optional[float] = None
+        self.incremental_extra_tables: int = 10
+        self.num_rounds: int = 1
+        self.repeat_pair_penalty: float = 5.0
+        self.multi_round_passes: int = 2
+        # hard constraints by attendee ID: table number (1 for the first table) of pinned attendees, groups that sit
+        # at one table, and groups no two of whom share a table
+        self.pinned_seats: dict[str, int] = dict()
+        self.sit_together: list[list[str]] = list()
+        self.sit_apart: list[list[str]] = list()
+        # above 1, the tables are split into zones that are optimized separately, then in pairs of zones
+        self.num_zones: int = 1
+        self.zone_exchange_rounds: int = 2
+        # after the reoptimization, solve the seating as a mixed integer program: highs or cp_sat
+        self.exact_solver: Optional[str] = None
 
         # location of directories and files
         self.data_directory: Path = Path(r'..\..\data_and_log_files')
@@ -29,10 +69,11 @@ class Parameters:
         self.log_file_name = 'log.txt'
         self.table_assignments_file_name = 'table_assignments.csv'
         self.table_summary_statistics = 'table_summary.csv'
+        self.checkpoint_file_name = 'checkpoint.json'
 
         try:
             if path_to_yaml is not None and os.path.exists(path_to_yaml):
-                self.__dict__ = yaml.safe_load(open(path_to_yaml))
+                self.__dict__.update(yaml.safe_load(open(path_to_yaml)))
             else:
                 raise ValueError(f'File {path_to_yaml} does not exist')
         except ScannerError as exc:
@@ -47,6 +88,12 @@ class Parameters:
                             str(exc.problem) + '\nPlease correct data and retry.')
             raise Exception(msg)
 
+        if overrides is not None:
+            unknown_parameters = [name for name in overrides.keys() if name not in self.__dict__]
+            if len(unknown_parameters) > 0:
+                raise ValueError(f'Unknown parameters {unknown_parameters}')
+            self.__dict__.update(overrides)
+
         # Sanity checks
         self.attribute_field_names = [field_name.strip()
                                       for field_name in self.attribute_field_names]
@@ -81,6 +128,27 @@ class Parameters:
             raise ValueError(msg + override_issues)
         self.override_sameness_score = override_different_score
 
+        # empty entries in the yml file are None
+        self.pinned_seats = self.pinned_seats or dict()
+        self.sit_together = self.sit_together or list()
+        self.sit_apart = self.sit_apart or list()
+        constraint_issues = ""
+        if not isinstance(self.pinned_seats, dict):
+            constraint_issues += f'  - pinned_seats should map attendee IDs to table numbers, received ' \
+                                 f'{self.pinned_seats}\n'
+        else:
+            for attendee_id, table_number in self.pinned_seats.items():
+                if not isinstance(table_number, int):
+                    constraint_issues += f'  - attendee {attendee_id} is pinned to {table_number}, expected a ' \
+                                         f'table number\n'
+        for constraint_name in ('sit_together', 'sit_apart'):
+            for group in getattr(self, constraint_name):
+                if not isinstance(group, list) or len(group) < 2:
+                    constraint_issues += f'  - {constraint_name} should be a list of lists of at least 2 attendee ' \
+                                         f'IDs, received {group}\n'
+        if len(constraint_issues) > 0:
+            raise ValueError('Illegal seating constraints\n' + constraint_issues)
+
         self.data_directory = Path(self.data_directory)
 
     def display(self) -> str:
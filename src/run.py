@@ -5,68 +5,242 @@ import datetime
 import logging
 import argparse
 import signal
-
-import pandas as pd
+import random
+import math
+import functools
+import contextlib
+from typing import Optional, TYPE_CHECKING
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
-from src.parameters.parameters import Parameters
-from src.data_layer.read_attendees import read_attendees
-from src.optimization_layer.initialize_tables import initialize_tables
-from src.optimization_layer.develop_initial_solution import initial_solution
-from src.optimization_layer.print_attendees_assigned_to_tables import output_solution, output_summary
-from src.optimization_layer.reoptimize import iterate_reoptimization
-from src.util.logging_ import configure_logging
+if TYPE_CHECKING:
+    from src.parameters.parameters import Parameters
+    from src.entity.problem import Problem
+    from src.util.progress import ProgressCallback
 
-import src.globals as _globals
+logger = logging.getLogger(__name__)
 
-# Before anything else, read in parameters and setup logger
-parser = argparse.ArgumentParser()
 default_config_loc = r'C:\DocumentsOliverWyman\Table_Arrangements_Optimization\data_and_log_files\config.yml'
-parser.add_argument("--config_location", type=str, help="YAML configuration file location - full file path",
-                    default=default_config_loc)
-args = parser.parse_args()
-
-path_to_config_file = Path(args.config_location)
-parameters = Parameters(path_to_config_file)
-log_file_name = str(parameters.data_directory / parameters.log_file_name)
-configure_logging(log_file_name)
-logger = logging.getLogger(__name__)
 
 
-def ctrl_c_handler(_signum, _frame):
+def parse_arguments(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_location", type=str, help="YAML configuration file location - full file path",
+                        default=default_config_loc)
+    parser.add_argument("--profile", action="store_true",
+                        help="write per-phase timings, counters and the score trajectory next to the table assignments")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="also write a cProfile dump (.prof) next to the table assignments")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the checkpoint of a previous run instead of building an initial solution")
+    parser.add_argument("--warm_start", type=str, default=None,
+                        help="start from the seating of a table assignments file instead of building an initial "
+                             "solution")
+    parser.add_argument("--incremental", type=str, default=None,
+                        help="table assignments file of an earlier run, to be updated with the --roster_changes")
+    parser.add_argument("--roster_changes", type=str, default=None,
+                        help="attendees added, removed or changed since the --incremental table assignments")
+    parser.add_argument("--progress", type=str, choices=['jsonl'], default=None,
+                        help="stream the progress of the optimization (the score, optimality gap and upper bound "
+                             "violations of each improvement) as lines of JSON")
+    parser.add_argument("--progress_file", type=str, default='-',
+                        help="file the --progress events are written to, - (the default) for stdout")
+    args = parser.parse_args(argv)
+    if (args.incremental is None) != (args.roster_changes is None):
+        parser.error('--incremental and --roster_changes must be used together')
+    return args
+
+
+def ctrl_c_handler(problem: 'Problem', _signum, _frame):
     """When ctrl-c is pressed, wait till next re-optimization occurs and write out best answer then exit"""
-    _globals.stop_execution = True
+    problem.stop()
     logger.info("Control-C was pressed.  Will stop optimizing and output best solution so far")
 
 
-def main():
-    signal.signal(signal.SIGINT, ctrl_c_handler)
+def main(argv: Optional[list[str]] = None) -> None:
+    """Read in the parameters and set up the logger, then optimize.
+
+    The model's modules are imported here and in optimize() rather than when run.py is loaded, so that the command
+    line is checked before numpy is loaded, and pandas is only loaded once output is written.
+    """
+    start_time = datetime.datetime.now()
+    args = parse_arguments(argv)
+
+    from src.parameters.parameters import Parameters
+    from src.util.logging_ import configure_logging
+    from src.util.profiling import profiler
+
+    parameters = Parameters(Path(args.config_location))
+    configure_logging(str(parameters.data_directory / parameters.log_file_name))
+
+    profiler.enabled = args.profile or args.cprofile
+    progress = None
+    if args.progress == 'jsonl':
+        from src.util.progress import JsonLinesProgress
+        progress = JsonLinesProgress(args.progress_file)
+    # with the progress on stdout, what the model prints goes to stderr
+    with contextlib.redirect_stdout(sys.stderr) if args.progress is not None and args.progress_file == '-' else \
+            contextlib.nullcontext():
+        try:
+            if args.cprofile:
+                import cProfile
+                assignments_path = parameters.data_directory / parameters.table_assignments_file_name
+                cProfile.runctx('optimize(args, parameters, start_time, progress)', globals(),
+                                {'args': args, 'parameters': parameters, 'start_time': start_time,
+                                 'progress': progress},
+                                str(assignments_path.with_name(assignments_path.stem + '_profile.prof')))
+            else:
+                optimize(args, parameters, start_time, progress)
+        finally:
+            if progress is not None:
+                progress.close()
+
+
+def optimize(args: argparse.Namespace, parameters: 'Parameters',
+             start_time: Optional[datetime.datetime] = None,
+             on_progress: Optional['ProgressCallback'] = None) -> dict:
+    """Seat the attendees of one problem and write the table assignments and summary to the data_directory.
+
+    max_run_time_seconds is measured from start_time (now if not given).  on_progress is called with the start and
+    each improvement of the reoptimization, and can stop it by returning True, then with a finished event once the
+    output is written.  With parallel_starts, num_zones or num_rounds above 1 it only gets the finished event, and an
+    exact_solver's improvement is only in the finished event.
+    Returns the size, score, lower bound and upper bound violations of the final arrangement.
+    """
+    from src.data_layer.read_attendees import read_attendees, attendees_from_df
+    from src.data_layer.table_assignments import read_table_assignments, read_roster_changes
+    from src.data_layer.checkpoint import read_checkpoint
+    from src.optimization_layer.initialize_tables import initialize_tables
+    from src.optimization_layer.develop_initial_solution import initial_solution
+    from src.optimization_layer.warm_start import warm_start
+    from src.optimization_layer.incremental_reseating import reseat_incrementally
+    from src.optimization_layer.multi_round import seat_rounds, output_rounds
+    from src.optimization_layer.print_attendees_assigned_to_tables import output_solution, output_summary
+    from src.optimization_layer.reoptimize import iterate_reoptimization, arrangement_by_id
+    from src.optimization_layer.parallel_reoptimize import parallel_reoptimization
+    from src.optimization_layer.zones import solve_by_zones
+    from src.optimization_layer.exact_solve import solve_exactly
+    from src.optimization_layer.local_search import swap_local_search
+    from src.optimization_layer.lower_bound import lower_bound, optimality_gap
+    from src.util.profiling import profiler
+    from src.util.progress import ProgressEvent
 
     logger.info(f'Parameters:\n{parameters.display()}')
-
-    attendees = read_attendees(parameters)
-    tables = initialize_tables(parameters, attendees)
+    if parameters.num_rounds > 1 and (args.incremental is not None or args.resume or args.warm_start is not None):
+        raise ValueError('num_rounds above 1 cannot be used with --incremental, --resume or --warm_start')
+    if parameters.num_zones > 1 and (args.incremental is not None or parameters.num_rounds > 1):
+        logger.info('num_zones is not used with --incremental or num_rounds above 1')
+    if parameters.exact_solver is not None and (args.incremental is not None or parameters.num_rounds > 1 or
+                                                parameters.num_zones > 1):
+        logger.info('exact_solver is not used with --incremental, num_rounds or num_zones above 1')
+
+    with profiler.timer('read_attendees'):
+        if args.incremental is not None:
+            attendees_df, previous_table_by_id, changed_ids = read_roster_changes(parameters, Path(args.incremental),
+                                                                                  Path(args.roster_changes))
+            attendees = attendees_from_df(attendees_df, parameters)
+        else:
+            attendees = read_attendees(parameters)
+    with profiler.timer('initialize_tables'):
+        tables = initialize_tables(parameters, attendees, start_time)
+    problem = tables[0].problem
+    signal.signal(signal.SIGINT, functools.partial(ctrl_c_handler, problem))
     logger.info(f'Attendees: {attendees}')
-
-    pd.options.display.max_rows = None
-    pd.options.display.max_columns = None
-    pd.options.display.width = None
-    initial_solution(tables, attendees, parameters)
-
-    logger.info(f'Initial Solution\n{output_solution(parameters, tables)}')
-
-    logger.info(f'Table summary statistics for initial solution\n{output_summary(parameters, tables)}')
-
-    iterate_reoptimization(parameters, tables)
-
-    solution_df = output_solution(parameters, tables)
-    summary_df = output_summary(parameters, tables)
+    logger.info(f'Upper bounds: {problem.upper_bound_by_item}')
+    if problem.constraints is not None:
+        logger.info(f'Seating constraints: {problem.constraints}')
+
+    # the bound proven by the exact solver, if used
+    exact_bound = -math.inf
+    if args.incremental is not None:
+        with profiler.timer('reoptimization'):
+            reseat_incrementally(parameters, tables, attendees, previous_table_by_id, changed_ids,
+                                 on_progress=on_progress)
+    elif parameters.num_rounds > 1:
+        if parameters.parallel_starts > 1:
+            logger.info('parallel_starts is not used with num_rounds above 1')
+        with profiler.timer('reoptimization'):
+            table_ids_by_round = seat_rounds(parameters, tables, attendees)
+    elif parameters.num_zones > 1 and not args.resume and args.warm_start is None:
+        if parameters.parallel_starts > 1:
+            logger.info('parallel_starts is not used with num_zones above 1')
+        with profiler.timer('reoptimization'):
+            solve_by_zones(parameters, tables, attendees)
+    else:
+        if parameters.num_zones > 1:
+            logger.info('num_zones is not used with --resume or --warm_start')
+        rng = None
+        with profiler.timer('initial_solution'):
+            if args.resume:
+                table_by_id, rng_state = read_checkpoint(parameters.data_directory / parameters.checkpoint_file_name)
+                warm_start(tables, attendees, table_by_id, parameters)
+                if rng_state is not None:
+                    rng = random.Random()
+                    rng.setstate(rng_state)
+            elif args.warm_start is not None:
+                warm_start(tables, attendees, read_table_assignments(parameters, Path(args.warm_start)), parameters)
+            else:
+                initial_solution(tables, attendees, parameters)
+        if parameters.swap_local_search:
+            swap_local_search(tables, parameters)
+
+        logger.info(f'Initial Solution\n{output_solution(parameters, tables)}')
+
+        logger.info(f'Table summary statistics for initial solution\n{output_summary(parameters, tables)}')
+
+        with profiler.timer('reoptimization'):
+            if parameters.parallel_starts > 1:
+                parallel_reoptimization(parameters, tables, attendees)
+            else:
+                iterate_reoptimization(parameters, tables, rng, on_progress)
+        if parameters.exact_solver is not None:
+            if problem.constraints is not None:
+                logger.info('exact_solver is not used with seating constraints')
+            else:
+                with profiler.timer('exact_solve'):
+                    exact_bound = solve_exactly(parameters, tables, attendees)
+
+    if parameters.num_rounds > 1:
+        solution_df, summary_df = output_rounds(parameters, tables, attendees, table_ids_by_round)
+    else:
+        solution_df = output_solution(parameters, tables)
+        summary_df = output_summary(parameters, tables)
 
     solution_df.to_csv(parameters.data_directory / parameters.table_assignments_file_name, index=False)
     summary_df.to_csv(parameters.data_directory / parameters.table_summary_statistics, index=True)
-    logger.info(f'Finished in {(datetime.datetime.now() - _globals.start_time).total_seconds():.2f} seconds')
-
-
-if __name__ == '__main__': 
+    total_score = summary_df['Score'].sum()
+    # every round scores at least the bound of one arrangement
+    bound = max(lower_bound(problem, parameters.max_table_size) * parameters.num_rounds, exact_bound)
+    logger.info(f'Total score: {total_score}, lower bound: {bound}, '
+                f'optimality gap: {optimality_gap(total_score, bound):.2%}')
+    logger.info(f'Finished in {problem.elapsed_seconds():.2f} seconds')
+    if on_progress is not None:
+        if parameters.num_rounds > 1:
+            def arrangement() -> dict[str, list[int]]:
+                return {str(attendee.id).strip(): [int(table_ids[attendee.item_id]) + 1
+                                                   for table_ids in table_ids_by_round] for attendee in attendees}
+        else:
+            arrangement = functools.partial(arrangement_by_id, tables)
+        on_progress(ProgressEvent('finished', None, problem.elapsed_seconds(), float(total_score), bound,
+                                  optimality_gap(total_score, bound), int(summary_df['Penalty'].sum()), arrangement))
+
+    if profiler.enabled:
+        output_path = parameters.data_directory / parameters.table_assignments_file_name
+        profiler.write(output_path.with_name(output_path.stem + '_profile.json'),
+                       output_path.with_name(output_path.stem + '_profile_trajectory.csv'),
+                       num_attendees=len(attendees),
+                       num_tables=len(tables),
+                       total_score=float(total_score),
+                       lower_bound=bound,
+                       total_seconds=problem.elapsed_seconds())
+    return {'num_attendees': len(attendees),
+            'num_tables': len(tables),
+            'total_score': float(total_score),
+            'lower_bound': bound,
+            'optimality_gap': optimality_gap(total_score, bound),
+            'upper_bound_violations': int(summary_df['Penalty'].sum()),
+            'seconds': problem.elapsed_seconds()}
+
+
+if __name__ == '__main__':
     main()
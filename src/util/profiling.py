@@ -0,0 +1,56 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class Profiler:
+    """Per-phase timers, counters and the score trajectory of a run.  Does nothing unless enabled."""
+    def __init__(self):
+        self.enabled: bool = False
+        self.seconds_by_phase: dict[str, float] = defaultdict(float)
+        self.calls_by_phase: dict[str, int] = defaultdict(int)
+        self.counters: dict[str, int] = defaultdict(int)
+        # (iteration, elapsed seconds, current score, best score) at the start of each reoptimization iteration
+        self.trajectory: list[tuple[int, float, float, float]] = list()
+
+    @contextmanager
+    def timer(self, phase: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds_by_phase[phase] += time.perf_counter() - start
+            self.calls_by_phase[phase] += 1
+
+    def count(self, counter: str, increment: int = 1) -> None:
+        if self.enabled:
+            self.counters[counter] += increment
+
+    def record_iteration(self, iteration: int, elapsed_seconds: float, score: float, best_score: float) -> None:
+        if self.enabled:
+            self.trajectory.append((iteration, elapsed_seconds, score, best_score))
+
+    def report(self) -> dict:
+        return {'phases': {phase: {'seconds': seconds, 'calls': self.calls_by_phase[phase]}
+                           for phase, seconds in self.seconds_by_phase.items()},
+                'counters': dict(self.counters),
+                'trajectory': [{'iteration': iteration, 'elapsed_seconds': elapsed_seconds, 'score': score,
+                                'best_score': best_score}
+                               for iteration, elapsed_seconds, score, best_score in self.trajectory]}
+
+    def write(self, report_path: Path, trajectory_path: Path, **run_information) -> None:
+        """Write the report as JSON (with the run_information added) and the trajectory as CSV"""
+        with open(report_path, 'w') as report_file:
+            json.dump({**run_information, **self.report()}, report_file, indent=2)
+        with open(trajectory_path, 'w') as trajectory_file:
+            trajectory_file.write('Iteration,Elapsed_Seconds,Score,Best_Score\n')
+            for iteration, elapsed_seconds, score, best_score in self.trajectory:
+                trajectory_file.write(f'{iteration},{elapsed_seconds:.6f},{score},{best_score}\n')
+
+
+profiler = Profiler()
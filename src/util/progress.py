@@ -0,0 +1,63 @@
+import sys
+import json
+from typing import Any, Callable, Optional
+
+
+class ProgressEvent:
+    """A point of an anytime run: 'start' (the arrangement the reoptimization starts from), 'improved' (a better
+    arrangement was found) or 'finished' (the output was written).
+
+    score, optimality_gap and upper_bound_violations are those of the best arrangement so far, over all the tables.
+    The tables hold that arrangement when the event is made, so arrangement() has to be called before the
+    optimization continues.
+    """
+    def __init__(self, event: str, iteration: Optional[int], elapsed_seconds: float, score: float,
+                 lower_bound: float, optimality_gap: float, upper_bound_violations: int,
+                 arrangement: Callable[[], dict[str, Any]]):
+        self.event = event
+        self.iteration = iteration
+        self.elapsed_seconds = elapsed_seconds
+        self.score = score
+        self.lower_bound = lower_bound
+        self.optimality_gap = optimality_gap
+        self.upper_bound_violations = upper_bound_violations
+        self._arrangement = arrangement
+
+    def arrangement(self) -> dict[str, Any]:
+        """Table number (1 for the first table) of each attendee ID, a list with the table of each round when there
+        is more than one round"""
+        return self._arrangement()
+
+    def to_dict(self, include_arrangement: bool = False) -> dict:
+        event = {'event': self.event,
+                 'iteration': self.iteration,
+                 'elapsed_seconds': round(self.elapsed_seconds, 3),
+                 'score': float(self.score),
+                 'lower_bound': float(self.lower_bound),
+                 'optimality_gap': float(self.optimality_gap),
+                 'upper_bound_violations': int(self.upper_bound_violations)}
+        if include_arrangement:
+            event['arrangement'] = self.arrangement()
+        return event
+
+    def __repr__(self):
+        return f'ProgressEvent({self.to_dict()})'
+
+
+# called with each event; returning True stops the optimization after the current iteration
+ProgressCallback = Callable[[ProgressEvent], Optional[bool]]
+
+
+class JsonLinesProgress:
+    """Progress callback writing each event as one line of JSON to a file, or to stdout for '-'.  Only the finished
+    event has the arrangement, which is the content of the table assignments file."""
+    def __init__(self, path: str):
+        self.file = sys.stdout if path == '-' else open(path, 'w')
+
+    def __call__(self, event: ProgressEvent) -> None:
+        self.file.write(json.dumps(event.to_dict(include_arrangement=event.event == 'finished')) + '\n')
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not sys.stdout:
+            self.file.close()
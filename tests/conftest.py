@@ -0,0 +1,37 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from src.benchmark.generate_roster import generate_roster
+from src.parameters.parameters import Parameters
+from src.data_layer.read_attendees import read_attendees
+from src.optimization_layer.initialize_tables import initialize_tables
+from src.optimization_layer.develop_initial_solution import initial_solution
+
+
+def _seated_problem(directory: Path, num_attendees: int, override_density: float = 0.3, seed: int = 0,
+                    **parameter_overrides):
+    """Parameters, attendees and tables of a generated roster, seated by initial_solution"""
+    config_path = generate_roster(directory, num_attendees, [4, 3, 2], 1.0, override_density, seed,
+                                  max_table_size=6, **parameter_overrides)
+    parameters = Parameters(config_path)
+    attendees = read_attendees(parameters)
+    tables = initialize_tables(parameters, attendees)
+    initial_solution(tables, attendees, parameters)
+    return parameters, attendees, tables
+
+
+@pytest.fixture
+def seated_problem(tmp_path):
+    """Generate and seat a roster in the test's directory: seated_problem(num_attendees, **parameter_overrides)"""
+    return lambda num_attendees, **parameter_overrides: _seated_problem(tmp_path, num_attendees, **parameter_overrides)
+
+
+@pytest.fixture
+def small_problem(seated_problem):
+    """30 attendees with sameness scores, a quadratic penalty and positive and negative overrides"""
+    return seated_problem(30, default_sameness_score=1, override_quadratic_penalty={'Attribute_2': 2})
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from src.optimization_layer.assignment_solvers import assignment_solvers, get_assignment_solver, \
+    solve_with_sparse_network_flow
+
+
+def total_cost(costs: np.ndarray, assignments: list[tuple[int, int]]) -> float:
+    rows, columns = zip(*assignments)
+    assert len(set(rows)) == len(rows) and len(set(columns)) == len(columns)
+    return float(costs[list(rows), list(columns)].sum())
+
+
+@pytest.mark.parametrize('shape', [(8, 8), (5, 9), (9, 5), (40, 30)])
+@pytest.mark.parametrize('seed', range(5))
+def test_solvers_find_the_same_optimum(shape, seed):
+    rng = np.random.default_rng(seed)
+    # scores are multiples of 0.5, and attendees with the same profile have identical rows
+    costs = rng.integers(-20, 40, size=shape) / 2
+    costs[1::3] = costs[0]
+    reference = total_cost(costs, get_assignment_solver('network_flow')(costs))
+    for name, solver in assignment_solvers.items():
+        assignments = solver(costs)
+        assert len(assignments) == min(shape), name
+        assert total_cost(costs, assignments) == pytest.approx(reference), name
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_solvers_avoid_forbidden_assignments(seed):
+    rng = np.random.default_rng(seed)
+    costs = rng.integers(0, 30, size=(10, 12)).astype(float)
+    costs[rng.random(costs.shape) < 0.3] = np.inf
+    results = {name: solver(costs) for name, solver in assignment_solvers.items()}
+    num_assigned = {name: len(assignments) for name, assignments in results.items()}
+    assert len(set(num_assigned.values())) == 1, num_assigned
+    costs_by_solver = {name: total_cost(costs, assignments) for name, assignments in results.items()}
+    assert all(np.isfinite(cost) for cost in costs_by_solver.values())
+    assert max(costs_by_solver.values()) == pytest.approx(min(costs_by_solver.values())), costs_by_solver
+
+
+def test_unknown_solver():
+    with pytest.raises(ValueError):
+        get_assignment_solver('simplex')
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sparse_network_flow_prices_the_edges_left_out(seed):
+    rng = np.random.default_rng(seed)
+    costs = rng.integers(0, 50, size=(30, 25)).astype(float)
+    costs[::2] = costs[1]
+    reference = total_cost(costs, get_assignment_solver('network_flow')(costs))
+    assert total_cost(costs, solve_with_sparse_network_flow(costs, num_candidates=2)) == pytest.approx(reference)
@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.optimization_layer.exact_solve import SeatingModel, solve_exactly, integer_scale
+from src.optimization_layer.lower_bound import lower_bound
+
+# fractional sameness and quadratic weights, and overrides of both signs
+fractional_weights = {'default_sameness_score': 0.5,
+                      'override_quadratic_penalty': {'Attribute_2': 1.5},
+                      'override_sameness_score': [['Attribute_1', 'A1_1', 'Attribute_2', 'A2_1', -0.25],
+                                                  ['Attribute_1', 'A1_2', 'Attribute_3', 'A3_1', 0.75],
+                                                  ['Attribute_2', 'A2_2', 'Attribute_3', 'A3_2', -1.5]]}
+
+
+def cp_sat_available() -> bool:
+    try:
+        import ortools  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+exact_solvers = ['highs',
+                 pytest.param('cp_sat', marks=pytest.mark.skipif(not cp_sat_available(), reason='needs ortools'))]
+
+
+def test_integer_scale():
+    assert integer_scale(np.array([1.0, -2.0, np.inf])) == (1, True)
+    assert integer_scale(np.array([0.5, 0.25, 3.0])) == (100, True)
+    assert integer_scale(np.array([1 / 3])) == (10 ** 6, False)
+
+
+def test_model_objective_is_the_score(seated_problem):
+    _, attendees, tables = seated_problem(24, **fractional_weights)
+    rng = random.Random(0)
+    for _ in range(5):
+        # random swaps keep the table sizes of the model
+        for _ in range(10):
+            attendee1, attendee2 = rng.sample(attendees, 2)
+            table1, table2 = attendee1.assigned_to_table, attendee2.assigned_to_table
+            if table1 is not table2:
+                table1.remove_attendee(attendee1)
+                table2.remove_attendee(attendee2)
+                table1.add_attendee(attendee2)
+                table2.add_attendee(attendee1)
+        seating_model = SeatingModel(tables, attendees)
+        values = seating_model.values_of_arrangement()
+        assert np.array(seating_model.model.cost) @ values == pytest.approx(sum(table.score() for table in tables))
+
+
+@pytest.mark.parametrize('exact_solver', exact_solvers)
+def test_exact_solve_proves_the_optimum(seated_problem, exact_solver):
+    parameters, attendees, tables = seated_problem(14, exact_solver=exact_solver, max_run_time_seconds=60,
+                                                   **fractional_weights)
+    start_score = sum(table.score() for table in tables)
+    bound = solve_exactly(parameters, tables, attendees)
+    score = sum(table.score() for table in tables)
+    assert score <= start_score
+    assert bound == pytest.approx(score, abs=1e-6)
+    assert sorted(len(table.attendees) for table in tables) == sorted(
+        len(attendees) // len(tables) + (index < len(attendees) % len(tables)) for index in range(len(tables)))
+
+
+@pytest.mark.parametrize('exact_solver', exact_solvers)
+def test_exact_solvers_agree(seated_problem, exact_solver):
+    results = dict()
+    for name in ('highs', exact_solver):
+        # the same roster and initial solution for each solver
+        parameters, attendees, tables = seated_problem(14, exact_solver=name, max_run_time_seconds=60,
+                                                       **fractional_weights)
+        bound = solve_exactly(parameters, tables, attendees)
+        results[name] = (sum(table.score() for table in tables), bound)
+    assert results[exact_solver] == pytest.approx(results['highs'], abs=1e-6)
+
+
+# strongly negative overrides, where the lower bound is weakest
+negative_overrides = {'override_sameness_score': [['Attribute_1', 'A1_1', 'Attribute_2', 'A2_1', -3],
+                                                  ['Attribute_1', 'A1_2', 'Attribute_3', 'A3_1', -2],
+                                                  ['Attribute_2', 'A2_2', 'Attribute_3', 'A3_2', -4]]}
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('max_profiles', [2000, 0])
+def test_lower_bound_is_below_the_optimum(seated_problem, monkeypatch, seed, max_profiles):
+    parameters, attendees, tables = seated_problem(14, seed=seed, exact_solver='highs', max_run_time_seconds=60,
+                                                   **negative_overrides)
+    problem = tables[0].problem
+    # 0 profiles compares the attribute types instead of the profiles
+    monkeypatch.setattr(problem, 'max_profiles_for_interaction_matrix', max_profiles)
+    bound = lower_bound(problem, parameters.max_table_size)
+    solve_exactly(parameters, tables, attendees)
+    assert bound <= sum(table.score() for table in tables) + 1e-6
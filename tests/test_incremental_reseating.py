@@ -0,0 +1,30 @@
+from src.optimization_layer.initialize_tables import initialize_tables
+from src.optimization_layer.incremental_reseating import reseat_incrementally
+from src.optimization_layer.reoptimize import iterate_reoptimization
+
+
+def reseat_without_first_attendee(parameters, attendees, tables):
+    """Reoptimize the arrangement, then remove the first attendee and reseat the others incrementally.  Returns the
+    number of previously seated attendees moved."""
+    iterate_reoptimization(parameters, tables)
+    previous_table_by_id = {str(attendee.id).strip(): attendee.assigned_to_table.table_id for attendee in attendees}
+    remaining = attendees[1:]
+    new_tables = initialize_tables(parameters, remaining)
+    reseat_incrementally(parameters, new_tables, remaining, previous_table_by_id, {str(attendees[0].id).strip()})
+    return sum(1 for attendee in remaining if attendee.assigned_to_table.table_id != attendee.previous_table_id)
+
+
+def test_automatic_movement_penalty_keeps_attendees_seated(seated_problem):
+    parameters, attendees, tables = seated_problem(60, default_sameness_score=1, max_iterations=50,
+                                                   checkpoint_every_seconds=0)
+    assert parameters.movement_penalty is None
+    num_moved = reseat_without_first_attendee(parameters, attendees, tables)
+    assert attendees[1].assigned_to_table.problem.movement_penalty > 0
+    assert num_moved <= 3
+
+
+def test_parameters_are_not_changed(seated_problem):
+    parameters, attendees, tables = seated_problem(30, max_iterations=10, checkpoint_every_seconds=60)
+    reseat_without_first_attendee(parameters, attendees, tables)
+    assert parameters.checkpoint_every_seconds == 60
+    assert parameters.movement_penalty is None
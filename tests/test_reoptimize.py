@@ -0,0 +1,16 @@
+import pytest
+
+from src.optimization_layer import reoptimize
+from src.optimization_layer.local_search import swap_attendees
+
+
+def test_hill_climbing_restores_a_rejected_move(small_problem, monkeypatch):
+    parameters, attendees, tables = small_problem
+    parameters.max_iterations = 20
+    parameters.checkpoint_every_seconds = 0
+    # swapping two attendees can make the score worse, unlike the flow reassignment
+    monkeypatch.setattr(reoptimize, 'reassign_attendees',
+                        lambda attendees_to_assign, tables, solver: swap_attendees(*attendees_to_assign[:2]))
+    events = []
+    reoptimize.iterate_reoptimization(parameters, tables, on_progress=events.append)
+    assert sum(table.score() for table in tables) == pytest.approx(events[-1].score)
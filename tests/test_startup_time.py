@@ -0,0 +1,15 @@
+import statistics
+
+from src.benchmark.startup_time import help_seconds, import_seconds, deferred_modules, help_budget_seconds, \
+    import_budget_seconds
+
+
+def test_help_is_within_budget():
+    assert statistics.median(help_seconds() for _ in range(3)) <= help_budget_seconds
+
+
+def test_optimization_modules_import_within_budget():
+    results = [import_seconds() for _ in range(3)]
+    assert statistics.median(seconds for seconds, _ in results) <= import_budget_seconds
+    seconds_by_package = results[-1][1]
+    assert [module for module in deferred_modules if module in seconds_by_package] == []
@@ -0,0 +1,60 @@
+import pytest
+
+
+def test_marginal_scores_match_score_changes(small_problem):
+    _, attendees, tables = small_problem
+    for attendee in attendees:
+        table = attendee.assigned_to_table
+        before = table.score()
+        removed = table.marginal_score_if_attendee_is_removed(attendee)
+        table.remove_attendee(attendee)
+        assert table.score() == pytest.approx(before + removed)
+        for other_table in tables:
+            before = other_table.score()
+            added = other_table.marginal_score_if_attendee_is_added(attendee)
+            other_table.add_attendee(attendee)
+            assert other_table.score() == pytest.approx(before + added)
+            other_table.remove_attendee(attendee)
+            assert other_table.score() == pytest.approx(before)
+        table.add_attendee(attendee)
+
+
+def test_cached_scores_match_computed_scores(small_problem):
+    _, attendees, tables = small_problem
+    problem = tables[0].problem
+    for attendee in attendees[::3]:
+        attendee.assigned_to_table.remove_attendee(attendee)
+        tables[attendee.item_id % len(tables)].add_attendee(attendee)
+        computed = [table._compute_score() for table in tables]
+        assert [table.score() for table in tables] == pytest.approx(computed)
+        assert problem.scores_by_table() == pytest.approx(computed)
+        assert problem.total_score() == pytest.approx(sum(computed))
+
+
+def test_adding_an_attendee_twice_fails(small_problem):
+    _, attendees, _ = small_problem
+    with pytest.raises(ValueError):
+        attendees[0].assigned_to_table.add_attendee(attendees[0])
+
+
+def test_marginal_scores_include_the_movement_penalty(seated_problem):
+    _, attendees, tables = seated_problem(30, default_sameness_score=1, movement_penalty=3)
+    for attendee in attendees:
+        attendee.previous_table_id = attendee.assigned_to_table.table_id
+    for table in tables:
+        for attendee in list(table.attendees):
+            table.remove_attendee(attendee)
+    for attendee in attendees:
+        tables[attendee.previous_table_id].add_attendee(attendee)
+    for attendee in attendees[:10]:
+        table = attendee.assigned_to_table
+        table.remove_attendee(attendee)
+        for other_table in tables:
+            before = other_table.score()
+            added = other_table.marginal_score_if_attendee_is_added(attendee)
+            assert added - (3 if other_table is not table else 0) == pytest.approx(
+                tables[0].problem.marginal_score_matrix([attendee], other_table.counts[None, :])[0, 0])
+            other_table.add_attendee(attendee)
+            assert other_table.score() == pytest.approx(before + added)
+            other_table.remove_attendee(attendee)
+        table.add_attendee(attendee)
@@ -0,0 +1,38 @@
+import pytest
+
+from src.data_layer.table_assignments import read_roster_changes
+
+
+@pytest.fixture
+def previous_assignments(seated_problem, tmp_path):
+    parameters, _, _ = seated_problem(10)
+    path = tmp_path / 'previous.csv'
+    path.write_text('Table,ID,NAME,Attribute_1,Attribute_2,Attribute_3\n'
+                    '1,1,Ann,A1_1,A2_1,A3_1\n'
+                    '2,2,Bob,A1_2,A2_2,A3_2\n')
+    return parameters, path
+
+
+def test_added_and_changed_attendees(previous_assignments, tmp_path):
+    parameters, previous_path = previous_assignments
+    changes_path = tmp_path / 'changes.csv'
+    changes_path.write_text('Change,ID,Name,Attribute_1,Attribute_2,Attribute_3\n'
+                            'add,3,Cy,A1_3,A2_1,A3_2\n'
+                            'change,2,,A1_1,,\n'
+                            'remove,1,,,,\n')
+    attendees_df, previous_table_by_id, changed_ids = read_roster_changes(parameters, previous_path, changes_path)
+    assert changed_ids == {'1', '2', '3'}
+    assert previous_table_by_id == {'1': 0, '2': 1}
+    assert attendees_df.to_dict('records') == [
+        {'ID': '2', 'Name': 'Bob', 'Attribute_1': 'A1_1', 'Attribute_2': 'A2_2', 'Attribute_3': 'A3_2'},
+        {'ID': '3', 'Name': 'Cy', 'Attribute_1': 'A1_3', 'Attribute_2': 'A2_1', 'Attribute_3': 'A3_2'}]
+
+
+@pytest.mark.parametrize('changes', ['Change,ID,Name,Attribute_1,Attribute_2,Attribute_3\nadd,3,Cy,A1_3,,A3_2\n',
+                                     'Change,ID,Name,Attribute_1,Attribute_2\nadd,3,Cy,A1_3,A2_1\n'])
+def test_added_attendee_needs_every_attribute(previous_assignments, tmp_path, changes):
+    parameters, previous_path = previous_assignments
+    changes_path = tmp_path / 'changes.csv'
+    changes_path.write_text(changes)
+    with pytest.raises(ValueError, match=r'Attendee 3 .* (Attribute_2|Attribute_3)'):
+        read_roster_changes(parameters, previous_path, changes_path)